@@ -2,6 +2,7 @@ from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 import os
 from dotenv import load_dotenv
+from app.utils.query_timing import instrument_engine
 
 load_dotenv()
 
@@ -24,6 +25,8 @@ else:
     DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     engine = create_engine(DATABASE_URL, pool_pre_ping=True)
     print(f"🔧 Utilisation de PostgreSQL: {DB_HOST}:{DB_PORT}/{DB_NAME}")
+instrument_engine(engine)
+IS_POSTGRES = engine.dialect.name == "postgresql"
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -6,7 +6,15 @@ import pandas as pd
 from sqlalchemy import Table, Column, Integer, Float, String, DateTime, JSON, MetaData
 from sqlalchemy.sql import func
 from app.database import engine, Base
-from app.models import Prediction
+from app.models import Prediction, LatestPrediction
+from app.utils.latest_predictions import rebuild_latest_predictions
+from app.utils.migrations import (
+    migrate_probabilities_to_columns, migrate_add_scoring_run_id, migrate_predictions_to_partitioned
+)
+from app.utils.retention import run_maintenance
+from app.utils.feature_store import refresh_feature_store
+from app.utils.preprocessing import create_source_indexes
+from sqlalchemy.orm import Session
 import os
 
 def init_database():
@@ -20,6 +28,15 @@ def init_database():
         Base.metadata.create_all(bind=engine)
         print("✓ Tables des modèles créées")
 
+        # Mettre à jour le schéma des tables existantes
+        apply_migrations()
+
+        # Partitions à venir, rétention et compaction de l'historique des prédictions
+        maintain_predictions()
+
+        # Remplir latest_predictions depuis l'historique si elle est vide (base existante)
+        sync_latest_predictions()
+
         # 2. Vérifier si les données CSV existent
         csv_files = {
             'sirh': './data/extrait_sirh.csv',
@@ -50,11 +67,76 @@ def init_database():
         df_sondage.to_sql('extrait_sondage', engine, if_exists='replace', index=False)
         print(f"✓ Table 'extrait_sondage' créée avec {len(df_sondage)} lignes")
 
+        # Index des jointures de /predict/cohort, perdus avec les tables remplacées
+        with engine.begin() as conn:
+            create_source_indexes(conn)
+
+        # 4. Features prétraitées pour le scoring en masse (mise à jour incrémentale)
+        sync_feature_store(df_eval, df_sirh, df_sondage)
+
         print("✅ Base de données initialisée avec succès !")
 
     except Exception as e:
         print(f"❌ Erreur lors de l'initialisation de la base de données: {e}")
         raise
 
+def apply_migrations():
+    """
+    Applique les migrations de schéma sur une base existante.
+    Un échec est signalé mais n'empêche pas l'initialisation du reste de la base.
+    """
+    try:
+        migrated = migrate_probabilities_to_columns(engine)
+        if migrated:
+            print(f"✓ Colonne 'probabilities' migrée vers 'probability_class_0' ({migrated} lignes)")
+        if migrate_add_scoring_run_id(engine):
+            print("✓ Colonne 'predictions.scoring_run_id' ajoutée")
+        copied = migrate_predictions_to_partitioned(engine)
+        if copied:
+            print(f"✓ Table 'predictions' convertie en table partitionnée ({copied} lignes)")
+    except Exception as e:
+        print(f"⚠ Impossible d'appliquer les migrations: {e}")
+
+
+def maintain_predictions():
+    """
+    Crée les partitions à venir et applique la rétention / compaction configurées.
+    Un échec est signalé mais n'empêche pas l'initialisation du reste de la base.
+    """
+    try:
+        report = run_maintenance(engine)
+        if report.get("retention") or report.get("compacted_rows"):
+            print(f"✓ Maintenance de la table 'predictions': {report}")
+    except Exception as e:
+        print(f"⚠ Impossible d'appliquer la maintenance des prédictions: {e}")
+
+
+def sync_latest_predictions():
+    """
+    Reconstruit ``latest_predictions`` si elle est vide alors que l'historique ne l'est pas.
+    Un échec n'empêche pas l'initialisation du reste de la base.
+    """
+    try:
+        with Session(engine) as db:
+            if db.query(LatestPrediction).first() is None and db.query(Prediction).first() is not None:
+                count = rebuild_latest_predictions(db)
+                db.commit()
+                print(f"✓ Table 'latest_predictions' reconstruite ({count} employés)")
+    except Exception as e:
+        print(f"⚠ Impossible de synchroniser latest_predictions: {e}")
+
+
+def sync_feature_store(df_eval, df_sirh, df_sondage):
+    """
+    Met à jour ``employee_features`` depuis les données chargées.
+    Un échec n'empêche pas l'initialisation : le scoring repart alors des tables brutes.
+    """
+    try:
+        report = refresh_feature_store(engine, df_eval, df_sirh, df_sondage)
+        print(f"✓ Table 'employee_features' mise à jour: {report}")
+    except Exception as e:
+        print(f"⚠ Impossible de mettre à jour employee_features: {e}")
+
+
 if __name__ == "__main__":
     init_database()
@@ -1,16 +1,55 @@
-from fastapi import FastAPI, Depends
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, Depends, Header
+from fastapi.responses import JSONResponse, Response
 from pydantic import BaseModel
 import joblib
-from app.utils.preprocessing import load_data_from_postgres, preprocess_input, safe_log_transform, SafeLogTransform, preprocess_single_employee
+from app.utils.preprocessing import load_data_from_postgres, load_cohort_from_postgres, preprocess_input, safe_log_transform, SafeLogTransform, preprocess_single_employee
 import os
 import sys
-from typing import Optional
+from typing import Optional, Literal, List
+from sqlalchemy import func
 from sqlalchemy.orm import Session
-from app.database import get_db, DATABASE_URL
-from app.models import Prediction
-from fastapi.responses import RedirectResponse
+from app.database import get_db, DATABASE_URL, engine
+from app.models import Prediction, LatestPrediction, ScoringRun
+from app.utils.timing import StageTimer
+from app.utils.metrics import (
+    MetricsMiddleware, stage_observer, collect_pool_stats, render_metrics,
+    ROWS_SCORED, MODEL_LOADED, PROMETHEUS_CONTENT_TYPE
+)
+from app.utils.server_timing import (
+    ServerTimingMiddleware, begin_handler, request_stage, scoring_stage_recorder, json_response
+)
+from app.utils.admin import is_admin, admin_token as admin_token_configured
+from app.utils.profiling import ProfilingMiddleware, PROFILES, profiling_enabled, summary, export_pstats
+from app.utils.pipeline_instrumentation import instrument_pipeline, instrumentation_enabled, PIPELINE_STATS
+from app.utils.memory_diagnostics import (
+    MemoryDiagnosticsMiddleware, MEMORY_RUNS, memory_diagnostics_enabled, memory_stage_recorder,
+    run_summary, export_snapshot, start_tracing, stop_tracing, status as memory_status
+)
+from app.utils.query_timing import QUERY_STATS, query_timing_enabled
+from app.utils.compression import compression_enabled, compression_settings
+from starlette.middleware.gzip import GZipMiddleware
+from app.utils.traffic_capture import TrafficCaptureMiddleware, capture_enabled, default_writer
+from datetime import datetime, timezone
+import hashlib
+from app.utils.latest_predictions import upsert_latest_predictions, refresh_latest_for_employee, risk_level_for, risk_levels_for
+from app.utils.fast_json import FastJSONResponse, SCORING_FIELDS, scoring_columns, rows_from_columns, prediction_records
+from app.utils.response_formats import (
+    negotiate, columns_from_rows, formatted_response, not_acceptable, select_fields, project,
+)
+from app.utils.response_cache import (
+    PREDICTION_CACHE, RESPONSE_CACHE_LOOKUPS, etag_for, etag_matches, invalidate_predictions, not_modified,
+    response_cache_enabled,
+)
+from fastapi.responses import RedirectResponse, StreamingResponse
+from app.utils.export import build_export_query, stream_export, parquet_available, MEDIA_TYPES
+from app.utils.bulk_predictions import bulk_max_ids, parse_selection, stream_bulk_get, bulk_delete
+from app.utils.top_risk import latest_top_risk, scored_top_risk, top_risk_max_k
+from app.utils.risk_statistics import compute_statistics, MAX_BUCKETS
+from app.utils.feature_index import FEATURE_INDEX
+from app.utils.feature_store import feature_store_enabled, load_feature_store
 from contextlib import asynccontextmanager
+import asyncio
+from starlette.concurrency import run_in_threadpool
 
 # Créer un alias pour safe_log_transform dans __main__ pour la désérialisation du modèle
 sys.modules['__main__'].safe_log_transform = safe_log_transform
@@ -25,8 +64,29 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"Avertissement: Impossible d'initialiser la base de données: {e}")
         print("L'application démarre quand même, mais certains endpoints peuvent ne pas fonctionner.")
+    maintenance_task = asyncio.create_task(periodic_maintenance())
     yield
-    # Shutdown (si nécessaire)
+    # Shutdown
+    maintenance_task.cancel()
+    if capture_writer is not None:
+        capture_writer.close()
+
+
+async def periodic_maintenance():
+    """Crée les partitions à venir et applique rétention / compaction à intervalle régulier."""
+    from app.database import engine
+    from app.utils.retention import run_maintenance, maintenance_interval_hours
+    interval_hours = maintenance_interval_hours()
+    if interval_hours <= 0:
+        return
+    while True:
+        await asyncio.sleep(interval_hours * 3600)
+        try:
+            print(f"Maintenance des prédictions: {await run_in_threadpool(run_maintenance, engine)}")
+            PREDICTION_CACHE.invalidate()
+        except Exception as e:
+            print(f"Avertissement: maintenance des prédictions impossible: {e}")
+
 
 app = FastAPI(
     title="API Prédiction Turnover",
@@ -34,6 +94,17 @@ app = FastAPI(
     version="1.0.0",
     lifespan=lifespan
 )
+if compression_enabled():
+    app.add_middleware(GZipMiddleware, **compression_settings())
+app.add_middleware(MetricsMiddleware)
+app.add_middleware(ServerTimingMiddleware)
+if profiling_enabled():
+    app.add_middleware(ProfilingMiddleware)
+if memory_diagnostics_enabled():
+    app.add_middleware(MemoryDiagnosticsMiddleware)
+capture_writer = default_writer() if capture_enabled() else None
+if capture_writer is not None:
+    app.add_middleware(TrafficCaptureMiddleware, writer=capture_writer)
 
 
 try:
@@ -49,6 +120,47 @@ except Exception as e:
     print(f"Erreur lors du chargement du pipeline: {e}")
     pipeline = None
 
+if pipeline is not None and instrumentation_enabled():
+    print(f"Instrumentation du pipeline: {len(instrument_pipeline(pipeline))} méthodes mesurées")
+
+
+def _model_version(path):
+    """Version du modèle : variable MODEL_VERSION, sinon empreinte du fichier joblib."""
+    if os.getenv("MODEL_VERSION"):
+        return os.getenv("MODEL_VERSION")
+    try:
+        with open(path, "rb") as f:
+            return hashlib.sha256(f.read()).hexdigest()[:12]
+    except OSError:
+        return None
+
+
+MODEL_VERSION = _model_version(model_path)
+
+# Colonnes lues pour les listes de prédictions (lignes brutes, sans objets ORM)
+PREDICTION_RECORD_COLUMNS = (
+    Prediction.id, Prediction.employee_id, Prediction.prediction,
+    Prediction.probability, Prediction.probability_class_0, Prediction.created_at,
+)
+LATEST_RECORD_COLUMNS = (
+    LatestPrediction.employee_id, LatestPrediction.prediction_id, LatestPrediction.prediction,
+    LatestPrediction.probability, LatestPrediction.risk_level, LatestPrediction.updated_at,
+)
+PREDICTION_RECORD_FIELDS = ("id", "employee_id", "prediction", "probability", "probability_class_0", "created_at")
+# Champs d'une prédiction dans la réponse JSON par ligne (``probabilities`` recomposé)
+PREDICTION_ROW_FIELDS = ("id", "employee_id", "prediction", "probability", "probabilities", "created_at")
+
+
+def _scoring_observer(endpoint):
+    """Reporte chaque étape du scoring dans les métriques, le Server-Timing et les diagnostics mémoire."""
+    observe_metrics = stage_observer(endpoint)
+
+    def observe(stage, seconds):
+        observe_metrics(stage, seconds)
+        scoring_stage_recorder(stage, seconds)
+        memory_stage_recorder(stage, seconds)
+    return observe
+
 
 class EmployeeInput(BaseModel):
     employee_id: Optional[int] = None
@@ -98,78 +210,286 @@ async def health():
     }
 
 
-@app.post("/predict")
-async def predict(db: Session = Depends(get_db)):
-    if pipeline is None:
+@app.get("/metrics")
+async def metrics():
+    """Métriques au format texte Prometheus."""
+    MODEL_LOADED.set(1 if pipeline is not None else 0)
+    collect_pool_stats(engine)
+    return Response(content=render_metrics(), media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+def _admin_error(enabled, admin_token, require_token=False):
+    """Réponse d'erreur si l'outil est désactivé (404) ou le jeton invalide (403), sinon None."""
+    if not enabled:
+        return JSONResponse(status_code=404, content={"success": False, "error": "Outil d'administration désactivé"})
+    if require_token and admin_token_configured() is None:
+        return JSONResponse(status_code=403, content={"success": False, "error": "Définir ADMIN_TOKEN pour accéder à cet outil"})
+    if not is_admin(admin_token, require_token):
+        return JSONResponse(status_code=403, content={"success": False, "error": "Jeton d'administration invalide"})
+    return None
+
+
+@app.get("/admin/profiles")
+async def list_profiles(x_admin_token: Optional[str] = Header(default=None)):
+    error = _admin_error(profiling_enabled(), x_admin_token)
+    if error:
+        return error
+    profiles = PROFILES.list()
+    return {"success": True, "total": len(profiles), "profiles": profiles}
+
+
+@app.get("/admin/profiles/{profile_id}")
+async def get_profile(
+    profile_id: str,
+    format: Literal["summary", "pstats", "collapsed"] = "summary",
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    error = _admin_error(profiling_enabled(), x_admin_token)
+    if error:
+        return error
+
+    profile = PROFILES.get(profile_id)
+    if profile is None:
         return JSONResponse(
-            status_code=503,
-            content={
-                "success": False,
-                "error": "Le modèle n'est pas chargé. Vérifiez que full_pipeline.joblib existe."
-            }
+            status_code=404,
+            content={"success": False, "error": f"Profil {profile_id} non trouvé"}
         )
 
-    try:
-        eval_df, sirh_df, sondage_df = load_data_from_postgres(DATABASE_URL)
+    if format == "summary":
+        return {"success": True, "profile": summary(profile)}
+    if format == "pstats" and "_stats" in profile:
+        return Response(
+            content=export_pstats(profile),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": f'attachment; filename="{profile_id}.prof"'}
+        )
+    if format == "collapsed" and "_collapsed" in profile:
+        return Response(content=profile["_collapsed"], media_type="text/plain; charset=utf-8")
+    return JSONResponse(
+        status_code=400,
+        content={"success": False, "error": f"Format {format} indisponible pour un profil {profile['mode']}"}
+    )
 
+
+@app.get("/admin/pipeline_steps")
+async def get_pipeline_steps(reset: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """Durée, lignes et octets cumulés par étape du pipeline (PIPELINE_INSTRUMENTATION=true)."""
+    error = _admin_error(instrumentation_enabled(), x_admin_token)
+    if error:
+        return error
+    steps = PIPELINE_STATS.snapshot()
+    if reset:
+        PIPELINE_STATS.reset()
+    return {"success": True, "steps": steps}
+
+
+@app.get("/admin/queries")
+async def get_query_stats(limit: int = 50, reset: bool = False, x_admin_token: Optional[str] = Header(default=None)):
+    """
+    Durée des requêtes SQL par requête normalisée, requêtes lentes et attente du pool.
+    La mesure est active par défaut : la lecture exige un ``ADMIN_TOKEN`` configuré.
+    """
+    error = _admin_error(query_timing_enabled(), x_admin_token, require_token=True)
+    if error:
+        return error
+    collect_pool_stats(engine)
+    queries = QUERY_STATS.snapshot(limit)
+    if reset:
+        QUERY_STATS.reset()
+    return {"success": True, **queries, "pool": engine.pool.status()}
+
+
+@app.get("/admin/memory")
+async def get_memory_status(top: int = 0, x_admin_token: Optional[str] = Header(default=None)):
+    """État du suivi tracemalloc ; ``top`` > 0 ajoute les sites d'allocation les plus lourds."""
+    error = _admin_error(memory_diagnostics_enabled(), x_admin_token)
+    if error:
+        return error
+    return {"success": True, "memory": memory_status(limit=top)}
+
+
+@app.post("/admin/memory/start")
+async def start_memory_tracing(frames: int = 10, x_admin_token: Optional[str] = Header(default=None)):
+    error = _admin_error(memory_diagnostics_enabled(), x_admin_token)
+    if error:
+        return error
+    return {"success": True, "memory": start_tracing(frames)}
+
+
+@app.post("/admin/memory/stop")
+async def stop_memory_tracing(x_admin_token: Optional[str] = Header(default=None)):
+    error = _admin_error(memory_diagnostics_enabled(), x_admin_token)
+    if error:
+        return error
+    return {"success": True, "memory": stop_tracing()}
+
+
+@app.get("/admin/memory/runs")
+async def list_memory_runs(x_admin_token: Optional[str] = Header(default=None)):
+    error = _admin_error(memory_diagnostics_enabled(), x_admin_token)
+    if error:
+        return error
+    runs = MEMORY_RUNS.list()
+    return {"success": True, "total": len(runs), "runs": runs}
+
+
+@app.get("/admin/memory/runs/{run_id}")
+async def get_memory_run(
+    run_id: str,
+    format: Literal["summary", "snapshot"] = "summary",
+    snapshot: Literal["before", "peak", "after"] = "peak",
+    x_admin_token: Optional[str] = Header(default=None)
+):
+    error = _admin_error(memory_diagnostics_enabled(), x_admin_token)
+    if error:
+        return error
+
+    run = MEMORY_RUNS.get(run_id)
+    if run is None:
+        return JSONResponse(
+            status_code=404,
+            content={"success": False, "error": f"Scoring suivi {run_id} non trouvé"}
+        )
+
+    if format == "summary":
+        return {"success": True, "run": run_summary(run)}
+    content = export_snapshot(run, snapshot)
+    if content is None:
+        return JSONResponse(
+            status_code=400,
+            content={"success": False, "error": f"Instantané {snapshot} indisponible pour ce scoring"}
+        )
+    return Response(
+        content=content,
+        media_type="application/octet-stream",
+        headers={"Content-Disposition": f'attachment; filename="{run_id}-{snapshot}.tracemalloc"'}
+    )
+
+
+def _load_population(timer, **filters):
+    """
+    Charge la population et renvoie la population fusionnée et les features (lignes
+    alignées), depuis ``employee_features`` si elle est à jour, sinon depuis les tables
+    sources. Avec des ``filters`` (voir ``cohort_where``), seuls les employés
+    correspondants sont lus : le filtre est appliqué en SQL.
+    """
+    filters = {name: value for name, value in filters.items() if value is not None}
+    with timer.stage("load"):
+        features = load_feature_store(DATABASE_URL, **filters) if feature_store_enabled() else None
+        if features is None and filters:
+            eval_df, sirh_df, sondage_df = load_cohort_from_postgres(DATABASE_URL, **filters)
+        elif features is None:
+            eval_df, sirh_df, sondage_df = load_data_from_postgres(DATABASE_URL)
+    if features is not None:
+        # employee_features à jour : features prêtes, dimensions (département, poste) comprises
+        return features, features
+
+    with timer.stage("merge"):
         eval_df['id_employee'] = eval_df['eval_number'].astype(str).str.extract(r'(\d+)').astype(int)
         sondage_df['id_employee'] = sondage_df['code_sondage'].astype(str).str.extract(r'(\d+)').astype(int)
 
         merged_df = sirh_df.merge(eval_df, on='id_employee', how='inner')\
                            .merge(sondage_df, on='id_employee', how='inner')
-        employee_ids = merged_df['id_employee'].values
 
+    with timer.stage("preprocess"):
         X = preprocess_input(eval_df, sirh_df, sondage_df)
+    return merged_df, X
+
+
+def _score_population(db, source, response_format, selected, summary_only, debug, empty_error, **filters):
+    """
+    Score la population (ou la cohorte décrite par ``filters``), enregistre les prédictions
+    dans un ``ScoringRun`` de ``source`` et renvoie la réponse de ``/predict``. Un échec
+    annule les prédictions, mais laisse un ``ScoringRun`` au statut ``failed`` avec les
+    durées des étapes déjà passées.
+    """
+    timer = StageTimer(on_stage=_scoring_observer(source))
+    try:
+        run = ScoringRun(source=source, status="running", model_version=MODEL_VERSION)
+        db.add(run)
+        db.flush()
+
+        merged_df, X = _load_population(timer, **filters)
+        employee_ids = merged_df['id_employee'].values
 
         if len(X) == 0:
+            db.rollback()
             return JSONResponse(
                 status_code=404,
                 content={
                     "success": False,
-                    "error": "Aucune donnée après preprocessing (vérifiez les merge)"
+                    "error": empty_error
                 }
             )
 
-        predictions = pipeline.predict(X)
-        probabilities_full = pipeline.predict_proba(X)
-        probabilities = probabilities_full[:, 1]
-
-        results = []
-        for i, (emp_id, pred, proba, proba_full) in enumerate(zip(employee_ids, predictions, probabilities, probabilities_full)):
-            db_prediction = Prediction(
-                employee_id=int(emp_id),
-                prediction=int(pred),
-                probability=float(proba),
-                probabilities=proba_full.tolist()
-            )
-            db.add(db_prediction)
+        with timer.stage("predict"):
+            predictions = pipeline.predict(X)
+        with timer.stage("predict_proba"):
+            probabilities_full = pipeline.predict_proba(X)
+            probabilities = probabilities_full[:, 1]
 
-            results.append({
-                "employee_id": int(emp_id),
-                "employee_index": i,
-                "will_leave": bool(pred),
-                "probability": round(float(proba), 3),
-                "risk_level": "HIGH" if proba > 0.50 else "LOW"
-            })
+        with timer.stage("build_results"):
+            db_predictions = [
+                Prediction(
+                    employee_id=emp_id,
+                    prediction=pred,
+                    probability=proba,
+                    probability_class_0=proba_0,
+                    scoring_run_id=run.id
+                )
+                for emp_id, pred, proba, proba_0 in zip(
+                    employee_ids.astype(int).tolist(),
+                    predictions.astype(int).tolist(),
+                    probabilities.astype(float).tolist(),
+                    probabilities_full[:, 0].astype(float).tolist()
+                )
+            ]
+            db.add_all(db_predictions)
 
-        db.commit()
+            risk_levels = risk_levels_for(probabilities)
+            if not summary_only:
+                columns = project(scoring_columns(employee_ids, predictions, probabilities, risk_levels), selected)
 
-        high_risk_count = sum(1 for r in results if r["risk_level"] == "HIGH")
-        low_risk_count = len(results) - high_risk_count
+        with timer.stage("persist"):
+            db.flush()
+            upsert_latest_predictions(db, db_predictions)
 
-        return {
+        total = len(db_predictions)
+        run.status = "success"
+        run.row_count = total
+        run.stage_timings = timer.rounded()
+        run.finished_at = datetime.now(timezone.utc)
+        with timer.stage("commit"):
+            db.commit()
+        invalidate_predictions()
+        ROWS_SCORED.inc(total, endpoint=source)
+
+        high_risk_count = int((risk_levels == "HIGH").sum())
+        low_risk_count = total - high_risk_count
+
+        envelope = {
             "success": True,
-            "total_employees": len(results),
+            "scoring_run_id": run.id,
+            "total_employees": total,
             "statistics": {
                 "high_risk": high_risk_count,
                 "low_risk": low_risk_count,
-                "high_risk_percentage": round((high_risk_count / len(results)) * 100, 2)
+                "high_risk_percentage": round((high_risk_count / total) * 100, 2)
             },
-            "predictions": results
         }
+        if response_format != "json":
+            with request_stage("serialization"):
+                return formatted_response(response_format, envelope, None if summary_only else columns)
+        if not summary_only:
+            with request_stage("serialization"):
+                envelope["predictions"] = rows_from_columns(columns)
+        response = json_response(envelope, debug=debug, fast=True)
+        response.headers["Vary"] = "Accept"
+        return response
 
     except Exception as e:
         db.rollback()
+        _record_failed_run(db, source, timer)
         return JSONResponse(
             status_code=500,
             content={
@@ -180,8 +500,102 @@ async def predict(db: Session = Depends(get_db)):
         )
 
 
+def _record_failed_run(db, source, timer):
+    """Enregistre, dans sa propre transaction, un ``ScoringRun`` échoué et ses durées partielles."""
+    try:
+        db.add(ScoringRun(
+            source=source, status="failed", model_version=MODEL_VERSION,
+            stage_timings=timer.rounded(), finished_at=datetime.now(timezone.utc),
+        ))
+        db.commit()
+    except Exception as e:
+        # La base elle-même est peut-être en cause : l'erreur d'origine reste celle renvoyée
+        db.rollback()
+        print(f"Erreur lors de l'enregistrement du scoring échoué: {e}")
+
+
+@app.post("/predict")
+async def predict(
+    db: Session = Depends(get_db), debug: bool = False, fields: Optional[str] = None, summary_only: bool = False,
+    accept: Optional[str] = Header(default=None),
+):
+    begin_handler()
+    response_format = negotiate(accept)
+    if response_format is None:
+        return not_acceptable()
+    try:
+        selected = select_fields(fields, SCORING_FIELDS)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    if pipeline is None:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "error": "Le modèle n'est pas chargé. Vérifiez que full_pipeline.joblib existe."
+            }
+        )
+
+    return _score_population(
+        db, "predict", response_format, selected, summary_only, debug,
+        "Aucune donnée après preprocessing (vérifiez les merge)"
+    )
+
+
+class CohortFilter(BaseModel):
+    departement: Optional[List[str]] = None
+    poste: Optional[List[str]] = None
+    age_min: Optional[int] = None
+    age_max: Optional[int] = None
+    employee_ids: Optional[List[int]] = None
+
+
+@app.post("/predict/cohort")
+async def predict_cohort(
+    cohort: CohortFilter, db: Session = Depends(get_db), debug: bool = False, fields: Optional[str] = None,
+    summary_only: bool = False, accept: Optional[str] = Header(default=None),
+):
+    """Comme ``/predict``, limité aux employés correspondant aux filtres (appliqués en SQL)."""
+    begin_handler()
+    response_format = negotiate(accept)
+    if response_format is None:
+        return not_acceptable()
+    filters = cohort.model_dump(exclude_none=True)
+    if not filters:
+        return JSONResponse(status_code=400, content={"success": False, "error": "Indiquer au moins un filtre de cohorte"})
+    if cohort.age_min is not None and cohort.age_max is not None and cohort.age_min > cohort.age_max:
+        return JSONResponse(status_code=400, content={"success": False, "error": "age_min doit être inférieur ou égal à age_max"})
+    if any(len(values) == 0 for values in filters.values() if isinstance(values, list)):
+        return JSONResponse(status_code=400, content={"success": False, "error": "Les listes de filtres ne peuvent pas être vides"})
+    if cohort.employee_ids is not None:
+        employee_ids, max_ids = sorted(set(cohort.employee_ids)), bulk_max_ids()
+        if len(employee_ids) > max_ids:
+            return JSONResponse(status_code=400, content={
+                "success": False, "error": f"Trop d'ids ({len(employee_ids)}, maximum {max_ids})"
+            })
+        filters["employee_ids"] = employee_ids
+    try:
+        selected = select_fields(fields, SCORING_FIELDS)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    if pipeline is None:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "error": "Le modèle n'est pas chargé. Vérifiez que full_pipeline.joblib existe."
+            }
+        )
+
+    return _score_population(
+        db, "cohort", response_format, selected, summary_only, debug,
+        "Aucun employé ne correspond aux filtres de la cohorte", **filters
+    )
+
+
 @app.post("/predict_one")
-async def predict_one(employee: EmployeeInput, db: Session = Depends(get_db)):
+async def predict_one(employee: EmployeeInput, db: Session = Depends(get_db), debug: bool = False):
+    begin_handler()
     if pipeline is None:
         return JSONResponse(
             status_code=503,
@@ -192,32 +606,43 @@ async def predict_one(employee: EmployeeInput, db: Session = Depends(get_db)):
         )
 
     try:
+        timer = StageTimer(on_stage=_scoring_observer("predict_one"))
         employee_dict = employee.model_dump()
-        X = preprocess_single_employee(employee_dict)
+        with timer.stage("preprocess"):
+            X = preprocess_single_employee(employee_dict)
 
-        prediction = pipeline.predict(X)[0]
-        probabilities = pipeline.predict_proba(X)[0]
+        with timer.stage("predict"):
+            prediction = pipeline.predict(X)[0]
+        with timer.stage("predict_proba"):
+            probabilities = pipeline.predict_proba(X)[0]
         probability = float(probabilities[1])
 
         db_prediction = Prediction(
             employee_id=employee_dict.get('employee_id'),
             prediction=int(prediction),
             probability=probability,
-            probabilities=probabilities.tolist()
+            probability_class_0=float(probabilities[0])
         )
-        db.add(db_prediction)
-        db.commit()
-        db.refresh(db_prediction)
+        with timer.stage("persist"):
+            db.add(db_prediction)
+            db.flush()
+            upsert_latest_predictions(db, [db_prediction])
+        with timer.stage("commit"):
+            db.commit()
+        invalidate_predictions()
+        ROWS_SCORED.inc(endpoint="predict_one")
+        with request_stage("db_read"):
+            db.refresh(db_prediction)
 
-        return {
+        return json_response({
             "success": True,
             "prediction_id": db_prediction.id,
             "prediction": {
                 "will_leave": bool(prediction),
                 "probability": round(probability, 3),
-                "risk_level": "HIGH" if probability > 0.50 else "LOW"
+                "risk_level": risk_level_for(probability)
             }
-        }
+        }, debug=debug)
 
     except Exception as e:
         db.rollback()
@@ -231,28 +656,133 @@ async def predict_one(employee: EmployeeInput, db: Session = Depends(get_db)):
         )
 
 
+@app.get("/employees/{employee_id}/risk")
+async def get_employee_risk(employee_id: int, db: Session = Depends(get_db), debug: bool = False):
+    """Risque d'un employé présent dans les tables sources, lu dans l'index de features (sans enregistrement)."""
+    begin_handler()
+    if pipeline is None:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "error": "Le modèle n'est pas chargé. Vérifiez que full_pipeline.joblib existe."
+            }
+        )
+
+    try:
+        with request_stage("db_read"):
+            FEATURE_INDEX.refresh(db, lambda: _load_population(StageTimer(on_stage=_scoring_observer("feature_index"))))
+        risk = FEATURE_INDEX.risk(employee_id, pipeline)
+        if risk is None:
+            return JSONResponse(
+                status_code=404,
+                content={"success": False, "error": f"Employé {employee_id} non trouvé"}
+            )
+        return json_response({"success": True, **risk}, debug=debug)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
 @app.get("/predictions")
-async def get_all_predictions(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
+async def get_all_predictions(
+    db: Session = Depends(get_db), skip: int = 0, limit: int = 100, debug: bool = False,
+    fields: Optional[str] = None, summary_only: bool = False, accept: Optional[str] = Header(default=None),
+    if_none_match: Optional[str] = Header(default=None),
+):
+    begin_handler()
+    response_format = negotiate(accept)
+    if response_format is None:
+        return not_acceptable()
+    try:
+        selected = select_fields(fields, PREDICTION_ROW_FIELDS if response_format == "json" else PREDICTION_RECORD_FIELDS)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    try:
+        # Les lignes ne changent pas après insertion : le validateur d'une page est un
+        # agrégat lu en une requête. Les sommes détectent aussi un id supprimé puis
+        # réattribué à une autre prédiction (SQLite sans AUTOINCREMENT)
+        with request_stage("db_read"):
+            aggregate = db.query(
+                func.count(Prediction.id), func.max(Prediction.id), func.max(Prediction.created_at),
+                func.sum(Prediction.employee_id), func.sum(func.round(Prediction.probability * 1000)),
+            ).one()
+        total = aggregate[0]
+        validator = tuple(str(value) for value in aggregate)
+        representation = (skip, limit, response_format, tuple(selected or ()), summary_only)
+        etag = etag_for("predictions", *validator, *representation)
+        if not debug and etag_matches(if_none_match, etag):
+            RESPONSE_CACHE_LOOKUPS.inc(kind="page", result="not_modified")
+            return not_modified(etag, {"Vary": "Accept"})
+        use_cache = response_cache_enabled() and not debug
+        cache_key = ("page", *representation)
+        cached = PREDICTION_CACHE.get(cache_key, validator=validator) if use_cache else None
+        if cached is not None:
+            RESPONSE_CACHE_LOOKUPS.inc(kind="page", result="hit")
+            return Response(content=cached[0], media_type=cached[1], headers={"ETag": etag, "Vary": "Accept"})
+
+        with request_stage("db_read"):
+            rows = [] if summary_only else db.query(*PREDICTION_RECORD_COLUMNS).offset(skip).limit(limit).all()
+
+        envelope = {"success": True, "total": total, "skip": skip, "limit": limit}
+        if response_format != "json":
+            with request_stage("serialization"):
+                columns = None if summary_only else project(columns_from_rows(rows, PREDICTION_RECORD_FIELDS), selected)
+                response = formatted_response(response_format, envelope, columns)
+        else:
+            if not summary_only:
+                with request_stage("serialization"):
+                    envelope["predictions"] = prediction_records(rows, selected)
+            response = json_response(envelope, debug=debug, fast=True)
+            response.headers["Vary"] = "Accept"
+        RESPONSE_CACHE_LOOKUPS.inc(kind="page", result="miss")
+        if not debug:
+            response.headers["ETag"] = etag
+        if use_cache:
+            PREDICTION_CACHE.put(cache_key, response.body, response.media_type, validator=validator)
+        return response
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+def _serialize_scoring_run(run):
+    return {
+        "id": run.id,
+        "source": run.source,
+        "status": run.status,
+        "model_version": run.model_version,
+        "row_count": run.row_count,
+        "stage_timings": run.stage_timings,
+        "started_at": run.started_at.isoformat() if run.started_at else None,
+        "finished_at": run.finished_at.isoformat() if run.finished_at else None
+    }
+
+
+@app.get("/scoring_runs")
+async def get_scoring_runs(db: Session = Depends(get_db), skip: int = 0, limit: int = 100):
     try:
-        predictions = db.query(Prediction).offset(skip).limit(limit).all()
-        total = db.query(Prediction).count()
+        runs = db.query(ScoringRun).order_by(ScoringRun.id.desc()).offset(skip).limit(limit).all()
+        total = db.query(ScoringRun).count()
 
         return {
             "success": True,
             "total": total,
             "skip": skip,
             "limit": limit,
-            "predictions": [
-                {
-                    "id": pred.id,
-                    "employee_id": pred.employee_id,
-                    "prediction": pred.prediction,
-                    "probability": pred.probability,
-                    "probabilities": pred.probabilities,
-                    "created_at": pred.created_at.isoformat() if pred.created_at else None
-                }
-                for pred in predictions
-            ]
+            "scoring_runs": [_serialize_scoring_run(run) for run in runs]
         }
     except Exception as e:
         return JSONResponse(
@@ -265,10 +795,336 @@ async def get_all_predictions(db: Session = Depends(get_db), skip: int = 0, limi
         )
 
 
+@app.get("/scoring_runs/{run_id}")
+async def get_scoring_run(run_id: int, db: Session = Depends(get_db)):
+    try:
+        run = db.query(ScoringRun).filter(ScoringRun.id == run_id).first()
+
+        if not run:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "success": False,
+                    "error": f"Exécution de scoring avec l'ID {run_id} non trouvée"
+                }
+            )
+
+        return {"success": True, "scoring_run": _serialize_scoring_run(run)}
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+@app.get("/scoring_runs/{run_id}/predictions")
+async def get_scoring_run_predictions(
+    run_id: int,
+    db: Session = Depends(get_db),
+    after_id: int = 0,
+    limit: int = 100
+):
+    """Pagination par clé (after_id) sur l'index (scoring_run_id, id)."""
+    try:
+        run = db.query(ScoringRun).filter(ScoringRun.id == run_id).first()
+
+        if not run:
+            return JSONResponse(
+                status_code=404,
+                content={
+                    "success": False,
+                    "error": f"Exécution de scoring avec l'ID {run_id} non trouvée"
+                }
+            )
+
+        rows = (
+            db.query(*PREDICTION_RECORD_COLUMNS)
+            .filter(Prediction.scoring_run_id == run_id, Prediction.id > after_id)
+            .order_by(Prediction.id)
+            .limit(limit)
+            .all()
+        )
+
+        return FastJSONResponse(content={
+            "success": True,
+            "scoring_run_id": run_id,
+            "total": run.row_count,
+            "after_id": after_id,
+            "limit": limit,
+            "next_after_id": rows[-1].id if len(rows) == limit else None,
+            "predictions": prediction_records(rows)
+        })
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+@app.get("/predictions/export")
+async def export_predictions(
+    db: Session = Depends(get_db),
+    format: Literal["csv", "ndjson", "parquet"] = "csv",
+    gzip: bool = False,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    scoring_run_id: Optional[int] = None,
+    batch_size: int = 5000
+):
+    """Export en flux de toute la table (ou d'une plage) depuis un curseur côté serveur."""
+    if format == "parquet" and not parquet_available():
+        return JSONResponse(
+            status_code=501,
+            content={
+                "success": False,
+                "error": "L'export Parquet nécessite le paquet pyarrow"
+            }
+        )
+
+    stmt = build_export_query(start=start, end=end, scoring_run_id=scoring_run_id)
+    filename = f"predictions.{format}" + (".gz" if gzip else "")
+    return StreamingResponse(
+        stream_export(db, format, stmt, gzip=gzip, batch_size=max(1, batch_size)),
+        media_type="application/gzip" if gzip else MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@app.get("/predictions/latest")
+async def get_latest_predictions(
+    db: Session = Depends(get_db),
+    risk_level: Optional[Literal["HIGH", "LOW"]] = None,
+    skip: int = 0,
+    limit: int = 100,
+    order: Literal["asc", "desc"] = "desc",
+    debug: bool = False
+):
+    begin_handler()
+    try:
+        with request_stage("db_read"):
+            query = db.query(LatestPrediction)
+            if risk_level is not None:
+                query = query.filter(LatestPrediction.risk_level == risk_level)
+
+            total = query.count()
+            sort_key = LatestPrediction.probability.asc() if order == "asc" else LatestPrediction.probability.desc()
+            latest = (
+                query.with_entities(*LATEST_RECORD_COLUMNS)
+                .order_by(sort_key, LatestPrediction.employee_id)
+                .offset(skip)
+                .limit(limit)
+                .all()
+            )
+
+        with request_stage("serialization"):
+            content = {
+                "success": True,
+                "total": total,
+                "skip": skip,
+                "limit": limit,
+                "predictions": [row._asdict() for row in latest]
+            }
+        return json_response(content, debug=debug, fast=True)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+@app.get("/predictions/top_risk")
+async def get_top_risk(
+    db: Session = Depends(get_db),
+    k: int = 20,
+    source: Literal["latest", "score"] = "latest",
+    departement: Optional[str] = None,
+    poste: Optional[str] = None,
+    debug: bool = False
+):
+    """Les ``k`` employés les plus à risque, depuis les dernières prédictions ou un scoring."""
+    begin_handler()
+    max_k = top_risk_max_k()
+    if not 1 <= k <= max_k:
+        return JSONResponse(status_code=400, content={"success": False, "error": f"k doit être compris entre 1 et {max_k}"})
+    if source == "score" and pipeline is None:
+        return JSONResponse(
+            status_code=503,
+            content={
+                "success": False,
+                "error": "Le modèle n'est pas chargé. Vérifiez que full_pipeline.joblib existe."
+            }
+        )
+
+    try:
+        if source == "latest":
+            with request_stage("db_read"):
+                top = latest_top_risk(db, k, departement=departement, poste=poste)
+        else:
+            timer = StageTimer(on_stage=_scoring_observer("top_risk"))
+            merged_df, X = _load_population(
+                timer,
+                departement=None if departement is None else [departement],
+                poste=None if poste is None else [poste],
+            )
+            if len(X) == 0:
+                top = []
+            else:
+                with timer.stage("predict_proba"):
+                    probabilities_full = pipeline.predict_proba(X)
+                with timer.stage("build_results"):
+                    top = scored_top_risk(
+                        merged_df['id_employee'].values,
+                        probabilities_full.argmax(axis=1),
+                        probabilities_full[:, 1],
+                        k,
+                        merged_df['departement'].values,
+                        merged_df['poste'].values,
+                    )
+
+        return json_response({
+            "success": True,
+            "source": source,
+            "k": k,
+            "count": len(top),
+            "predictions": top
+        }, debug=debug)
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+@app.get("/statistics")
+async def get_statistics(
+    db: Session = Depends(get_db),
+    source: Literal["latest", "history"] = "latest",
+    group_by: Optional[Literal["departement", "poste", "date"]] = None,
+    buckets: int = 10,
+    departement: Optional[str] = None,
+    poste: Optional[str] = None,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    debug: bool = False
+):
+    """Statistiques de risque agrégées en SQL (comptes, moyenne, histogramme) par groupe."""
+    begin_handler()
+    if not 1 <= buckets <= MAX_BUCKETS:
+        return JSONResponse(status_code=400, content={"success": False, "error": f"buckets doit être compris entre 1 et {MAX_BUCKETS}"})
+
+    use_cache = response_cache_enabled() and not debug
+    cache_key = ("statistics", source, group_by, buckets, departement, poste, start, end)
+    try:
+        cached = PREDICTION_CACHE.get(cache_key) if use_cache else None
+        if cached is not None:
+            RESPONSE_CACHE_LOOKUPS.inc(kind="statistics", result="hit")
+            return Response(content=cached[0], media_type=cached[1])
+
+        with request_stage("db_read"):
+            groups = compute_statistics(
+                db, source, group_by, buckets, departement=departement, poste=poste, start=start, end=end
+            )
+        response = json_response({
+            "success": True,
+            "source": source,
+            "group_by": group_by,
+            "histogram_edges": [round(i / buckets, 4) for i in range(buckets + 1)],
+            "groups": groups
+        }, debug=debug)
+        RESPONSE_CACHE_LOOKUPS.inc(kind="statistics", result="miss")
+        if use_cache:
+            PREDICTION_CACHE.put(cache_key, response.body, response.media_type)
+        return response
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
+class PredictionSelection(BaseModel):
+    """Prédictions visées par une lecture ou une suppression groupée : ``ids`` ou plage."""
+    ids: Optional[List[int]] = None
+    start_id: Optional[int] = None
+    end_id: Optional[int] = None
+
+
+@app.post("/predictions/bulk_get")
+async def bulk_get_predictions(selection: PredictionSelection, db: Session = Depends(get_db)):
+    """Lecture groupée en flux ; les ids absents sont listés dans ``missing_ids``."""
+    try:
+        parsed = parse_selection(selection.ids, selection.start_id, selection.end_id)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    return StreamingResponse(
+        stream_bulk_get(db, PREDICTION_RECORD_COLUMNS, parsed),
+        media_type="application/json"
+    )
+
+
+@app.post("/predictions/bulk_delete")
+async def bulk_delete_predictions(selection: PredictionSelection, db: Session = Depends(get_db), batch_size: int = 1000):
+    """Suppression groupée, par lots dans des transactions séparées."""
+    begin_handler()
+    try:
+        parsed = parse_selection(selection.ids, selection.start_id, selection.end_id)
+    except ValueError as e:
+        return JSONResponse(status_code=400, content={"success": False, "error": str(e)})
+    try:
+        with request_stage("db_write"):
+            result = bulk_delete(db, parsed, batch_size=max(1, batch_size), on_batch=invalidate_predictions)
+        return json_response({"success": True, **result})
+    except Exception as e:
+        return JSONResponse(
+            status_code=500,
+            content={
+                "success": False,
+                "error": str(e),
+                "error_type": type(e).__name__
+            }
+        )
+
+
 @app.get("/predictions/{prediction_id}")
-async def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
+async def get_prediction(
+    prediction_id: int, db: Session = Depends(get_db), debug: bool = False,
+    if_none_match: Optional[str] = Header(default=None),
+):
+    begin_handler()
+    use_cache = response_cache_enabled() and not debug
+    cache_key = ("prediction", prediction_id)
     try:
-        prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+        cached = PREDICTION_CACHE.get(cache_key) if use_cache else None
+        if cached is not None:
+            etag = etag_for("prediction", cached[0])
+            if etag_matches(if_none_match, etag):
+                RESPONSE_CACHE_LOOKUPS.inc(kind="prediction", result="not_modified")
+                return not_modified(etag)
+            RESPONSE_CACHE_LOOKUPS.inc(kind="prediction", result="hit")
+            return Response(content=cached[0], media_type=cached[1], headers={"ETag": etag})
+
+        with request_stage("db_read"):
+            prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
 
         if not prediction:
             return JSONResponse(
@@ -279,7 +1135,7 @@ async def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
                 }
             )
 
-        return {
+        response = json_response({
             "success": True,
             "prediction": {
                 "id": prediction.id,
@@ -289,7 +1145,19 @@ async def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
                 "probabilities": prediction.probabilities,
                 "created_at": prediction.created_at.isoformat() if prediction.created_at else None
             }
-        }
+        }, debug=debug)
+        if debug:
+            return response
+        # ETag tiré du contenu : un id réattribué à une autre prédiction change d'ETag
+        etag = etag_for("prediction", response.body)
+        if etag_matches(if_none_match, etag):
+            RESPONSE_CACHE_LOOKUPS.inc(kind="prediction", result="not_modified")
+            return not_modified(etag)
+        RESPONSE_CACHE_LOOKUPS.inc(kind="prediction", result="miss")
+        response.headers["ETag"] = etag
+        if use_cache:
+            PREDICTION_CACHE.put(cache_key, response.body, response.media_type)
+        return response
     except Exception as e:
         return JSONResponse(
             status_code=500,
@@ -302,9 +1170,11 @@ async def get_prediction(prediction_id: int, db: Session = Depends(get_db)):
 
 
 @app.delete("/predictions/{prediction_id}")
-async def delete_prediction(prediction_id: int, db: Session = Depends(get_db)):
+async def delete_prediction(prediction_id: int, db: Session = Depends(get_db), debug: bool = False):
+    begin_handler()
     try:
-        prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
+        with request_stage("db_read"):
+            prediction = db.query(Prediction).filter(Prediction.id == prediction_id).first()
 
         if not prediction:
             return JSONResponse(
@@ -315,13 +1185,18 @@ async def delete_prediction(prediction_id: int, db: Session = Depends(get_db)):
                 }
             )
 
-        db.delete(prediction)
-        db.commit()
+        employee_id = prediction.employee_id
+        with request_stage("db_write"):
+            db.delete(prediction)
+            db.flush()
+            refresh_latest_for_employee(db, employee_id)
+            db.commit()
+        invalidate_predictions([prediction_id])
 
-        return {
+        return json_response({
             "success": True,
             "message": f"Prédiction {prediction_id} supprimée avec succès"
-        }
+        }, debug=debug)
     except Exception as e:
         db.rollback()
         return JSONResponse(
@@ -1,18 +1,124 @@
-from sqlalchemy import Column, Integer, Float, DateTime, JSON
+from sqlalchemy import Column, Integer, Float, String, DateTime, JSON, Index, ForeignKey, DDL, event, table, column
 from sqlalchemy.sql import func
-from app.database import Base
+from app.database import Base, IS_POSTGRES
+
+
+class ScoringRun(Base):
+    """Exécution de scoring en masse (un appel à /predict) et ses durées par étape."""
+    __tablename__ = "scoring_runs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    source = Column(String(32), nullable=False, default="predict")
+    status = Column(String(16), nullable=False, default="running")
+    model_version = Column(String(64))
+    row_count = Column(Integer)
+    stage_timings = Column(JSON)
+
+    started_at = Column(DateTime(timezone=True), server_default=func.now())
+    finished_at = Column(DateTime(timezone=True))
+
+    def __repr__(self):
+        return f"<ScoringRun(id={self.id}, source={self.source}, status={self.status}, row_count={self.row_count})>"
+
 
 class Prediction(Base):
     __tablename__ = "predictions"
 
-    id = Column(Integer, primary_key=True, index=True)
+    # Sur PostgreSQL la table est partitionnée par plage sur created_at : la clé de
+    # partition doit alors faire partie de la clé primaire.
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
 
     employee_id = Column(Integer)
     prediction = Column(Integer)
+    # Probabilité de la classe 1 (départ) et de la classe 0 (reste), en colonnes fixes
     probability = Column(Float)
-    probabilities = Column(JSON)
+    probability_class_0 = Column(Float)
+    # Exécution de /predict ayant produit la ligne (NULL pour /predict_one)
+    scoring_run_id = Column(Integer, ForeignKey("scoring_runs.id"))
+
+    created_at = Column(DateTime(timezone=True), server_default=func.now(), primary_key=IS_POSTGRES, index=True)
+
+    __table_args__ = (
+        Index("ix_predictions_employee_created", "employee_id", "created_at"),
+        Index("ix_predictions_scoring_run_id", "scoring_run_id", "id"),
+        # Sous SQLite, AUTOINCREMENT empêche la réutilisation de l'id de la dernière ligne
+        # supprimée (les ETags des prédictions supposent des ids jamais réutilisés)
+        {"postgresql_partition_by": "RANGE (created_at)"} if IS_POSTGRES else {"sqlite_autoincrement": True},
+    )
+
+    @property
+    def probabilities(self):
+        """Tableau [P(reste), P(part)], reconstruit depuis les colonnes par classe."""
+        if self.probability is None or self.probability_class_0 is None:
+            return None
+        return [self.probability_class_0, self.probability]
 
-    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    @probabilities.setter
+    def probabilities(self, values):
+        if values is None:
+            self.probability_class_0 = None
+            return
+        self.probability_class_0 = float(values[0])
+        self.probability = float(values[1])
 
     def __repr__(self):
         return f"<Prediction(id={self.id}, employee_id={self.employee_id}, prediction={self.prediction}, probability={self.probability})>"
+
+
+if IS_POSTGRES:
+    # Une table partitionnée sans partition refuse les insertions : la partition par
+    # défaut est créée avec la table, les partitions mensuelles par app.utils.retention.
+    event.listen(
+        Prediction.__table__,
+        "after_create",
+        DDL("CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT"),
+    )
+
+
+class LatestPrediction(Base):
+    """Dernière prédiction connue pour chaque employé (une ligne par employé)."""
+    __tablename__ = "latest_predictions"
+
+    employee_id = Column(Integer, primary_key=True)
+    prediction_id = Column(Integer, nullable=False)
+    prediction = Column(Integer)
+    probability = Column(Float)
+    risk_level = Column(String(8))
+
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index("ix_latest_predictions_risk_probability", "risk_level", "probability"),
+        Index("ix_latest_predictions_probability", "probability"),
+    )
+
+    def __repr__(self):
+        return f"<LatestPrediction(employee_id={self.employee_id}, prediction_id={self.prediction_id}, probability={self.probability}, risk_level={self.risk_level})>"
+
+
+class FeatureStoreState(Base):
+    """
+    État de la table ``employee_features`` (écrite par pandas, sans modèle ORM) : version
+    du calcul des features et empreinte des tables sources couvertes (``source_checksums``).
+    """
+    __tablename__ = "feature_store_state"
+
+    id = Column(Integer, primary_key=True)
+    schema_version = Column(Integer, nullable=False)
+    source_checksums = Column(JSON)
+    row_count = Column(Integer)
+
+    refreshed_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def __repr__(self):
+        return f"<FeatureStoreState(schema_version={self.schema_version}, row_count={self.row_count})>"
+
+
+# Table source chargée par init_db (pandas), sans modèle ORM : colonnes utilisées
+# pour les jointures sur les dimensions employé (département, poste)
+SIRH_DIMENSIONS = table(
+    "extrait_sirh",
+    column("id_employee"),
+    column("departement"),
+    column("poste"),
+)
@@ -0,0 +1,31 @@
+"""
+Accès aux outils d'administration (profilage, diagnostics mémoire).
+
+Si ``ADMIN_TOKEN`` est défini, les requêtes doivent porter l'en-tête
+``X-Admin-Token`` correspondant ; sinon l'accès n'est contrôlé que par les
+variables d'activation de chaque outil (ex. ``PROFILING_ENABLED``). Les outils
+actifs par défaut (``/admin/queries``) exigent un jeton configuré.
+"""
+import hmac
+import os
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def admin_token():
+    return os.getenv("ADMIN_TOKEN") or None
+
+
+def env_flag(name, default="false"):
+    return os.getenv(name, default).lower() in ("1", "true", "yes")
+
+
+def is_admin(token, require_token=False):
+    """
+    Vrai si ``token`` (valeur de l'en-tête ``X-Admin-Token``) donne accès aux outils.
+    Avec ``require_token``, l'accès est refusé tant qu'aucun ``ADMIN_TOKEN`` n'est défini.
+    """
+    expected = admin_token()
+    if expected is None:
+        return not require_token
+    return token is not None and hmac.compare_digest(token, expected)
@@ -0,0 +1,132 @@
+"""
+Lecture et suppression groupées de prédictions, par liste d'ids ou par plage d'ids.
+
+Les ids demandés sont lus par lots de ``IN_CHUNK_SIZE`` dans une requête ``IN`` (ou
+une seule requête ``BETWEEN`` pour une plage), qui passe par l'index de la clé
+primaire. Une demande est limitée à ``BULK_MAX_IDS`` ids (défaut 10 000), plage
+comprise. La lecture est rendue en flux : le tableau ``predictions`` est émis lot par
+lot, puis ``found`` et ``missing_ids``.
+
+La suppression se fait par lots, chacun dans sa propre transaction. Un échec ne défait
+donc que le lot en cours.
+"""
+import os
+from sqlalchemy import delete, select
+from app.models import Prediction
+from app.utils.export import iter_batches
+from app.utils.fast_json import dumps, prediction_records
+from app.utils.latest_predictions import refresh_latest_for_employees
+
+IN_CHUNK_SIZE = 1000
+
+
+def bulk_max_ids():
+    return int(os.getenv("BULK_MAX_IDS", "10000"))
+
+
+def parse_selection(ids=None, start_id=None, end_id=None, max_ids=None):
+    """
+    Sélection ``("ids", ids triés sans doublon)`` ou ``("range", (début, fin))`` (bornes
+    incluses). ``ValueError`` si la demande est ambiguë, vide ou trop grande.
+    """
+    max_ids = bulk_max_ids() if max_ids is None else max_ids
+    has_range = start_id is not None or end_id is not None
+    if (ids is not None) == has_range:
+        raise ValueError("Indiquer soit ids, soit start_id et end_id")
+    if has_range:
+        if start_id is None or end_id is None or end_id < start_id:
+            raise ValueError("La plage doit avoir start_id <= end_id")
+        if end_id - start_id + 1 > max_ids:
+            raise ValueError(f"Plage trop large (maximum {max_ids} ids)")
+        return "range", (start_id, end_id)
+    unique_ids = sorted(set(ids))
+    if not unique_ids:
+        raise ValueError("La liste ids est vide")
+    if len(unique_ids) > max_ids:
+        raise ValueError(f"Trop d'ids ({len(unique_ids)}, maximum {max_ids})")
+    return "ids", unique_ids
+
+
+def requested_ids(selection):
+    kind, value = selection
+    return range(value[0], value[1] + 1) if kind == "range" else value
+
+
+def iter_rows(db, columns, selection, chunk_size=IN_CHUNK_SIZE):
+    """Lignes (``columns``) des prédictions sélectionnées, par lots, triées par id."""
+    kind, value = selection
+    if kind == "range":
+        stmt = select(*columns).where(Prediction.id.between(*value)).order_by(Prediction.id)
+        yield from iter_batches(db, stmt, chunk_size)
+        return
+    for start in range(0, len(value), chunk_size):
+        chunk = value[start:start + chunk_size]
+        yield db.execute(select(*columns).where(Prediction.id.in_(chunk)).order_by(Prediction.id)).all()
+
+
+def stream_bulk_get(db, columns, selection, chunk_size=IN_CHUNK_SIZE):
+    """
+    Générateur d'octets JSON : ``{"success", "predictions": [...], "found", "missing_ids"}``.
+    ``columns`` suit l'ordre attendu par ``prediction_records``.
+    """
+    found = set()
+    separator = b""
+    yield b'{"success":true,"predictions":['
+    for batch in iter_rows(db, columns, selection, chunk_size):
+        if not batch:
+            continue
+        found.update(row[0] for row in batch)
+        yield separator + dumps(prediction_records(batch))[1:-1]
+        separator = b","
+    missing = [prediction_id for prediction_id in requested_ids(selection) if prediction_id not in found]
+    yield b"]," + dumps({"found": len(found), "missing_ids": missing})[1:]
+
+
+def _existing_batches(db, selection, batch_size):
+    """Lots ``[(id, employee_id), ...]`` de prédictions existantes dans la sélection."""
+    kind, value = selection
+    if kind == "ids":
+        for start in range(0, len(value), batch_size):
+            chunk = value[start:start + batch_size]
+            yield db.execute(select(Prediction.id, Prediction.employee_id).where(Prediction.id.in_(chunk))).all()
+        return
+    # Plage : pagination par clé (id > dernier id vu) plutôt que OFFSET
+    last_id = value[0] - 1
+    while True:
+        batch = db.execute(
+            select(Prediction.id, Prediction.employee_id)
+            .where(Prediction.id > last_id, Prediction.id <= value[1])
+            .order_by(Prediction.id)
+            .limit(batch_size)
+        ).all()
+        if not batch:
+            return
+        last_id = batch[-1][0]
+        yield batch
+
+
+def bulk_delete(db, selection, batch_size=IN_CHUNK_SIZE, on_batch=None):
+    """
+    Supprime les prédictions sélectionnées par lots, un commit par lot, et remet à jour
+    ``latest_predictions`` des employés concernés. ``on_batch(ids)`` est appelé après
+    chaque commit. Renvoie ``{"deleted", "missing_ids", "batches"}``.
+    """
+    deleted = set()
+    batches = 0
+    for batch in _existing_batches(db, selection, batch_size):
+        if not batch:
+            continue
+        ids = [row[0] for row in batch]
+        try:
+            db.execute(delete(Prediction).where(Prediction.id.in_(ids)))
+            refresh_latest_for_employees(db, (row[1] for row in batch))
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        deleted.update(ids)
+        batches += 1
+        if on_batch is not None:
+            on_batch(ids)
+    missing = [prediction_id for prediction_id in requested_ids(selection) if prediction_id not in deleted]
+    return {"deleted": len(deleted), "missing_ids": missing, "batches": batches}
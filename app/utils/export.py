@@ -0,0 +1,173 @@
+"""
+Export en flux de la table ``predictions`` (CSV, NDJSON ou Parquet, gzip optionnel).
+
+Les lignes sont lues par lots depuis un curseur côté serveur (``stream_results``)
+et encodées lot par lot : la mémoire reste constante quelle que soit la taille
+de la table. Parquet nécessite ``pyarrow`` (dépendance optionnelle).
+"""
+import csv
+import io
+import json
+import zlib
+from sqlalchemy import select
+from app.models import Prediction
+
+EXPORT_COLUMNS = [
+    "id", "employee_id", "prediction", "probability", "probability_class_0",
+    "scoring_run_id", "created_at",
+]
+
+MEDIA_TYPES = {
+    "csv": "text/csv",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    pa = None
+    pq = None
+
+
+def parquet_available():
+    return pq is not None
+
+
+def build_export_query(start=None, end=None, scoring_run_id=None):
+    stmt = select(*[getattr(Prediction, column) for column in EXPORT_COLUMNS]).order_by(Prediction.id)
+    if start is not None:
+        stmt = stmt.where(Prediction.created_at >= start)
+    if end is not None:
+        stmt = stmt.where(Prediction.created_at < end)
+    if scoring_run_id is not None:
+        stmt = stmt.where(Prediction.scoring_run_id == scoring_run_id)
+    return stmt
+
+
+def iter_batches(db, stmt, batch_size=5_000):
+    """Itère sur les lignes par lots, via un curseur côté serveur."""
+    result = db.execute(stmt.execution_options(stream_results=True, yield_per=batch_size))
+    try:
+        for batch in result.partitions():
+            yield batch
+    finally:
+        result.close()
+
+
+def _isoformat(value):
+    return value.isoformat() if value is not None else None
+
+
+def _encode_csv(batches):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(EXPORT_COLUMNS)
+    for batch in batches:
+        for row in batch:
+            writer.writerow(row[:-1] + (_isoformat(row[-1]),))
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def _encode_ndjson(batches):
+    for batch in batches:
+        lines = []
+        for id_, employee_id, prediction, probability, probability_class_0, run_id, created_at in batch:
+            lines.append(json.dumps({
+                "id": id_,
+                "employee_id": employee_id,
+                "prediction": prediction,
+                "probability": probability,
+                "probabilities": [probability_class_0, probability] if probability_class_0 is not None else None,
+                "scoring_run_id": run_id,
+                "created_at": _isoformat(created_at),
+            }))
+        lines.append("")
+        yield "\n".join(lines).encode("utf-8")
+
+
+class _ChunkSink(io.RawIOBase):
+    """Flux d'écriture qui garde les octets écrits jusqu'au prochain ``drain``."""
+
+    def __init__(self):
+        self._chunks = []
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks = []
+        return data
+
+
+_PARQUET_SCHEMA = None
+
+
+def _parquet_schema():
+    global _PARQUET_SCHEMA
+    if _PARQUET_SCHEMA is None:
+        _PARQUET_SCHEMA = pa.schema([
+            ("id", pa.int64()),
+            ("employee_id", pa.int64()),
+            ("prediction", pa.int64()),
+            ("probability", pa.float64()),
+            ("probability_class_0", pa.float64()),
+            ("scoring_run_id", pa.int64()),
+            ("created_at", pa.timestamp("us", tz="UTC")),
+        ])
+    return _PARQUET_SCHEMA
+
+
+def _encode_parquet(batches):
+    schema = _parquet_schema()
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for batch in batches:
+            columns = list(zip(*batch))
+            table = pa.table(
+                [pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                schema=schema,
+            )
+            writer.write_table(table)
+            yield sink.drain()
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+ENCODERS = {
+    "csv": _encode_csv,
+    "ndjson": _encode_ndjson,
+    "parquet": _encode_parquet,
+}
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def stream_export(db, export_format, stmt, gzip=False, batch_size=5_000):
+    """Générateur d'octets de l'export complet, prêt pour une ``StreamingResponse``."""
+    chunks = (chunk for chunk in ENCODERS[export_format](iter_batches(db, stmt, batch_size)) if chunk)
+    return _gzip(chunks) if gzip else chunks
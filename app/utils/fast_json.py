@@ -0,0 +1,118 @@
+"""
+Rendu JSON rapide des réponses volumineuses (``/predict``, listes de prédictions).
+
+Deux leviers, mesurés par ``benchmarks/bench_json.py`` (100 000 lignes) :
+
+* les résultats sont construits à partir des tableaux numpy convertis colonne par
+  colonne (``tolist``, ``np.round``, ``np.where``) et des lignes SQL brutes, au lieu
+  de convertir chaque valeur en Python (``int()``, ``bool()``, ``round()``,
+  ``isoformat()``) ligne par ligne ;
+* l'encodage passe par ``orjson`` s'il est installé (dépendance optionnelle,
+  ``pip install orjson``), qui sérialise aussi nativement dates et scalaires numpy.
+
+``JSON_ENCODER`` choisit l'encodeur : ``auto`` (défaut : orjson si disponible),
+``orjson`` ou ``json`` (bibliothèque standard). Chaque endpoint choisit sa réponse :
+``FastJSONResponse`` pour les listes volumineuses, ``JSONResponse`` ailleurs. Le corps
+produit est identique à celui de ``JSONResponse``.
+"""
+import json
+import os
+from datetime import date, datetime
+import numpy as np
+from fastapi.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    orjson = None
+
+_ORJSON_OPTIONS = (orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS) if orjson is not None else 0
+
+
+def orjson_available():
+    return orjson is not None
+
+
+def json_encoder():
+    """Encodeur effectif : ``orjson`` ou ``json``."""
+    choice = os.getenv("JSON_ENCODER", "auto").lower()
+    if choice == "json" or orjson is None:
+        return "json"
+    return "orjson"
+
+
+def _default(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Type non sérialisable en JSON: {type(value).__name__}")
+
+
+def dumps(content, encoder=None):
+    """Encode ``content`` en octets JSON compacts (mêmes séparateurs que ``JSONResponse``)."""
+    if (encoder or json_encoder()) == "orjson":
+        return orjson.dumps(content, option=_ORJSON_OPTIONS)
+    return json.dumps(
+        content, ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":"), default=_default
+    ).encode("utf-8")
+
+
+class FastJSONResponse(JSONResponse):
+    """``JSONResponse`` encodée par ``dumps`` (orjson si disponible)."""
+
+    def render(self, content):
+        return dumps(content)
+
+
+SCORING_FIELDS = ("employee_id", "employee_index", "will_leave", "probability", "risk_level")
+
+
+def scoring_columns(employee_ids, predictions, probabilities, risk_levels):
+    """Colonnes de ``/predict`` (``SCORING_FIELDS``) à partir des tableaux de l'inférence."""
+    return {
+        "employee_id": np.asarray(employee_ids).astype(np.int64),
+        "employee_index": np.arange(len(employee_ids)),
+        "will_leave": np.asarray(predictions) != 0,
+        "probability": np.round(np.asarray(probabilities, dtype=float), 3),
+        "risk_level": np.asarray(risk_levels).tolist(),
+    }
+
+
+def rows_from_columns(columns):
+    """Un objet par ligne à partir de colonnes ``{nom: tableau numpy ou liste}``."""
+    names = list(columns)
+    values = [value.tolist() if isinstance(value, np.ndarray) else value for value in columns.values()]
+    return [dict(zip(names, row)) for row in zip(*values)]
+
+
+def scoring_results(employee_ids, predictions, probabilities, risk_levels):
+    """
+    Résultats de ``/predict`` (un objet par employé) construits colonne par colonne :
+    chaque tableau numpy est converti une fois en liste Python.
+    """
+    return rows_from_columns(scoring_columns(employee_ids, predictions, probabilities, risk_levels))
+
+
+def prediction_records(rows, fields=None):
+    """
+    Lignes ``(id, employee_id, prediction, probability, probability_class_0, created_at)``
+    au format de ``/predictions`` ; les dates restent des ``datetime`` (encodées par ``dumps``).
+    ``fields`` restreint chaque objet aux champs demandés.
+    """
+    records = [
+        {
+            "id": id_,
+            "employee_id": employee_id,
+            "prediction": prediction,
+            "probability": probability,
+            "probabilities": [class_0, probability] if probability is not None and class_0 is not None else None,
+            "created_at": created_at,
+        }
+        for id_, employee_id, prediction, probability, class_0, created_at in rows
+    ]
+    if fields is None:
+        return records
+    return [{name: record[name] for name in fields} for record in records]
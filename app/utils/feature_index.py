@@ -0,0 +1,130 @@
+"""
+Index en mémoire des features prétraitées, par ``id_employee`` (``GET /employees/{id}/risk``).
+
+L'index contient les lignes de features produites par ``preprocess_input`` à partir des
+tables ``extrait_*`` jointes, avec le département et le poste de chaque employé. Les
+probabilités de toute la population sont calculées en un seul ``predict_proba`` à la
+première lecture, pour chaque modèle. Elles sont ensuite gardées avec l'index. Une
+lecture se réduit alors à une recherche dans un dictionnaire, en quelques microsecondes.
+
+L'index est reconstruit quand les tables sources changent. Leur empreinte (nombre de
+lignes et somme de contrôle du contenu, voir ``source_checksums``) est relue au plus
+toutes les ``FEATURE_INDEX_CHECK_SECONDS`` secondes (défaut 30). Un changement fait par
+un autre processus, même à nombre de lignes constant, devient donc visible après au
+plus ce délai.
+"""
+import os
+import threading
+import time
+from datetime import datetime, timezone
+import numpy as np
+from app.utils.feature_store import source_checksums
+from app.utils.latest_predictions import risk_level_for
+from app.utils.metrics import Counter
+
+FEATURE_INDEX_LOOKUPS = Counter(
+    "feature_index_lookups_total",
+    "Lectures de l'index de features (found, missing)",
+    ["result"],
+)
+FEATURE_INDEX_BUILDS = Counter(
+    "feature_index_builds_total",
+    "Reconstructions de l'index de features",
+)
+
+
+def feature_index_check_seconds():
+    return float(os.getenv("FEATURE_INDEX_CHECK_SECONDS", "30"))
+
+
+def source_fingerprint(db):
+    """Empreinte des tables sources, qui change quand leur contenu change."""
+    return tuple(tuple(table) for table in source_checksums(db.connection()))
+
+
+class _Snapshot:
+    """Features d'une version des tables sources, et scores par modèle."""
+
+    def __init__(self, fingerprint, merged_df, X):
+        self.fingerprint = fingerprint
+        self.features = X
+        employee_ids = X['id_employee'].to_numpy() if len(X) else np.empty(0, dtype=np.int64)
+        self.positions = {employee_id: position for position, employee_id in enumerate(employee_ids.tolist())}
+        self.departements = merged_df['departement'].to_numpy(dtype=object) if len(X) else np.empty(0, dtype=object)
+        self.postes = merged_df['poste'].to_numpy(dtype=object) if len(X) else np.empty(0, dtype=object)
+        self.built_at = datetime.now(timezone.utc)
+        self.model = None
+        self.probabilities = None
+
+
+class FeatureIndex:
+    def __init__(self, check_seconds=None, clock=time.monotonic):
+        self.check_seconds = feature_index_check_seconds() if check_seconds is None else check_seconds
+        self._clock = clock
+        self._snapshot = None
+        self._checked_at = None
+        self._lock = threading.Lock()
+
+    def _fresh(self):
+        return (
+            self._snapshot is not None
+            and self._checked_at is not None
+            and self._clock() - self._checked_at < self.check_seconds
+        )
+
+    def refresh(self, db, load):
+        """
+        Reconstruit l'index avec ``load()`` -> ``(merged_df, X)`` si les tables sources ont
+        changé depuis la dernière construction. Renvoie True en cas de reconstruction.
+        """
+        if self._fresh():
+            return False
+        with self._lock:
+            if self._fresh():
+                return False
+            fingerprint = source_fingerprint(db)
+            self._checked_at = self._clock()
+            if self._snapshot is not None and self._snapshot.fingerprint == fingerprint:
+                return False
+            merged_df, X = load()
+            self._snapshot = _Snapshot(fingerprint, merged_df, X)
+            FEATURE_INDEX_BUILDS.inc()
+            return True
+
+    def _probabilities(self, snapshot, model):
+        if snapshot.model is not model:
+            with self._lock:
+                if snapshot.model is not model:
+                    snapshot.probabilities = np.asarray(model.predict_proba(snapshot.features), dtype=float)
+                    snapshot.model = model
+        return snapshot.probabilities
+
+    def risk(self, employee_id, model):
+        """Risque de l'employé ``employee_id`` selon ``model``, ou None s'il est absent de l'index."""
+        snapshot = self._snapshot
+        position = None if snapshot is None else snapshot.positions.get(employee_id)
+        if position is None:
+            FEATURE_INDEX_LOOKUPS.inc(result="missing")
+            return None
+        FEATURE_INDEX_LOOKUPS.inc(result="found")
+        probabilities = self._probabilities(snapshot, model)[position]
+        probability = float(probabilities[1])
+        return {
+            "employee_id": employee_id,
+            "departement": snapshot.departements[position],
+            "poste": snapshot.postes[position],
+            "prediction": {
+                "will_leave": bool(probabilities.argmax()),
+                "probability": round(probability, 3),
+                "risk_level": risk_level_for(probability),
+            },
+            "features_built_at": snapshot.built_at.isoformat(),
+        }
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+            self._checked_at = None
+
+
+FEATURE_INDEX = FeatureIndex()
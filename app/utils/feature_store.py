@@ -0,0 +1,190 @@
+"""
+Table ``employee_features`` : features prétraitées, prêtes pour le modèle, une ligne par employé.
+
+``preprocess_input`` (renommages, extraction des ids, jointures, conversions de texte,
+ratios dérivés) est appliqué une fois, à l'ingestion des CSV (``app/init_db.py``,
+``data/create_db.py``), et son résultat est gardé dans ``employee_features``. Le scoring
+en masse (``/predict``, ``/predict/cohort``, ``/predictions/top_risk?source=score``,
+l'index de ``/employees/{id}/risk``) lit alors cette seule table au lieu de joindre et
+transformer les trois tables ``extrait_*``.
+
+La mise à jour est incrémentale : chaque ligne porte une empreinte de ses features
+(``row_hash``). Seules les lignes nouvelles ou modifiées sont écrites, celles des
+employés disparus sont supprimées. ``FEATURE_SCHEMA_VERSION`` est à incrémenter à chaque
+changement du calcul des features : une table d'une autre version, ou dont les colonnes
+diffèrent, est alors reconstruite entièrement à l'ingestion suivante et ignorée d'ici là.
+
+La table n'est lue que si les tables sources ont toujours l'empreinte relevée à sa
+dernière mise à jour (nombre de lignes et somme de contrôle du contenu de chaque table,
+voir ``source_checksums``) ; sinon le scoring repart des tables brutes. Toute écriture
+dans les tables sources, quel que soit le processus qui la fait, rend donc la table
+inutilisable jusqu'à la mise à jour suivante. Les lignes sont lues dans l'ordre de
+``extrait_sirh`` (``source_position``), celui du chargement depuis les tables brutes.
+``FEATURE_STORE_ENABLED=false`` désactive la lecture.
+"""
+import zlib
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, delete, insert, inspect, select, text
+from sqlalchemy.exc import SQLAlchemyError
+from app.models import FeatureStoreState
+from app.utils.admin import env_flag
+from app.utils.metrics import Counter
+from app.utils.preprocessing import cohort_query, cohort_where, preprocess_input
+from app.utils.query_timing import instrument_engine
+
+FEATURE_TABLE = "employee_features"
+FEATURE_SCHEMA_VERSION = 1
+SOURCE_TABLES = ("extrait_sirh", "extrait_eval", "extrait_sondage")
+DELETE_CHUNK_SIZE = 1000
+
+FEATURE_STORE_READS = Counter(
+    "feature_store_reads_total",
+    "Chargements servis par employee_features (hit) ou par les tables brutes (stale)",
+    ["result"],
+)
+
+
+def feature_store_enabled():
+    return env_flag("FEATURE_STORE_ENABLED", "true")
+
+
+def _row_checksum(*values):
+    return zlib.crc32(repr(values).encode())
+
+
+def _checksum_sql(connection, table):
+    """Expression SQL de la somme de contrôle (32 bits par ligne) des lignes de ``table``."""
+    if connection.dialect.name == "postgresql":
+        return "hashtext(CAST(t AS TEXT))"
+    columns = ", ".join(f'"{column["name"]}"' for column in inspect(connection).get_columns(table))
+    return f"row_checksum({columns})"
+
+
+def source_checksums(connection):
+    """
+    ``[nombre de lignes, somme de contrôle]`` de chaque table source, en une requête.
+    Une insertion, une modification ou une suppression change l'une ou l'autre. Sous
+    SQLite, la somme de contrôle passe par une fonction enregistrée sur la connexion.
+    """
+    if connection.dialect.name == "sqlite":
+        connection.connection.dbapi_connection.create_function(
+            "row_checksum", -1, _row_checksum, deterministic=True
+        )
+    rows = connection.execute(text(" UNION ALL ".join(
+        f"SELECT {position} AS position, count(*), coalesce(sum({_checksum_sql(connection, table)}), 0) FROM {table} t"
+        for position, table in enumerate(SOURCE_TABLES)
+    ))).all()
+    return [[int(count), int(checksum)] for _, count, checksum in sorted(rows)]
+
+
+def feature_rows(X):
+    """
+    Features ``X`` avec l'empreinte de chaque ligne, sa position dans ``X`` et la
+    version du schéma.
+    """
+    rows = X.reset_index(drop=True)
+    rows["row_hash"] = pd.util.hash_pandas_object(rows, index=False).to_numpy().view(np.int64)
+    rows["source_position"] = np.arange(len(rows), dtype=np.int64)
+    rows["schema_version"] = FEATURE_SCHEMA_VERSION
+    return rows
+
+
+def _replace_table(conn, rows):
+    rows.to_sql(FEATURE_TABLE, conn, if_exists="replace", index=False)
+    conn.execute(text(f"CREATE INDEX ix_{FEATURE_TABLE}_id_employee ON {FEATURE_TABLE} (id_employee)"))
+
+
+def _delete_employees(conn, employee_ids):
+    for start in range(0, len(employee_ids), DELETE_CHUNK_SIZE):
+        params = {"id_employee": employee_ids[start:start + DELETE_CHUNK_SIZE]}
+        conn.execute(cohort_query(f"DELETE FROM {FEATURE_TABLE} WHERE id_employee IN :id_employee", params), params)
+
+
+def refresh_feature_store(engine, eval_df, sirh_df, sondage_df):
+    """
+    Met à jour ``employee_features`` depuis les tables sources (DataFrames tels qu'écrits
+    dans ``extrait_*``), en une transaction. Renvoie ``{"written", "removed", "unchanged",
+    "rebuilt"}``.
+    """
+    rows = feature_rows(preprocess_input(eval_df, sirh_df, sondage_df))
+    state_table = FeatureStoreState.__table__
+    with engine.begin() as conn:
+        inspector = inspect(conn)
+        if inspector.has_table(state_table.name) and \
+                {c["name"] for c in inspector.get_columns(state_table.name)} != set(state_table.c.keys()):
+            # Table d'état d'une version antérieure : recréée, et employee_features reconstruite
+            state_table.drop(conn)
+        state_table.create(conn, checkfirst=True)
+        state = conn.execute(select(state_table.c.schema_version)).first()
+        columns = [c["name"] for c in inspector.get_columns(FEATURE_TABLE)] if inspector.has_table(FEATURE_TABLE) else None
+        rebuilt = state is None or state.schema_version != FEATURE_SCHEMA_VERSION or columns != list(rows.columns)
+
+        if len(rows) == 0:
+            conn.execute(text(f"DROP TABLE IF EXISTS {FEATURE_TABLE}"))
+            report = {"written": 0, "removed": 0, "unchanged": 0, "rebuilt": True}
+        elif rebuilt:
+            _replace_table(conn, rows)
+            report = {"written": len(rows), "removed": 0, "unchanged": 0, "rebuilt": True}
+        else:
+            stored = pd.read_sql(text(f"SELECT id_employee, row_hash, source_position FROM {FEATURE_TABLE}"), conn)
+            stored_hashes = dict(zip(stored["id_employee"].tolist(), stored["row_hash"].tolist()))
+            stored_positions = dict(zip(stored["id_employee"].tolist(), stored["source_position"].tolist()))
+            # Une ligne déplacée dans extrait_sirh est réécrite pour garder l'ordre des tables brutes
+            changed = rows[
+                (rows["id_employee"].map(stored_hashes) != rows["row_hash"])
+                | (rows["id_employee"].map(stored_positions) != rows["source_position"])
+            ]
+            current = set(rows["id_employee"].tolist())
+            removed = [employee_id for employee_id in stored_hashes if employee_id not in current]
+            modified = [employee_id for employee_id in changed["id_employee"].tolist() if employee_id in stored_hashes]
+            _delete_employees(conn, removed + modified)
+            if len(changed):
+                changed.to_sql(FEATURE_TABLE, conn, if_exists="append", index=False)
+            report = {
+                "written": len(changed), "removed": len(removed),
+                "unchanged": len(rows) - len(changed), "rebuilt": False,
+            }
+
+        conn.execute(delete(state_table))
+        conn.execute(insert(state_table).values(
+            id=1, schema_version=FEATURE_SCHEMA_VERSION, source_checksums=source_checksums(conn), row_count=len(rows),
+        ))
+    return report
+
+
+def load_feature_store(db_url: str, **filters):
+    """
+    Features de la population, ou de la cohorte ``filters`` (voir ``cohort_where``), lues
+    dans ``employee_features``. None si la table est absente, vide, d'une autre version
+    ou en retard sur les tables sources.
+    """
+    engine = instrument_engine(create_engine(db_url))
+    state_table = FeatureStoreState.__table__
+    try:
+        with engine.connect() as conn:
+            state = conn.execute(
+                select(state_table.c.schema_version, state_table.c.source_checksums, state_table.c.row_count)
+            ).first()
+            if (
+                state is None
+                or state.schema_version != FEATURE_SCHEMA_VERSION
+                or not state.row_count
+                or state.source_checksums != source_checksums(conn)
+            ):
+                FEATURE_STORE_READS.inc(result="stale")
+                return None
+            where, params = cohort_where(**filters)
+            X = pd.read_sql(
+                cohort_query(f"SELECT s.* FROM {FEATURE_TABLE} s WHERE {where} ORDER BY s.source_position", params),
+                conn, params=params,
+            )
+    except SQLAlchemyError:
+        # Base antérieure à la table (pas encore d'ingestion depuis sa création)
+        FEATURE_STORE_READS.inc(result="stale")
+        return None
+    finally:
+        engine.dispose()
+
+    FEATURE_STORE_READS.inc(result="hit")
+    return X.drop(columns=["row_hash", "source_position", "schema_version"])
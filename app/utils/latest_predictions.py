@@ -0,0 +1,149 @@
+"""
+Maintenance de la table ``latest_predictions`` (une ligne par employé).
+
+La table est mise à jour de façon incrémentale à chaque écriture de prédictions
+(``/predict`` et ``/predict_one``) pour que les lectures « risque actuel par
+employé » coûtent O(effectif) au lieu de parcourir tout l'historique.
+"""
+import numpy as np
+from sqlalchemy import select, delete, insert, case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from app.models import Prediction, LatestPrediction
+
+RISK_THRESHOLD = 0.50
+# Lignes par INSERT ... ON CONFLICT : 5 paramètres par ligne, bien sous la limite de
+# variables de SQLite (32766), et un même texte de requête pour tous les lots pleins
+UPSERT_BATCH_SIZE = 500
+
+
+def risk_level_for(probability):
+    return "HIGH" if probability > RISK_THRESHOLD else "LOW"
+
+
+def risk_levels_for(probabilities):
+    """Version vectorisée de ``risk_level_for`` (tableau numpy de probabilités)."""
+    return np.where(np.asarray(probabilities) > RISK_THRESHOLD, "HIGH", "LOW")
+
+
+def _dialect_insert(db):
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        return pg_insert
+    if dialect == "sqlite":
+        return sqlite_insert
+    return None
+
+
+def upsert_latest_predictions(db, predictions):
+    """
+    Met à jour ``latest_predictions`` à partir de prédictions déjà flushées (id connu).
+    Les prédictions sans ``employee_id`` sont ignorées. Le commit reste à la charge de l'appelant.
+    """
+    rows = {}
+    for pred in predictions:
+        if pred.employee_id is None:
+            continue
+        current = rows.get(pred.employee_id)
+        if current is None or pred.id > current["prediction_id"]:
+            rows[pred.employee_id] = {
+                "employee_id": pred.employee_id,
+                "prediction_id": pred.id,
+                "prediction": pred.prediction,
+                "probability": pred.probability,
+                "risk_level": risk_level_for(pred.probability),
+            }
+
+    if not rows:
+        return 0
+
+    dialect_insert = _dialect_insert(db)
+    if dialect_insert is None:
+        for row in rows.values():
+            db.merge(LatestPrediction(**row))
+        return len(rows)
+
+    values = list(rows.values())
+    for start in range(0, len(values), UPSERT_BATCH_SIZE):
+        stmt = dialect_insert(LatestPrediction).values(values[start:start + UPSERT_BATCH_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[LatestPrediction.employee_id],
+            set_={
+                "prediction_id": stmt.excluded.prediction_id,
+                "prediction": stmt.excluded.prediction,
+                "probability": stmt.excluded.probability,
+                "risk_level": stmt.excluded.risk_level,
+                "updated_at": func.now(),
+            },
+            # Ne jamais écraser une prédiction plus récente (écritures concurrentes)
+            where=LatestPrediction.prediction_id <= stmt.excluded.prediction_id,
+        )
+        db.execute(stmt)
+    return len(rows)
+
+
+def refresh_latest_for_employee(db, employee_id):
+    """Recalcule la ligne d'un employé depuis l'historique (ex. après une suppression)."""
+    if employee_id is None:
+        return
+    last = (
+        db.query(Prediction)
+        .filter(Prediction.employee_id == employee_id)
+        .order_by(Prediction.id.desc())
+        .first()
+    )
+    db.execute(delete(LatestPrediction).where(LatestPrediction.employee_id == employee_id))
+    if last is not None:
+        upsert_latest_predictions(db, [last])
+
+
+def refresh_latest_for_employees(db, employee_ids):
+    """Version ensembliste de ``refresh_latest_for_employee`` (ex. après une suppression groupée), en SQL."""
+    employee_ids = [employee_id for employee_id in set(employee_ids) if employee_id is not None]
+    if not employee_ids:
+        return
+    latest_ids = (
+        select(func.max(Prediction.id))
+        .where(Prediction.employee_id.in_(employee_ids))
+        .group_by(Prediction.employee_id)
+    )
+    source = select(
+        Prediction.employee_id,
+        Prediction.id,
+        Prediction.prediction,
+        Prediction.probability,
+        case((Prediction.probability > RISK_THRESHOLD, "HIGH"), else_="LOW"),
+    ).where(Prediction.id.in_(latest_ids))
+
+    db.execute(delete(LatestPrediction).where(LatestPrediction.employee_id.in_(employee_ids)))
+    db.execute(
+        insert(LatestPrediction).from_select(
+            ["employee_id", "prediction_id", "prediction", "probability", "risk_level"],
+            source,
+        )
+    )
+
+
+def rebuild_latest_predictions(db):
+    """Reconstruit entièrement ``latest_predictions`` depuis l'historique, en SQL."""
+    latest_ids = (
+        select(func.max(Prediction.id))
+        .where(Prediction.employee_id.isnot(None))
+        .group_by(Prediction.employee_id)
+    )
+    source = select(
+        Prediction.employee_id,
+        Prediction.id,
+        Prediction.prediction,
+        Prediction.probability,
+        case((Prediction.probability > RISK_THRESHOLD, "HIGH"), else_="LOW"),
+    ).where(Prediction.id.in_(latest_ids))
+
+    db.execute(delete(LatestPrediction))
+    db.execute(
+        insert(LatestPrediction).from_select(
+            ["employee_id", "prediction_id", "prediction", "probability", "risk_level"],
+            source,
+        )
+    )
+    return db.query(LatestPrediction).count()
@@ -0,0 +1,284 @@
+"""
+Diagnostics mémoire des scorings ``/predict`` et ``/predict_one`` avec ``tracemalloc``.
+
+Activation : ``MEMORY_DIAGNOSTICS_ENABLED=true`` ou ``ADMIN_TOKEN`` défini. Le suivi
+n'est actif qu'entre ``POST /admin/memory/start`` et ``POST /admin/memory/stop`` :
+``tracemalloc`` ralentit fortement les allocations (un ``/predict`` de 1 000 lignes
+passe de 0,2 s à ~10 s, surtout dans la session ORM), il ne doit pas rester allumé.
+La profondeur de pile conservée (``frames``, défaut 10) permet de rattacher les
+allocations de pandas, numpy ou SQLAlchemy à la ligne de l'application qui les déclenche.
+
+Pendant le suivi, chaque scoring (un à la fois) est enregistré :
+
+* par étape (``load``, ``merge``, ``preprocess``, ``predict``...) : mémoire Python
+  tracée en fin d'étape, pic pendant l'étape, RSS du processus et pic de RSS
+* les sites d'allocation les plus lourds au point haut du scoring (étape où la
+  mémoire tracée est maximale : DataFrames sources, frame fusionnée, ``X``...) et
+  ceux encore retenus en fin de requête (ex. session ORM), par différence avec
+  l'instantané pris avant le scoring
+
+Les ``MEMORY_RUNS_KEPT`` derniers scorings (défaut 5) sont conservés ; leurs
+instantanés s'exportent au format ``tracemalloc.Snapshot.dump`` pour une analyse
+hors ligne (``tracemalloc.Snapshot.load``).
+"""
+import os
+import sys
+import tempfile
+import threading
+import tracemalloc
+import uuid
+from collections import OrderedDict
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from app.utils.admin import admin_token, env_flag
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TRACKED_PATHS = ("/predict", "/predict_one")
+MB = 1024 * 1024
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+_OWN_FILE = "app/utils/memory_diagnostics.py:"
+
+_current = ContextVar("memory_run", default=None)
+
+
+def memory_diagnostics_enabled():
+    return env_flag("MEMORY_DIAGNOSTICS_ENABLED") or admin_token() is not None
+
+
+def rss_bytes():
+    """RSS courante du processus (Linux), sinon None."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def max_rss_bytes():
+    """Pic de RSS du processus depuis son démarrage, sinon None."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kio sous Linux, octets sous macOS
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _mb(value):
+    return None if value is None else round(value / MB, 2)
+
+
+def _origin(traceback):
+    """Ligne de l'application la plus proche de l'allocation (sinon la ligne qui alloue)."""
+    for frame in reversed(traceback):
+        if os.path.abspath(frame.filename).startswith(_APP_DIR):
+            return f"app/{os.path.relpath(frame.filename, _APP_DIR)}:{frame.lineno}"
+    return f"{traceback[-1].filename}:{traceback[-1].lineno}"
+
+
+def top_allocations(snapshot, baseline=None, limit=15):
+    """
+    Sites d'allocation les plus lourds, en différence avec ``baseline`` si fourni. Les
+    allocations faites dans pandas, numpy ou sklearn sont rattachées à la ligne de
+    l'application qui les a déclenchées (ex. le ``merge`` du handler).
+    """
+    sizes, counts = {}, {}
+    if baseline is not None:
+        rows = ((stat.traceback, stat.size_diff, stat.count_diff) for stat in snapshot.compare_to(baseline, "traceback"))
+    else:
+        rows = ((stat.traceback, stat.size, stat.count) for stat in snapshot.statistics("traceback"))
+    for traceback, size, count in rows:
+        site = _origin(traceback)
+        if site.startswith(_OWN_FILE):
+            # Instantanés précédents du même scoring
+            continue
+        sizes[site] = sizes.get(site, 0) + size
+        counts[site] = counts.get(site, 0) + count
+    top = sorted(sizes, key=sizes.get, reverse=True)[:limit]
+    return [{"site": site, "size_mb": _mb(sizes[site]), "count": counts[site]} for site in top if sizes[site] > 0]
+
+
+class MemoryRun:
+    """Mesures mémoire d'un scoring : une entrée par étape et trois instantanés."""
+
+    def __init__(self, path, top_limit=15):
+        self.id = uuid.uuid4().hex[:12]
+        self.path = path
+        self.top_limit = top_limit
+        self.created_at = datetime.now(timezone.utc)
+        self.stages = []
+        self.snapshots = {}
+        self._peak_traced = -1
+        self._peak_stage = None
+        tracemalloc.reset_peak()
+        self.start_traced = tracemalloc.get_traced_memory()[0]
+        self.snapshots["before"] = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+    def record_stage(self, stage, seconds):
+        current, peak = tracemalloc.get_traced_memory()
+        self.stages.append({
+            "stage": stage,
+            "seconds": round(seconds, 6),
+            "traced_mb": _mb(current - self.start_traced),
+            "traced_peak_mb": _mb(peak - self.start_traced),
+            "rss_mb": _mb(rss_bytes()),
+            "max_rss_mb": _mb(max_rss_bytes()),
+        })
+        # Point haut : les objets de l'étape sont encore vivants (variables locales du handler)
+        if current > self._peak_traced:
+            self._peak_traced = current
+            self._peak_stage = stage
+            self.snapshots["peak"] = tracemalloc.take_snapshot()
+        tracemalloc.reset_peak()
+
+    def finish(self, status):
+        self.snapshots["after"] = tracemalloc.take_snapshot()
+        before = self.snapshots["before"]
+        peak = self.snapshots.get("peak")
+        return {
+            "id": self.id,
+            "path": self.path,
+            "status": status,
+            "created_at": self.created_at.isoformat(),
+            "stages": self.stages,
+            "peak_stage": self._peak_stage,
+            "top_at_peak": top_allocations(peak, before, self.top_limit) if peak is not None else [],
+            "top_retained": top_allocations(self.snapshots["after"], before, self.top_limit),
+            "_snapshots": self.snapshots,
+        }
+
+
+def memory_stage_recorder(stage, seconds):
+    """``on_stage`` de ``StageTimer`` : sans scoring suivi, ne fait rien."""
+    run = _current.get()
+    if run is not None:
+        run.record_stage(stage, seconds)
+
+
+class MemoryRunStore:
+    """Derniers scorings suivis, indexés par identifiant."""
+
+    def __init__(self, max_runs=5):
+        self.max_runs = max_runs
+        self._runs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, run):
+        with self._lock:
+            self._runs[run["id"]] = run
+            while len(self._runs) > self.max_runs:
+                self._runs.popitem(last=False)
+
+    def get(self, run_id):
+        return self._runs.get(run_id)
+
+    def list(self):
+        with self._lock:
+            runs = list(self._runs.values())
+        return [
+            {key: run[key] for key in ("id", "path", "status", "created_at", "peak_stage")}
+            for run in reversed(runs)
+        ]
+
+    def clear(self):
+        with self._lock:
+            self._runs.clear()
+
+
+MEMORY_RUNS = MemoryRunStore(int(os.getenv("MEMORY_RUNS_KEPT", "5")))
+
+
+def run_summary(run):
+    return {key: value for key, value in run.items() if not key.startswith("_")}
+
+
+def export_snapshot(run, kind="peak"):
+    """Contenu d'un fichier ``tracemalloc.Snapshot.dump`` (None si l'instantané n'existe pas)."""
+    snapshot = run["_snapshots"].get(kind)
+    if snapshot is None:
+        return None
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "snapshot.tracemalloc")
+        snapshot.dump(path)
+        with open(path, "rb") as f:
+            return f.read()
+
+
+def start_tracing(frames=10):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    return status()
+
+
+def stop_tracing():
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    return status()
+
+
+def status(limit=0):
+    """État du suivi, mémoire tracée et RSS ; ``limit`` > 0 ajoute les sites les plus lourds."""
+    data = {
+        "tracing": tracemalloc.is_tracing(),
+        "frames": tracemalloc.get_traceback_limit() if tracemalloc.is_tracing() else None,
+        "rss_mb": _mb(rss_bytes()),
+        "max_rss_mb": _mb(max_rss_bytes()),
+    }
+    if tracemalloc.is_tracing():
+        current, peak = tracemalloc.get_traced_memory()
+        data.update(
+            traced_mb=_mb(current),
+            traced_peak_mb=_mb(peak),
+            tracemalloc_overhead_mb=_mb(tracemalloc.get_tracemalloc_memory()),
+        )
+        if limit > 0:
+            data["top"] = top_allocations(tracemalloc.take_snapshot(), limit=limit)
+    return data
+
+
+class MemoryDiagnosticsMiddleware:
+    """Enregistre un ``MemoryRun`` par scoring tant que ``tracemalloc`` est actif (un à la fois)."""
+
+    def __init__(self, app, store=MEMORY_RUNS):
+        self.app = app
+        self.store = store
+        self.top_limit = int(os.getenv("MEMORY_TOP_ALLOCATIONS", "15"))
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in TRACKED_PATHS
+            or not tracemalloc.is_tracing()
+        ):
+            await self.app(scope, receive, send)
+            return
+        # Pic et instantanés sont globaux : les scorings concurrents passent sans suivi
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            run = MemoryRun(scope["path"], self.top_limit)
+            token = _current.set(run)
+            try:
+                await self.app(scope, receive, send_with_status)
+            finally:
+                _current.reset(token)
+            # Le suivi a pu être arrêté pendant la requête
+            if tracemalloc.is_tracing():
+                self.store.add(run.finish(status))
+        finally:
+            self._busy.release()
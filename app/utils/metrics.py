@@ -0,0 +1,256 @@
+"""
+Métriques de l'API au format texte Prometheus (servies par ``GET /metrics``).
+
+Registre minimal intégré (pas de dépendance à ``prometheus_client``) : compteurs,
+jauges et histogrammes à labels, protégés par un verrou. Une observation coûte
+une recherche dichotomique dans les bornes et une incrémentation : le surcoût sur
+le chemin critique est de l'ordre de la microseconde (voir
+``benchmarks/bench_metrics.py``).
+
+Métriques exposées :
+
+* ``http_request_duration_seconds`` (histogramme) : durée par méthode, route et statut
+* ``scoring_stage_duration_seconds`` (histogramme) : durée par endpoint et par étape
+  (chargement, merge, preprocessing, predict, predict_proba, résultats, écriture, commit)
+* ``predictions_rows_scored_total`` (compteur) : lignes scorées par endpoint
+* ``model_loaded`` (jauge) : 1 si le pipeline est chargé
+* ``db_pool_connections`` (jauge) : état du pool SQLAlchemy (taille, en cours d'utilisation...)
+"""
+import bisect
+import math
+import threading
+import time
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0
+)
+
+
+def _format_value(value):
+    if value == math.inf:
+        return "+Inf"
+    if value == -math.inf:
+        return "-Inf"
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, values)]
+    pairs.extend(f'{name}="{_escape(value)}"' for name, value in extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+class Registry:
+    """Ensemble de métriques rendues ensemble au format Prometheus."""
+
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.type_name}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class _Metric:
+    type_name = None
+
+    def __init__(self, name, documentation, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"Labels attendus pour {self.name}: {self.labelnames}, reçus: {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class Counter(_Metric):
+    type_name = "counter"
+
+    def inc(self, amount=1, **labels):
+        if amount < 0:
+            raise ValueError("Un compteur ne peut pas diminuer")
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+            for key, value in items
+        ]
+
+
+class Gauge(Counter):
+    type_name = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Histogram(_Metric):
+    type_name = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, documentation, labelnames, registry)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # [compteurs par intervalle (le dernier = +Inf), somme, nombre]
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            state[0][index] += 1
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels):
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def samples(self):
+        with self._lock:
+            items = [(key, (list(state[0]), state[1], state[2])) for key, state in self._values.items()]
+
+        lines = []
+        for key, (bucket_counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (math.inf,), bucket_counts):
+                cumulative += bucket_count
+                labels = _format_labels(self.labelnames, key, extra=[("le", _format_value(bound))])
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {count}")
+        return lines
+
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Durée des requêtes HTTP (secondes)",
+    ["method", "route", "status"],
+)
+STAGE_SECONDS = Histogram(
+    "scoring_stage_duration_seconds",
+    "Durée de chaque étape du scoring (secondes)",
+    ["endpoint", "stage"],
+)
+ROWS_SCORED = Counter(
+    "predictions_rows_scored_total",
+    "Nombre de lignes scorées",
+    ["endpoint"],
+)
+MODEL_LOADED = Gauge(
+    "model_loaded",
+    "1 si le pipeline de prédiction est chargé, 0 sinon",
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "db_pool_connections",
+    "Connexions du pool SQLAlchemy par état",
+    ["state"],
+)
+
+_POOL_STATES = {
+    "size": "size",
+    "checked_out": "checkedout",
+    "checked_in": "checkedin",
+    "overflow": "overflow",
+}
+
+
+def stage_observer(endpoint):
+    """Callback ``(étape, secondes)`` pour ``StageTimer`` qui alimente ``STAGE_SECONDS``."""
+    def observe(stage, seconds):
+        STAGE_SECONDS.observe(seconds, endpoint=endpoint, stage=stage)
+    return observe
+
+
+def collect_pool_stats(engine):
+    """Relève l'état du pool de connexions (les pools sans ces compteurs sont ignorés)."""
+    pool = engine.pool
+    for state, method in _POOL_STATES.items():
+        reader = getattr(pool, method, None)
+        if callable(reader):
+            DB_POOL_CONNECTIONS.set(reader(), state=state)
+
+
+def render_metrics():
+    return REGISTRY.render()
+
+
+class MetricsMiddleware:
+    """
+    Middleware ASGI qui mesure chaque requête HTTP. La route est le gabarit
+    (``/predictions/{prediction_id}``) et non le chemin, pour borner la cardinalité.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            HTTP_REQUEST_SECONDS.observe(
+                time.perf_counter() - start,
+                method=scope["method"],
+                route=getattr(route, "path", "unmatched"),
+                status=status,
+            )
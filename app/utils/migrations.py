@@ -0,0 +1,113 @@
+"""
+Migrations de schéma appliquées au démarrage (``init_database``).
+
+``Base.metadata.create_all`` ne modifie pas les tables existantes : les évolutions
+de colonnes sur une base déjà peuplée sont donc faites ici, de façon idempotente.
+"""
+from sqlalchemy import inspect, text
+
+
+def _column_names(conn, table):
+    inspector = inspect(conn)
+    if not inspector.has_table(table):
+        return None
+    return {column["name"] for column in inspector.get_columns(table)}
+
+
+def migrate_probabilities_to_columns(engine):
+    """
+    Remplace la colonne JSON ``predictions.probabilities`` par la colonne flottante
+    ``probability_class_0`` (la classe 1 est déjà stockée dans ``probability``).
+
+    Retourne le nombre de lignes recopiées depuis le JSON.
+    """
+    dialect = engine.dialect.name
+    float_type = "DOUBLE PRECISION" if dialect == "postgresql" else "FLOAT"
+    if dialect == "postgresql":
+        extract_class_0 = "CAST(probabilities ->> 0 AS DOUBLE PRECISION)"
+        extract_class_1 = "CAST(probabilities ->> 1 AS DOUBLE PRECISION)"
+    else:
+        extract_class_0 = "json_extract(probabilities, '$[0]')"
+        extract_class_1 = "json_extract(probabilities, '$[1]')"
+
+    with engine.begin() as conn:
+        columns = _column_names(conn, "predictions")
+        if columns is None or "probabilities" not in columns:
+            return 0
+
+        if "probability_class_0" not in columns:
+            conn.execute(text(f"ALTER TABLE predictions ADD COLUMN probability_class_0 {float_type}"))
+
+        migrated = conn.execute(text(
+            f"UPDATE predictions "
+            f"SET probability_class_0 = {extract_class_0}, "
+            f"probability = COALESCE(probability, {extract_class_1}) "
+            f"WHERE probability_class_0 IS NULL AND probabilities IS NOT NULL"
+        )).rowcount
+
+        conn.execute(text("ALTER TABLE predictions DROP COLUMN probabilities"))
+
+    return migrated
+
+
+def migrate_add_scoring_run_id(engine):
+    """
+    Ajoute ``predictions.scoring_run_id`` (clé étrangère vers ``scoring_runs``) et
+    son index sur une base existante. Retourne True si la colonne a été ajoutée.
+    """
+    with engine.begin() as conn:
+        columns = _column_names(conn, "predictions")
+        if columns is None or "scoring_run_id" in columns:
+            return False
+        conn.execute(text(
+            "ALTER TABLE predictions ADD COLUMN scoring_run_id INTEGER REFERENCES scoring_runs (id)"
+        ))
+        conn.execute(text(
+            "CREATE INDEX IF NOT EXISTS ix_predictions_scoring_run_id ON predictions (scoring_run_id, id)"
+        ))
+    return True
+
+
+def migrate_predictions_to_partitioned(engine, months_ahead=3):
+    """
+    Convertit une table ``predictions`` PostgreSQL non partitionnée en table
+    partitionnée par mois sur ``created_at`` : création de la nouvelle table,
+    copie des lignes, bascule du nom et de la séquence d'identifiants.
+
+    Ne fait rien sur SQLite ni si la table est déjà partitionnée.
+    Retourne le nombre de lignes recopiées.
+    """
+    from app.models import Prediction
+    from app.utils.retention import is_partitioned, ensure_partitions
+
+    if engine.dialect.name != "postgresql":
+        return 0
+
+    with engine.begin() as conn:
+        if not inspect(conn).has_table("predictions") or is_partitioned(conn):
+            return 0
+
+        # Libérer les noms (table, index, séquence) pour la nouvelle table
+        conn.execute(text("ALTER TABLE predictions RENAME TO predictions_legacy"))
+        for index_name in ("predictions_pkey", "ix_predictions_id", "ix_predictions_created_at",
+                           "ix_predictions_employee_created", "ix_predictions_scoring_run_id"):
+            conn.execute(text(f"ALTER INDEX IF EXISTS {index_name} RENAME TO {index_name}_legacy"))
+        conn.execute(text("ALTER SEQUENCE IF EXISTS predictions_id_seq RENAME TO predictions_legacy_id_seq"))
+
+        Prediction.__table__.create(conn)
+        oldest = conn.execute(text("SELECT MIN(created_at) FROM predictions_legacy")).scalar()
+        ensure_partitions(conn, months_ahead, since=oldest)
+
+        copied = conn.execute(text(
+            "INSERT INTO predictions "
+            "(id, employee_id, prediction, probability, probability_class_0, scoring_run_id, created_at) "
+            "SELECT id, employee_id, prediction, probability, probability_class_0, scoring_run_id, "
+            "COALESCE(created_at, now()) "
+            "FROM predictions_legacy"
+        )).rowcount
+        conn.execute(text(
+            "SELECT setval('predictions_id_seq', COALESCE((SELECT MAX(id) FROM predictions), 0) + 1, false)"
+        ))
+        conn.execute(text("DROP TABLE predictions_legacy"))
+
+    return copied
@@ -0,0 +1,144 @@
+"""
+Mesure du temps passé dans chaque étape du pipeline scikit-learn chargé.
+
+Activation : ``PIPELINE_INSTRUMENTATION=true``. Au chargement du modèle, chaque
+étape d'un ``Pipeline`` / ``ColumnTransformer`` / ``FeatureUnion`` (récursivement)
+voit ses méthodes ``transform``, ``predict`` et ``predict_proba`` enveloppées (sur
+l'instance, la classe n'est pas modifiée). Chaque appel enregistre la durée, le
+nombre de lignes et la taille en octets des données en entrée et en sortie.
+
+Les étapes sont nommées par leur chemin dans le pipeline, par ex.
+``preprocessor/num/log`` ; ``(pipeline)`` désigne l'appel complet. Les durées sont
+inclusives : celle d'un ``ColumnTransformer`` contient celles de ses transformeurs.
+"""
+import threading
+import time
+from functools import wraps
+from app.utils.admin import env_flag
+from app.utils.metrics import Histogram
+
+INSTRUMENTED_METHODS = ("transform", "predict", "predict_proba")
+ROOT_STEP = "(pipeline)"
+
+PIPELINE_STEP_SECONDS = Histogram(
+    "pipeline_step_duration_seconds",
+    "Durée de chaque étape du pipeline scikit-learn (secondes)",
+    ["step", "method"],
+)
+
+
+def instrumentation_enabled():
+    return env_flag("PIPELINE_INSTRUMENTATION")
+
+
+def data_nbytes(data):
+    """Taille approximative en octets d'un tableau numpy, DataFrame, Series ou matrice creuse."""
+    if hasattr(data, "memory_usage"):
+        usage = data.memory_usage(index=False, deep=False)
+        return int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+    if hasattr(data, "data") and hasattr(data.data, "nbytes") and hasattr(data, "indices"):
+        return int(data.data.nbytes + data.indices.nbytes + data.indptr.nbytes)
+    return int(getattr(data, "nbytes", 0))
+
+
+def _rows(data):
+    shape = getattr(data, "shape", None)
+    return int(shape[0]) if shape else 0
+
+
+class PipelineStats:
+    """Agrégats par (étape, méthode) : appels, durée, lignes et octets."""
+
+    def __init__(self):
+        self._steps = {}
+        self._lock = threading.Lock()
+
+    def record(self, step, method, seconds, rows, input_bytes, output_bytes):
+        with self._lock:
+            entry = self._steps.setdefault((step, method), {
+                "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0,
+                "rows": 0, "input_bytes": 0, "output_bytes": 0,
+            })
+            entry["calls"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            entry["rows"] += rows
+            entry["input_bytes"] += input_bytes
+            entry["output_bytes"] += output_bytes
+        PIPELINE_STEP_SECONDS.observe(seconds, step=step, method=method)
+
+    def snapshot(self):
+        with self._lock:
+            items = [(key, dict(entry)) for key, entry in self._steps.items()]
+        steps = []
+        for (step, method), entry in items:
+            entry["mean_ms"] = round(1000 * entry["total_seconds"] / entry["calls"], 4)
+            entry["max_ms"] = round(1000 * entry.pop("max_seconds"), 4)
+            entry["total_seconds"] = round(entry["total_seconds"], 6)
+            steps.append({"step": step, "method": method, **entry})
+        return sorted(steps, key=lambda item: item["total_seconds"], reverse=True)
+
+    def reset(self):
+        with self._lock:
+            self._steps.clear()
+
+
+PIPELINE_STATS = PipelineStats()
+
+
+def _children(estimator):
+    """Sous-estimateurs nommés d'un Pipeline, ColumnTransformer (ajusté) ou FeatureUnion."""
+    if hasattr(estimator, "steps"):
+        return [(name, step) for name, step in estimator.steps]
+    if hasattr(estimator, "transformers_"):
+        return [(name, transformer) for name, transformer, _ in estimator.transformers_]
+    if hasattr(estimator, "transformer_list"):
+        return list(estimator.transformer_list)
+    return []
+
+
+def _wrap(estimator, method_name, step, stats):
+    original = getattr(estimator, method_name)
+
+    @wraps(original)
+    def timed(X, *args, **kwargs):
+        start = time.perf_counter()
+        result = original(X, *args, **kwargs)
+        stats.record(step, method_name, time.perf_counter() - start, _rows(X), data_nbytes(X), data_nbytes(result))
+        return result
+
+    timed.__wrapped_step__ = step
+    setattr(estimator, method_name, timed)
+
+
+def instrument_pipeline(pipeline, stats=PIPELINE_STATS):
+    """Enveloppe les méthodes d'inférence de chaque étape ; retourne la liste des étapes."""
+    instrumented = []
+
+    def visit(estimator, path):
+        if estimator is None or isinstance(estimator, str):  # "drop" / "passthrough"
+            return
+        for name, child in _children(estimator):
+            visit(child, f"{path}/{name}" if path != ROOT_STEP else name)
+        for method_name in INSTRUMENTED_METHODS:
+            method = getattr(estimator, method_name, None)
+            if callable(method) and not hasattr(method, "__wrapped_step__"):
+                _wrap(estimator, method_name, path, stats)
+                instrumented.append(f"{path}.{method_name}")
+
+    visit(pipeline, ROOT_STEP)
+    return instrumented
+
+
+def uninstrument_pipeline(pipeline):
+    """Retire les enveloppes posées par ``instrument_pipeline`` (ex. avant un ``joblib.dump``)."""
+    def visit(estimator):
+        if estimator is None or isinstance(estimator, str):
+            return
+        for _, child in _children(estimator):
+            visit(child)
+        for method_name in INSTRUMENTED_METHODS:
+            if hasattr(estimator.__dict__.get(method_name), "__wrapped_step__"):
+                delattr(estimator, method_name)
+
+    visit(pipeline)
@@ -1,6 +1,7 @@
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine
+from sqlalchemy import bindparam, create_engine, text
+from app.utils.query_timing import instrument_engine
 from sklearn.base import BaseEstimator, TransformerMixin
 
 
@@ -16,7 +17,7 @@ def safe_log_transform(x):
     return np.log1p(x)
 
 def load_data_from_postgres(db_url: str):
-    engine = create_engine(db_url)
+    engine = instrument_engine(create_engine(db_url))
 
     try:
         eval_df = pd.read_sql("SELECT * FROM extrait_eval", engine)
@@ -28,6 +29,87 @@ def load_data_from_postgres(db_url: str):
     return eval_df, sirh_df, sondage_df
 
 
+# SQLite n'a pas d'expressions régulières : le préfixe d'une clé est retiré avec ltrim
+# (tout l'ASCII imprimable sauf les chiffres) et CAST s'arrête au premier non-chiffre
+_KEY_PREFIX_CHARS = "".join(chr(code) for code in range(32, 127) if not chr(code).isdigit()).replace("'", "''")
+
+
+def _employee_key_sql(dialect_name, column):
+    """
+    Expression SQL de l'id employé contenu dans une clé texte (``E_12``, ``000012``...) :
+    premier groupe de chiffres, comme l'extraction faite par ``preprocess_input``. Elle
+    n'utilise que des fonctions natives, et peut donc être indexée (``create_source_indexes``).
+    """
+    if dialect_name == "postgresql":
+        return f"CAST(substring(CAST({column} AS TEXT) FROM '[0-9]+') AS INTEGER)"
+    return f"CAST(ltrim({column}, '{_KEY_PREFIX_CHARS}') AS INTEGER)"
+
+
+def create_source_indexes(connection):
+    """
+    Index des tables sources utilisés par ``load_cohort_from_postgres`` : ``id_employee``
+    de ``extrait_sirh`` et id extrait de la clé (index d'expression) pour les tables
+    d'évaluation et de sondage. À recréer après chaque remplacement des tables.
+    """
+    dialect_name = connection.dialect.name
+    connection.execute(text("CREATE INDEX IF NOT EXISTS ix_extrait_sirh_id_employee ON extrait_sirh (id_employee)"))
+    for table, column in (("extrait_eval", "eval_number"), ("extrait_sondage", "code_sondage")):
+        connection.execute(text(
+            f"CREATE INDEX IF NOT EXISTS ix_{table}_employee_key ON {table} (({_employee_key_sql(dialect_name, column)}))"
+        ))
+
+
+def cohort_where(departement=None, poste=None, age_min=None, age_max=None, employee_ids=None):
+    """Clause ``WHERE`` (sur l'alias ``s`` de ``extrait_sirh``) et ses paramètres liés."""
+    clauses, params = [], {}
+    for name, values in (("departement", departement), ("poste", poste), ("id_employee", employee_ids)):
+        if values is not None:
+            clauses.append(f"s.{name} IN :{name}")
+            params[name] = list(values)
+    if age_min is not None:
+        clauses.append("s.age >= :age_min")
+        params["age_min"] = age_min
+    if age_max is not None:
+        clauses.append("s.age <= :age_max")
+        params["age_max"] = age_max
+    return " AND ".join(clauses) or "1 = 1", params
+
+
+def cohort_query(sql, params):
+    """Requête ``text`` dont les paramètres de liste de ``cohort_where`` sont étendus (``IN``)."""
+    return text(sql).bindparams(*(bindparam(name, expanding=True) for name, value in params.items() if isinstance(value, list)))
+
+
+def load_cohort_from_postgres(db_url: str, **filters):
+    """
+    Comme ``load_data_from_postgres``, mais seules les lignes des employés correspondant
+    aux ``filters`` (voir ``cohort_where``) sont lues : le filtre est appliqué en SQL sur
+    ``extrait_sirh``, et les tables d'évaluation et de sondage lui sont jointes par l'id
+    extrait de leur clé, indexé par ``create_source_indexes``.
+    """
+    engine = instrument_engine(create_engine(db_url))
+    dialect_name = engine.dialect.name
+    where, params = cohort_where(**filters)
+
+    def query(sql):
+        return cohort_query(sql, params)
+
+    try:
+        sirh_df = pd.read_sql(query(f"SELECT s.* FROM extrait_sirh s WHERE {where}"), engine, params=params)
+        eval_df = pd.read_sql(query(
+            f"SELECT e.* FROM extrait_eval e JOIN extrait_sirh s "
+            f"ON {_employee_key_sql(dialect_name, 'e.eval_number')} = s.id_employee WHERE {where}"
+        ), engine, params=params)
+        sondage_df = pd.read_sql(query(
+            f"SELECT d.* FROM extrait_sondage d JOIN extrait_sirh s "
+            f"ON {_employee_key_sql(dialect_name, 'd.code_sondage')} = s.id_employee WHERE {where}"
+        ), engine, params=params)
+    finally:
+        engine.dispose()
+
+    return eval_df, sirh_df, sondage_df
+
+
 def preprocess_input(eval_df, sirh_df, sondage_df):
 
     if eval_df.empty or sirh_df.empty or sondage_df.empty:
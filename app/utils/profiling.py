@@ -0,0 +1,271 @@
+"""
+Profilage à la demande d'une requête ``/predict`` ou ``/predict_one``.
+
+Activation : ``PROFILING_ENABLED=true`` ou ``ADMIN_TOKEN`` défini. Désactivé, le
+middleware n'est pas installé : aucun surcoût. Activé, une requête est profilée
+si elle porte l'en-tête ``X-Profile`` :
+
+* ``X-Profile: cprofile`` : profileur déterministe (``cProfile``), export pstats
+  (lisible par ``python -m pstats`` ou snakeviz)
+* ``X-Profile: sampling`` : échantillonnage de la pile toutes les
+  ``PROFILING_SAMPLE_INTERVAL_MS`` ms (défaut 1), export en piles repliées
+  (« collapsed stacks ») pour ``flamegraph.pl`` ou speedscope
+
+Le profil est conservé en mémoire (les ``PROFILES_KEPT`` derniers, défaut 20) ;
+son identifiant est renvoyé dans l'en-tête ``X-Profile-Id``. Chaque profil porte
+une répartition du temps par bibliothèque (pandas, sklearn, sqlalchemy, json,
+numpy, app, other).
+"""
+import cProfile
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from datetime import datetime, timezone
+from starlette.datastructures import Headers, MutableHeaders
+from app.utils.admin import ADMIN_TOKEN_HEADER, admin_token, env_flag, is_admin
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_ID_HEADER = "X-Profile-Id"
+PROFILE_MODES = ("cprofile", "sampling")
+PROFILED_PATHS = ("/predict", "/predict_one")
+
+# Ordre de priorité : dans une pile, la première bibliothèque rencontrée depuis la
+# racine l'emporte (numpy appelé par sklearn compte pour sklearn).
+PACKAGES = {
+    "sklearn": ("/sklearn/",),
+    "pandas": ("/pandas/",),
+    "sqlalchemy": ("/sqlalchemy/", "/psycopg2/", "/psycopg/"),
+    "json": ("/json/",),
+    "numpy": ("/numpy/",),
+}
+_APP_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__))) + os.sep
+
+
+def profiling_enabled():
+    return env_flag("PROFILING_ENABLED") or admin_token() is not None
+
+
+def classify_file(filename):
+    """Bibliothèque d'un fichier source (``None`` si ni suivie ni code de l'application)."""
+    normalized = filename.replace("\\", "/")
+    for package, markers in PACKAGES.items():
+        if any(marker in normalized for marker in markers):
+            return package
+    if filename.startswith(_APP_DIR):
+        return "app"
+    return None
+
+
+def _short_path(filename):
+    normalized = filename.replace("\\", "/")
+    for marker in ("/site-packages/", "/dist-packages/"):
+        if marker in normalized:
+            return normalized.split(marker, 1)[1]
+    if filename.startswith(_APP_DIR):
+        return "app/" + filename[len(_APP_DIR):].replace("\\", "/")
+    return os.path.basename(normalized)
+
+
+def _percentages(weights):
+    total = sum(weights.values())
+    if not total:
+        return {}
+    return {name: round(100 * value / total, 2) for name, value in weights.most_common()}
+
+
+class SamplingProfiler:
+    """Échantillonne la pile d'un thread depuis un thread annexe (``sys._current_frames``)."""
+
+    def __init__(self, interval=0.001):
+        self.interval = interval
+        self.stacks = Counter()
+        self._labels = {}
+        self._stop = threading.Event()
+        self._thread = None
+        self._target = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _label(self, code):
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{_short_path(code.co_filename)}:{code.co_name}".replace(";", ",")
+        return label, code.co_filename
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            stack = []
+            while frame is not None:
+                stack.append(self._label(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def collapsed(self):
+        return "\n".join(
+            ";".join(label for label, _ in stack) + f" {count}"
+            for stack, count in self.stacks.most_common()
+        ) + "\n"
+
+    def breakdown(self):
+        weights = Counter()
+        for stack, count in self.stacks.items():
+            package = None
+            for _, filename in stack:
+                package = classify_file(filename)
+                if package not in (None, "app"):
+                    break
+            weights[package or "other"] += count
+        return _percentages(weights)
+
+
+def _pstats_breakdown(stats):
+    """Répartition du temps propre (tottime) par bibliothèque de la fonction."""
+    weights = Counter()
+    for (filename, _, _), (_, _, tottime, _, _) in stats.stats.items():
+        weights[classify_file(filename) or "other"] += tottime
+    return _percentages(weights)
+
+
+def _pstats_top(stats, limit=25):
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)[:limit]
+    return [
+        {
+            "function": f"{_short_path(filename)}:{line}({name})",
+            "calls": calls,
+            "tottime": round(tottime, 6),
+            "cumtime": round(cumtime, 6),
+        }
+        for (filename, line, name), (_, calls, tottime, cumtime, _) in rows
+    ]
+
+
+class ProfileStore:
+    """Derniers profils, indexés par identifiant."""
+
+    def __init__(self, max_profiles=20):
+        self.max_profiles = max_profiles
+        self._profiles = OrderedDict()
+        self._lock = threading.Lock()
+
+    def add(self, profile):
+        with self._lock:
+            self._profiles[profile["id"]] = profile
+            while len(self._profiles) > self.max_profiles:
+                self._profiles.popitem(last=False)
+
+    def get(self, profile_id):
+        return self._profiles.get(profile_id)
+
+    def list(self):
+        with self._lock:
+            profiles = list(self._profiles.values())
+        return [summary(profile, top=False) for profile in reversed(profiles)]
+
+    def clear(self):
+        with self._lock:
+            self._profiles.clear()
+
+
+PROFILES = ProfileStore(int(os.getenv("PROFILES_KEPT", "20")))
+
+
+def summary(profile, top=True):
+    """Vue JSON d'un profil (sans les données brutes)."""
+    data = {key: value for key, value in profile.items() if not key.startswith("_")}
+    if not top:
+        data.pop("top", None)
+    return data
+
+
+def export_pstats(profile):
+    """Contenu d'un fichier ``.prof`` (format de ``cProfile.Profile.dump_stats``)."""
+    return marshal.dumps(profile["_stats"])
+
+
+class ProfilingMiddleware:
+    """Profile les requêtes de scoring marquées ``X-Profile`` (un profil à la fois)."""
+
+    def __init__(self, app, store=PROFILES):
+        self.app = app
+        self.store = store
+        self.interval = float(os.getenv("PROFILING_SAMPLE_INTERVAL_MS", "1")) / 1000
+        self._busy = threading.Lock()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in PROFILED_PATHS:
+            await self.app(scope, receive, send)
+            return
+
+        headers = Headers(scope=scope)
+        mode = headers.get(PROFILE_HEADER, "").lower()
+        if mode not in PROFILE_MODES or not is_admin(headers.get(ADMIN_TOKEN_HEADER)):
+            await self.app(scope, receive, send)
+            return
+        # cProfile n'accepte qu'un profileur actif : les requêtes concurrentes passent sans profil
+        if not self._busy.acquire(blocking=False):
+            await self.app(scope, receive, send)
+            return
+
+        profile_id = uuid.uuid4().hex[:12]
+        status = 500
+
+        async def send_with_id(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append(PROFILE_ID_HEADER, profile_id)
+            await send(message)
+
+        profiler = cProfile.Profile() if mode == "cprofile" else SamplingProfiler(self.interval)
+        started_at = datetime.now(timezone.utc)
+        start = time.perf_counter()
+        try:
+            if mode == "cprofile":
+                profiler.enable()
+            else:
+                profiler.start()
+            try:
+                await self.app(scope, receive, send_with_id)
+            finally:
+                if mode == "cprofile":
+                    profiler.disable()
+                else:
+                    profiler.stop()
+            duration = time.perf_counter() - start
+        finally:
+            self._busy.release()
+
+        profile = {
+            "id": profile_id,
+            "mode": mode,
+            "method": scope["method"],
+            "path": scope["path"],
+            "status": status,
+            "created_at": started_at.isoformat(),
+            "duration_seconds": round(duration, 6),
+        }
+        if mode == "cprofile":
+            stats = pstats.Stats(profiler)
+            profile.update(breakdown=_pstats_breakdown(stats), top=_pstats_top(stats), _stats=stats.stats)
+        else:
+            profile.update(
+                samples=sum(profiler.stacks.values()),
+                breakdown=profiler.breakdown(),
+                _collapsed=profiler.collapsed(),
+            )
+        self.store.add(profile)
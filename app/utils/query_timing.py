@@ -0,0 +1,234 @@
+"""
+Durée des requêtes SQL, journal des requêtes lentes et attente du pool de connexions.
+
+Actif par défaut (``QUERY_TIMING_ENABLED=false`` pour le couper). Les requêtes
+normalisées ne sont lisibles dans ``/admin/queries`` qu'avec un ``ADMIN_TOKEN`` configuré. ``instrument_engine``
+branche sur un moteur SQLAlchemy :
+
+* les évènements ``before_cursor_execute`` / ``after_cursor_execute`` : durée de chaque
+  requête, agrégée par requête normalisée (littéraux remplacés par ``?``, listes
+  ``IN`` réduites). C'est la durée de ``cursor.execute`` : avec psycopg2 elle inclut le
+  transfert des lignes, sous SQLite les lignes ne sont lues qu'au ``fetch`` ;
+* une enveloppe de ``engine.raw_connection`` : attente pour obtenir une connexion du
+  pool (ouverture incluse si le pool doit en créer une) ;
+* une enveloppe de ``dialect.do_commit`` : durée du ``COMMIT`` lui-même.
+  SQLAlchemy n'a pas d'évènement « après » pour ces deux opérations.
+
+Les requêtes au-delà de ``SLOW_QUERY_THRESHOLD_MS`` (défaut 500) sont conservées dans
+un tampon circulaire de ``SLOW_QUERY_LOG_SIZE`` entrées (défaut 100), sans leurs
+paramètres, qui peuvent contenir des données personnelles. Au-delà de
+``QUERY_STATS_MAX_STATEMENTS`` requêtes distinctes (défaut 200), les nouvelles sont
+regroupées sous ``(autres)`` pour borner la cardinalité des métriques.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from functools import wraps
+from sqlalchemy import event
+from app.utils.admin import env_flag
+from app.utils.metrics import Counter, Histogram
+
+OTHER_STATEMENTS = "(autres)"
+COMMIT_STATEMENT = "COMMIT"
+MAX_STATEMENT_LENGTH = 300
+NORMALIZED_CACHE_SIZE = 2048
+
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Durée des requêtes SQL par requête normalisée (secondes)",
+    ["statement"],
+)
+DB_SLOW_QUERIES = Counter(
+    "db_slow_queries_total",
+    "Requêtes SQL au-delà du seuil SLOW_QUERY_THRESHOLD_MS",
+)
+DB_POOL_WAIT_SECONDS = Histogram(
+    "db_pool_checkout_wait_seconds",
+    "Attente pour obtenir une connexion du pool (secondes)",
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"(?<![\w.])-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s|(?<!:):\w+|\$\d+|\?")
+_IN_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_VALUES_LIST = re.compile(r"(VALUES\s*\([^()]*\))(?:\s*,\s*\([^()]*\))+", re.IGNORECASE)
+_SPACES = re.compile(r"\s+")
+
+
+def query_timing_enabled():
+    return env_flag("QUERY_TIMING_ENABLED", "true")
+
+
+def _normalize(statement):
+    normalized = _SPACES.sub(" ", statement).strip()
+    normalized = _STRING.sub("?", normalized)
+    normalized = _PLACEHOLDER.sub("?", normalized)
+    normalized = _NUMBER.sub("?", normalized)
+    normalized = _IN_LIST.sub("(?)", normalized)
+    normalized = _VALUES_LIST.sub(r"\1, ...", normalized)
+    if len(normalized) > MAX_STATEMENT_LENGTH:
+        normalized = normalized[:MAX_STATEMENT_LENGTH] + "..."
+    return normalized
+
+
+_NORMALIZED = OrderedDict()
+_NORMALIZED_LOCK = threading.Lock()
+
+
+def normalize_statement(statement):
+    """
+    Forme canonique d'une requête : littéraux et paramètres en ``?``, listes réduites.
+    Résultats mis en cache (``NORMALIZED_CACHE_SIZE`` entrées) sous une empreinte du texte,
+    pour ne pas garder en mémoire les requêtes elles-mêmes, qui peuvent être très longues.
+    """
+    key = hashlib.blake2b(statement.encode("utf-8"), digest_size=16).digest()
+    with _NORMALIZED_LOCK:
+        normalized = _NORMALIZED.get(key)
+        if normalized is not None:
+            _NORMALIZED.move_to_end(key)
+            return normalized
+    normalized = _normalize(statement)
+    with _NORMALIZED_LOCK:
+        _NORMALIZED[key] = normalized
+        if len(_NORMALIZED) > NORMALIZED_CACHE_SIZE:
+            _NORMALIZED.popitem(last=False)
+    return normalized
+
+
+class QueryStats:
+    """Agrégats par requête normalisée, requêtes lentes et attente du pool."""
+
+    def __init__(self, slow_threshold_ms=500.0, slow_log_size=100, max_statements=200):
+        self.slow_threshold = slow_threshold_ms / 1000
+        self.max_statements = max_statements
+        self._statements = {}
+        self._slow = deque(maxlen=slow_log_size)
+        self._pool = {"checkouts": 0, "total_seconds": 0.0, "max_seconds": 0.0}
+        self._lock = threading.Lock()
+
+    def record_query(self, statement, seconds, rows=-1, executemany=False):
+        with self._lock:
+            entry = self._statements.get(statement)
+            if entry is None:
+                if len(self._statements) >= self.max_statements:
+                    statement = OTHER_STATEMENTS
+                entry = self._statements.setdefault(statement, {
+                    "calls": 0, "total_seconds": 0.0, "max_seconds": 0.0, "rows": 0,
+                })
+            entry["calls"] += 1
+            entry["total_seconds"] += seconds
+            entry["max_seconds"] = max(entry["max_seconds"], seconds)
+            if rows > 0:
+                entry["rows"] += rows
+            slow = seconds >= self.slow_threshold
+            if slow:
+                self._slow.append({
+                    "at": datetime.now(timezone.utc).isoformat(),
+                    "duration_ms": round(seconds * 1000, 3),
+                    "statement": statement,
+                    "rows": rows,
+                    "executemany": executemany,
+                })
+        DB_QUERY_SECONDS.observe(seconds, statement=statement)
+        if slow:
+            DB_SLOW_QUERIES.inc()
+
+    def record_checkout(self, seconds):
+        with self._lock:
+            self._pool["checkouts"] += 1
+            self._pool["total_seconds"] += seconds
+            self._pool["max_seconds"] = max(self._pool["max_seconds"], seconds)
+        DB_POOL_WAIT_SECONDS.observe(seconds)
+
+    def snapshot(self, limit=50):
+        with self._lock:
+            items = [(statement, dict(entry)) for statement, entry in self._statements.items()]
+            slow = list(self._slow)
+            pool = dict(self._pool)
+        statements = []
+        for statement, entry in items:
+            entry["mean_ms"] = round(1000 * entry["total_seconds"] / entry["calls"], 4)
+            entry["max_ms"] = round(1000 * entry.pop("max_seconds"), 4)
+            entry["total_seconds"] = round(entry["total_seconds"], 6)
+            statements.append({"statement": statement, **entry})
+        statements.sort(key=lambda item: item["total_seconds"], reverse=True)
+        checkouts = pool["checkouts"]
+        return {
+            "statements": statements[:limit],
+            "slow_queries": list(reversed(slow)),
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "pool_checkout": {
+                "checkouts": checkouts,
+                "mean_wait_ms": round(1000 * pool["total_seconds"] / checkouts, 4) if checkouts else 0.0,
+                "max_wait_ms": round(1000 * pool["max_seconds"], 4),
+            },
+        }
+
+    def reset(self):
+        with self._lock:
+            self._statements.clear()
+            self._slow.clear()
+            self._pool.update(checkouts=0, total_seconds=0.0, max_seconds=0.0)
+
+
+QUERY_STATS = QueryStats(
+    float(os.getenv("SLOW_QUERY_THRESHOLD_MS", "500")),
+    int(os.getenv("SLOW_QUERY_LOG_SIZE", "100")),
+    int(os.getenv("QUERY_STATS_MAX_STATEMENTS", "200")),
+)
+
+
+def instrument_engine(engine, stats=QUERY_STATS):
+    """Branche la mesure des requêtes, du pool et des commits sur ``engine`` (une seule fois)."""
+    if not query_timing_enabled() or getattr(engine, "_query_stats", None) is not None:
+        return engine
+    engine._query_stats = stats
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get("query_start")
+        if not starts:
+            return
+        seconds = time.perf_counter() - starts.pop()
+        stats.record_query(normalize_statement(statement), seconds, getattr(cursor, "rowcount", -1), executemany)
+
+    @event.listens_for(engine, "handle_error")
+    def handle_error(exception_context):
+        # Requête en échec : after_cursor_execute n'est pas appelé
+        connection = exception_context.connection
+        if connection is not None and connection.info.get("query_start"):
+            connection.info["query_start"].pop()
+
+    raw_connection = engine.raw_connection
+
+    @wraps(raw_connection)
+    def timed_raw_connection():
+        start = time.perf_counter()
+        try:
+            return raw_connection()
+        finally:
+            stats.record_checkout(time.perf_counter() - start)
+
+    engine.raw_connection = timed_raw_connection
+
+    do_commit = engine.dialect.do_commit
+
+    @wraps(do_commit)
+    def timed_commit(dbapi_connection):
+        start = time.perf_counter()
+        try:
+            do_commit(dbapi_connection)
+        finally:
+            stats.record_query(COMMIT_STATEMENT, time.perf_counter() - start)
+
+    engine.dialect.do_commit = timed_commit
+    return engine
@@ -0,0 +1,131 @@
+"""
+ETags, requêtes conditionnelles et cache des corps sérialisés pour les lectures de
+prédictions (``GET /predictions/{id}``, ``GET /predictions``).
+
+Une prédiction ne change plus après son insertion :
+
+* l'ETag d'une prédiction est une empreinte de son corps sérialisé : un id réattribué
+  à une autre prédiction (SQLite sans ``AUTOINCREMENT``) change d'ETag ;
+* celui d'une page dépend d'un agrégat de la table (``count(*)``, ``max(id)``,
+  ``max(created_at)``, sommes des employés et des probabilités), lu par une seule
+  requête qui remplace le ``count`` de la page, et des paramètres qui changent la
+  représentation (``skip``, ``limit``, format, ``fields``...).
+
+Un ``If-None-Match`` correspondant donne un ``304`` sans lire ni sérialiser les lignes.
+Les corps sérialisés sont gardés dans un cache LRU en mémoire (``RESPONSE_CACHE_SIZE``
+entrées, défaut 256, et ``RESPONSE_CACHE_MAX_BYTES`` octets, défaut 64 Mo), vidé à
+chaque insertion ou suppression faite par ce processus. Les pages sont toujours
+revalidées par la requête agrégée. Une prédiction, elle, est servie depuis le cache
+pendant au plus ``RESPONSE_CACHE_TTL_SECONDS`` (défaut 30), délai au-delà duquel une
+suppression faite par un autre processus devient visible. ``RESPONSE_CACHE_ENABLED=false``
+désactive le cache, les ETags restent émis.
+"""
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from fastapi.responses import Response
+from app.utils.admin import env_flag
+from app.utils.metrics import Counter
+
+RESPONSE_CACHE_LOOKUPS = Counter(
+    "response_cache_lookups_total",
+    "Lectures de prédictions servies par le cache, revalidées (304) ou recalculées",
+    ["kind", "result"],
+)
+
+
+def response_cache_enabled():
+    return env_flag("RESPONSE_CACHE_ENABLED", "true")
+
+
+def etag_for(kind, *parts):
+    """ETag fort (entre guillemets) pour la représentation décrite par ``parts``."""
+    digest = hashlib.sha256(repr(parts).encode("utf-8")).hexdigest()[:20]
+    return f'"{kind}-{digest}"'
+
+
+def etag_matches(if_none_match, etag):
+    """Vrai si l'en-tête ``If-None-Match`` contient ``etag`` (ou ``*``)."""
+    if not if_none_match:
+        return False
+    candidates = [item.strip() for item in if_none_match.split(",")]
+    # Comparaison faible, comme le prévoit la RFC 9110 pour If-None-Match
+    return "*" in candidates or etag in (item.removeprefix("W/") for item in candidates)
+
+
+def not_modified(etag, headers=None):
+    return Response(status_code=304, headers={"ETag": etag, **(headers or {})})
+
+
+class ResponseCache:
+    """Cache LRU de corps sérialisés ``clé -> (validateur, corps, type de média)``."""
+
+    def __init__(self, max_entries=256, max_bytes=64 * 1024 * 1024, ttl_seconds=30.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._clock = clock
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, validator=None):
+        """Corps ``(octets, type de média)`` en cache pour ``key``, ou None (absent, expiré, autre validateur)."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_validator, body, media_type, expires_at = entry
+            if stored_validator != validator or self._clock() >= expires_at:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return body, media_type
+
+    def put(self, key, body, media_type, validator=None):
+        if self.max_entries <= 0 or len(body) > self.max_bytes:
+            return
+        with self._lock:
+            self._remove(key)
+            self._entries[key] = (validator, body, media_type, self._clock() + self.ttl_seconds)
+            self._bytes += len(body)
+            while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+
+    def invalidate(self, kind=None, key=None):
+        """Supprime l'entrée ``key``, toutes celles du type ``kind`` (premier élément de la clé), ou tout."""
+        with self._lock:
+            if key is not None:
+                self._remove(key)
+                return
+            for existing in [k for k in self._entries if kind is None or k[0] == kind]:
+                self._remove(existing)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= len(entry[1])
+
+    def stats(self):
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._bytes}
+
+
+PREDICTION_CACHE = ResponseCache(
+    int(os.getenv("RESPONSE_CACHE_SIZE", "256")),
+    int(os.getenv("RESPONSE_CACHE_MAX_BYTES", str(64 * 1024 * 1024))),
+    float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "30")),
+)
+
+
+def invalidate_predictions(prediction_ids=()):
+    """
+    À appeler après une insertion (pages, statistiques) ou une suppression (idem, plus les
+    prédictions ``prediction_ids``).
+    """
+    PREDICTION_CACHE.invalidate("page")
+    PREDICTION_CACHE.invalidate("statistics")
+    for prediction_id in prediction_ids:
+        PREDICTION_CACHE.invalidate(key=("prediction", prediction_id))
@@ -0,0 +1,260 @@
+"""
+Formats de réponse négociés par l'en-tête ``Accept`` (``/predict``, ``/predictions``).
+
+* ``application/json`` (défaut) : une ligne = un objet, format historique
+* ``application/vnd.turnover.columnar+json`` : même enveloppe, mais ``predictions``
+  devient un objet ``{champ: [valeurs...]}`` (un tableau par champ)
+* ``application/vnd.apache.arrow.stream`` : flux Arrow IPC d'un seul lot, les champs
+  de l'enveloppe (``total``, ``statistics``...) sont dans les métadonnées du schéma
+  (clé ``envelope``, JSON). Nécessite ``pyarrow`` (dépendance optionnelle).
+* ``application/msgpack`` : enveloppe colonne MessagePack. Les tableaux numériques
+  sont encodés d'un bloc depuis numpy (``float 64``, ``int 64``), sans bibliothèque.
+
+Les colonnes sont construites directement depuis les tableaux de l'inférence ou
+les lignes SQL, sans passer par un dict par ligne. Si aucun format demandé n'est
+disponible, l'endpoint répond 406.
+"""
+import json
+import struct
+from datetime import date, datetime
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+from app.utils.fast_json import dumps
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - dépend de l'environnement
+    pa = None
+
+JSON = "application/json"
+COLUMNAR_JSON = "application/vnd.turnover.columnar+json"
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+MSGPACK = "application/msgpack"
+
+# Type de média demandé -> format servi (alias MessagePack compris)
+MEDIA_TYPE_FORMATS = {
+    JSON: "json",
+    COLUMNAR_JSON: "columnar",
+    ARROW_STREAM: "arrow",
+    MSGPACK: "msgpack",
+    "application/x-msgpack": "msgpack",
+    "application/vnd.msgpack": "msgpack",
+}
+FORMAT_MEDIA_TYPES = {"json": JSON, "columnar": COLUMNAR_JSON, "arrow": ARROW_STREAM, "msgpack": MSGPACK}
+
+
+def arrow_available():
+    return pa is not None
+
+
+def available_formats():
+    return [name for name in FORMAT_MEDIA_TYPES if name != "arrow" or arrow_available()]
+
+
+def negotiate(accept):
+    """
+    Format à servir pour l'en-tête ``accept`` (``json`` s'il est absent), ou None si
+    aucun format demandé n'est disponible. Les facteurs ``q`` sont respectés : un
+    joker (``*/*``, ``application/*``) sert le premier format disponible que le client
+    n'a pas refusé avec ``q=0``.
+    """
+    if not accept:
+        return "json"
+    candidates, refused = [], set()
+    for position, part in enumerate(accept.split(",")):
+        media_type, *params = [item.strip() for item in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if quality > 0:
+            candidates.append((-quality, position, media_type.lower()))
+        elif media_type.lower() in MEDIA_TYPE_FORMATS:
+            refused.add(MEDIA_TYPE_FORMATS[media_type.lower()])
+    available = [name for name in available_formats() if name not in refused]
+    for _, _, media_type in sorted(candidates):
+        if media_type in ("*/*", "application/*"):
+            return available[0] if available else None
+        name = MEDIA_TYPE_FORMATS.get(media_type)
+        if name in available:
+            return name
+    return None
+
+
+def column(values):
+    """Tableau numpy si la colonne est numérique sans valeur nulle, liste Python sinon."""
+    if isinstance(values, np.ndarray):
+        return values if values.dtype.kind in "biuf" else values.tolist()
+    values = list(values)
+    if values and all(isinstance(value, (bool, int, float)) for value in values):
+        return np.asarray(values)
+    return values
+
+
+def select_fields(fields, available):
+    """
+    Champs demandés par ``fields`` (noms séparés par des virgules, dans l'ordre donné),
+    ou None pour tous. ``ValueError`` si un champ n'existe pas dans ``available``.
+    """
+    if fields is None:
+        return None
+    names = list(dict.fromkeys(name.strip() for name in fields.split(",") if name.strip()))
+    unknown = [name for name in names if name not in available]
+    if unknown or not names:
+        raise ValueError(f"Champs inconnus: {', '.join(unknown) or fields!r} (disponibles : {', '.join(available)})")
+    return names
+
+
+def project(columns, fields):
+    """Colonnes restreintes à ``fields`` (toutes si None)."""
+    if fields is None:
+        return columns
+    return {name: columns[name] for name in fields}
+
+
+def columns_from_rows(rows, names):
+    """Colonnes ``{nom: valeurs}`` à partir de lignes SQL (tuples)."""
+    if not rows:
+        return {name: [] for name in names}
+    return {name: column(values) for name, values in zip(names, zip(*rows))}
+
+
+def _json_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return value
+
+
+# --- MessagePack -------------------------------------------------------------
+
+def _msgpack_header(length, fix, small, large):
+    if fix is not None and length < 16:
+        return bytes([fix | length])
+    if length < 0x10000:
+        return struct.pack(">BH", small, length)
+    return struct.pack(">BI", large, length)
+
+
+def _msgpack_str(value):
+    data = value.encode("utf-8")
+    length = len(data)
+    if length < 32:
+        return bytes([0xa0 | length]) + data
+    if length < 0x100:
+        return struct.pack(">BB", 0xd9, length) + data
+    if length < 0x10000:
+        return struct.pack(">BH", 0xda, length) + data
+    return struct.pack(">BI", 0xdb, length) + data
+
+
+def _msgpack_array(values):
+    header = _msgpack_header(len(values), 0x90, 0xdc, 0xdd)
+    if isinstance(values, np.ndarray):
+        if values.dtype == np.bool_:
+            return header + np.where(values, 0xc3, 0xc2).astype(np.uint8).tobytes()
+        if np.issubdtype(values.dtype, np.integer):
+            tag, code = 0xd3, ">i8"
+        elif np.issubdtype(values.dtype, np.floating):
+            tag, code = 0xcb, ">f8"
+        else:
+            return header + _msgpack_items(values.tolist())
+        # Un octet de type suivi de la valeur big-endian, pour tout le tableau d'un coup
+        packed = np.empty(len(values), dtype=[("tag", "u1"), ("value", code)])
+        packed["tag"] = tag
+        packed["value"] = values
+        return header + packed.tobytes()
+    return header + _msgpack_items(values)
+
+
+def _msgpack_items(values):
+    # Les colonnes texte (niveaux de risque...) répètent peu de valeurs distinctes
+    cache = {}
+    parts = []
+    for value in values:
+        if isinstance(value, str):
+            encoded = cache.get(value)
+            if encoded is None:
+                encoded = cache[value] = _msgpack_str(value)
+            parts.append(encoded)
+        else:
+            parts.append(_msgpack(value))
+    return b"".join(parts)
+
+
+def _msgpack(value):
+    if value is None:
+        return b"\xc0"
+    if value is True or value is False:
+        return b"\xc3" if value else b"\xc2"
+    if isinstance(value, (np.ndarray, list, tuple)):
+        return _msgpack_array(value)
+    if isinstance(value, np.generic):
+        return _msgpack(value.item())
+    if isinstance(value, int):
+        if 0 <= value < 0x80:
+            return bytes([value])
+        if -32 <= value < 0:
+            return struct.pack(">b", value)
+        return struct.pack(">Bq", 0xd3, value)
+    if isinstance(value, float):
+        return struct.pack(">Bd", 0xcb, value)
+    if isinstance(value, str):
+        return _msgpack_str(value)
+    if isinstance(value, (datetime, date)):
+        return _msgpack_str(value.isoformat())
+    if isinstance(value, dict):
+        header = _msgpack_header(len(value), 0x80, 0xde, 0xdf)
+        return header + b"".join(_msgpack(str(key)) + _msgpack(item) for key, item in value.items())
+    raise TypeError(f"Type non sérialisable en MessagePack: {type(value).__name__}")
+
+
+def encode_msgpack(content):
+    return _msgpack(content)
+
+
+# --- Arrow IPC ---------------------------------------------------------------
+
+def encode_arrow(envelope, columns):
+    """Flux Arrow IPC : un lot avec ``columns``, ``envelope`` dans les métadonnées du schéma."""
+    batch = pa.record_batch([pa.array(values) for values in columns.values()], names=list(columns))
+    batch = batch.replace_schema_metadata({"envelope": json.dumps(envelope, default=_json_value)})
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, batch.schema) as writer:
+        writer.write_batch(batch)
+    return sink.getvalue().to_pybytes()
+
+
+def render(format_name, envelope, columns):
+    """
+    Corps ``(octets, type de média)`` d'une réponse en colonnes (tout format sauf ``json``) ;
+    ``columns`` à None pour l'enveloppe seule (``summary_only``).
+    """
+    if format_name == "arrow":
+        return encode_arrow(envelope, columns or {}), ARROW_STREAM
+    content = envelope if columns is None else {**envelope, "predictions": columns}
+    if format_name == "msgpack":
+        return encode_msgpack(content), MSGPACK
+    # orjson sérialise les tableaux numpy numériques sans passer par des listes
+    return dumps(content), COLUMNAR_JSON
+
+
+def formatted_response(format_name, envelope, columns, status_code=200):
+    """Réponse ``format_name`` (en colonnes) ; ``Vary: Accept`` pour les caches intermédiaires."""
+    body, media_type = render(format_name, envelope, columns)
+    return Response(content=body, status_code=status_code, media_type=media_type, headers={"Vary": "Accept"})
+
+
+def not_acceptable():
+    """Réponse 406 listant les types de média disponibles."""
+    return JSONResponse(
+        status_code=406,
+        content={
+            "success": False,
+            "error": "Format de réponse non disponible pour l'en-tête Accept",
+            "supported": [FORMAT_MEDIA_TYPES[name] for name in available_formats()],
+        },
+        headers={"Vary": "Accept"},
+    )
@@ -0,0 +1,223 @@
+"""
+Partitionnement, rétention et compaction de la table ``predictions``.
+
+* PostgreSQL : la table est partitionnée par mois sur ``created_at``
+  (partitions ``predictions_pAAAA_MM`` + une partition ``predictions_default``).
+  La rétention supprime des partitions entières (``DROP TABLE``), sans ``DELETE``
+  ligne à ligne ni ``VACUUM``. Seules les lignes tombées dans la partition par
+  défaut (mois sans partition dédiée) sont supprimées par plage.
+* SQLite : pas de partitionnement déclaratif ; la rétention supprime par plages
+  de ``created_at`` (colonne indexée), un lot par transaction pour ne jamais
+  garder le verrou d'écriture longtemps.
+
+Après la rétention, les lignes de ``latest_predictions`` qui pointent vers une
+prédiction supprimée sont retirées (l'employé n'a plus d'historique conservé).
+
+Configuration (variables d'environnement) :
+
+* ``PREDICTIONS_RETENTION_DAYS`` : durée de conservation (vide = pas de rétention)
+* ``PREDICTIONS_PARTITIONS_AHEAD`` : nombre de mois de partitions créés à l'avance (défaut 3)
+* ``PREDICTIONS_COMPACTION`` : ``true`` pour ne garder que la dernière prédiction
+  par employé et par jour UTC (défaut ``false``)
+* ``PREDICTIONS_COMPACTION_WINDOW_DAYS`` : nombre de jours révolus compactés (défaut 1)
+* ``PREDICTIONS_MAINTENANCE_INTERVAL_HOURS`` : période de la maintenance planifiée
+  par l'application (défaut 24, ``0`` pour la désactiver)
+
+Usage (cron) :
+    python -m app.utils.retention
+"""
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import text, select, delete, exists, func, and_
+from sqlalchemy.orm import aliased
+from app.models import Prediction, LatestPrediction
+
+PARTITION_PREFIX = "predictions_p"
+PARTITION_NAME_RE = re.compile(r"^predictions_p(\d{4})_(\d{2})$")
+
+
+def _month_start(day):
+    return datetime(day.year, day.month, 1, tzinfo=timezone.utc)
+
+
+def _next_month(month_start):
+    if month_start.month == 12:
+        return month_start.replace(year=month_start.year + 1, month=1)
+    return month_start.replace(month=month_start.month + 1)
+
+
+def _utc_day(column, dialect):
+    """Jour calendaire UTC d'un horodatage (PostgreSQL applique sinon le fuseau de session)."""
+    if dialect == "postgresql":
+        return func.date(func.timezone("UTC", column))
+    return func.date(column)
+
+
+def is_partitioned(conn):
+    """Vrai si ``predictions`` est une table partitionnée PostgreSQL."""
+    if conn.dialect.name != "postgresql":
+        return False
+    return conn.execute(text(
+        "SELECT EXISTS (SELECT 1 FROM pg_partitioned_table pt "
+        "JOIN pg_class c ON c.oid = pt.partrelid WHERE c.relname = 'predictions')"
+    )).scalar()
+
+
+def ensure_partitions(conn, months_ahead=3, now=None, since=None):
+    """
+    Crée la partition par défaut puis une partition par mois, de ``since`` (défaut :
+    le mois courant) jusqu'à ``months_ahead`` mois après le mois courant.
+    """
+    if not is_partitioned(conn):
+        return []
+
+    now = now or datetime.now(timezone.utc)
+    month = _month_start(since or now)
+    last = _month_start(now)
+    for _ in range(months_ahead):
+        last = _next_month(last)
+
+    conn.execute(text("CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT"))
+    created = []
+    while month <= last:
+        upper = _next_month(month)
+        name = f"{PARTITION_PREFIX}{month.year:04d}_{month.month:02d}"
+        try:
+            # Échoue si la partition par défaut contient déjà des lignes de ce mois :
+            # elles y restent (la rétention les supprime par plage) et le mois est ignoré.
+            with conn.begin_nested():
+                conn.execute(text(
+                    f"CREATE TABLE IF NOT EXISTS {name} PARTITION OF predictions "
+                    f"FOR VALUES FROM ('{month.date().isoformat()}') TO ('{upper.date().isoformat()}')"
+                ))
+            created.append(name)
+        except Exception as e:
+            print(f"⚠ Partition {name} non créée: {e}")
+        month = upper
+    return created
+
+
+def list_partitions(conn):
+    """Retourne les partitions mensuelles sous forme de (nom, début du mois)."""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'predictions'"
+    )).scalars().all()
+
+    partitions = []
+    for name in names:
+        match = PARTITION_NAME_RE.match(name)
+        if match:
+            partitions.append((name, datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)))
+    return sorted(partitions, key=lambda item: item[1])
+
+
+def _prune_latest_predictions(conn):
+    """Retire de ``latest_predictions`` les lignes dont la prédiction n'existe plus."""
+    still_exists = exists().where(Prediction.id == LatestPrediction.prediction_id)
+    return conn.execute(delete(LatestPrediction).where(~still_exists)).rowcount
+
+
+def apply_retention(engine, retention_days, now=None, batch_size=10_000):
+    """
+    Supprime les prédictions plus anciennes que ``retention_days``.
+
+    Sur PostgreSQL partitionné, les partitions entièrement expirées sont supprimées
+    et la partition par défaut est purgée par plage. Ailleurs, la suppression se fait
+    par lots, chacun dans sa propre transaction. Retourne un dict décrivant ce qui a
+    été supprimé.
+    """
+    now = now or datetime.now(timezone.utc)
+    cutoff = now - timedelta(days=retention_days)
+
+    with engine.begin() as conn:
+        partitioned = is_partitioned(conn)
+        if partitioned:
+            dropped = []
+            for name, month in list_partitions(conn):
+                if _next_month(month) <= cutoff:
+                    conn.execute(text(f"DROP TABLE IF EXISTS {name}"))
+                    dropped.append(name)
+            default_deleted = conn.execute(
+                text("DELETE FROM predictions_default WHERE created_at < :cutoff"),
+                {"cutoff": cutoff},
+            ).rowcount
+            pruned = _prune_latest_predictions(conn)
+            return {
+                "mode": "partitions",
+                "dropped_partitions": dropped,
+                "default_partition_deleted_rows": default_deleted,
+                "latest_pruned": pruned,
+            }
+
+    deleted = 0
+    while True:
+        with engine.begin() as conn:
+            expired_ids = (
+                select(Prediction.id)
+                .where(Prediction.created_at < cutoff)
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            count = conn.execute(delete(Prediction).where(Prediction.id.in_(expired_ids))).rowcount
+        deleted += count
+        if count < batch_size:
+            break
+
+    with engine.begin() as conn:
+        pruned = _prune_latest_predictions(conn)
+    return {"mode": "range_delete", "deleted_rows": deleted, "latest_pruned": pruned}
+
+
+def compact_predictions(conn, window_days=1, now=None):
+    """
+    Ne garde que la dernière prédiction par employé et par jour UTC, pour les
+    ``window_days`` derniers jours révolus (le jour courant n'est jamais compacté).
+    """
+    now = now or datetime.now(timezone.utc)
+    today = datetime(now.year, now.month, now.day, tzinfo=timezone.utc)
+    window_start = today - timedelta(days=window_days)
+    dialect = conn.dialect.name
+
+    newer = aliased(Prediction)
+    superseded = exists().where(and_(
+        newer.employee_id == Prediction.employee_id,
+        _utc_day(newer.created_at, dialect) == _utc_day(Prediction.created_at, dialect),
+        newer.id > Prediction.id,
+    ))
+    stmt = delete(Prediction).where(
+        Prediction.employee_id.isnot(None),
+        Prediction.created_at >= window_start,
+        Prediction.created_at < today,
+        superseded,
+    )
+    return conn.execute(stmt).rowcount
+
+
+def maintenance_interval_hours():
+    return float(os.getenv("PREDICTIONS_MAINTENANCE_INTERVAL_HOURS", "24"))
+
+
+def run_maintenance(engine, now=None):
+    """Applique partitions, rétention et compaction selon la configuration."""
+    retention_days = os.getenv("PREDICTIONS_RETENTION_DAYS")
+    months_ahead = int(os.getenv("PREDICTIONS_PARTITIONS_AHEAD", "3"))
+    compaction = os.getenv("PREDICTIONS_COMPACTION", "false").lower() in ("1", "true", "yes")
+    window_days = int(os.getenv("PREDICTIONS_COMPACTION_WINDOW_DAYS", "1"))
+
+    report = {}
+    with engine.begin() as conn:
+        report["partitions"] = ensure_partitions(conn, months_ahead, now=now)
+    if retention_days:
+        report["retention"] = apply_retention(engine, int(retention_days), now=now)
+    if compaction:
+        with engine.begin() as conn:
+            report["compacted_rows"] = compact_predictions(conn, window_days, now=now)
+    return report
+
+
+if __name__ == "__main__":
+    from app.database import engine
+    print(run_maintenance(engine))
@@ -0,0 +1,95 @@
+"""
+Statistiques de risque agrégées en SQL sur les prédictions enregistrées (``/statistics``).
+
+Une seule requête ``GROUP BY`` calcule, par groupe, le nombre de prédictions, les
+effectifs à risque élevé et faible, la probabilité moyenne et un histogramme des
+probabilités (une somme ``CASE`` par tranche). Aucune ligne n'est rapatriée côté Python.
+Les groupes possibles sont le département et le poste (jointure sur ``extrait_sirh``)
+ou le jour. La source est ``latest_predictions`` (dernier risque par employé) ou
+``predictions`` (historique complet, filtrable par période).
+
+Le corps sérialisé est mis en cache (``PREDICTION_CACHE``, type ``statistics``) et
+invalidé à chaque écriture de prédictions (``invalidate_predictions``).
+"""
+from sqlalchemy import and_, case, func, null, select
+from app.models import LatestPrediction, Prediction, SIRH_DIMENSIONS
+from app.utils.latest_predictions import RISK_THRESHOLD
+
+GROUP_BY = ("departement", "poste", "date")
+MAX_BUCKETS = 100
+
+
+def _source_columns(source):
+    """``(table, employee_id, probability, date)`` de la source demandée."""
+    if source == "latest":
+        return LatestPrediction, LatestPrediction.employee_id, LatestPrediction.probability, LatestPrediction.updated_at
+    return Prediction, Prediction.employee_id, Prediction.probability, Prediction.created_at
+
+
+def _bucket_counts(probability, buckets):
+    """Une somme ``CASE`` par tranche ``[i/n, (i+1)/n[`` (la dernière inclut 1)."""
+    sums = []
+    for i in range(buckets):
+        bounds = []
+        if i > 0:
+            bounds.append(probability >= i / buckets)
+        if i < buckets - 1:
+            bounds.append(probability < (i + 1) / buckets)
+        condition = and_(*bounds) if bounds else probability.isnot(None)
+        sums.append(func.sum(case((condition, 1), else_=0)).label(f"bucket_{i}"))
+    return sums
+
+
+def build_statistics_query(source="latest", group_by=None, buckets=10, departement=None, poste=None, start=None, end=None):
+    model, employee_id, probability, timestamp = _source_columns(source)
+    needs_dimensions = group_by in ("departement", "poste") or departement is not None or poste is not None
+    key = {
+        "departement": SIRH_DIMENSIONS.c.departement,
+        "poste": SIRH_DIMENSIONS.c.poste,
+        "date": func.date(timestamp),
+    }.get(group_by)
+
+    stmt = select(
+        (key if key is not None else null()).label("key"),
+        func.count().label("count"),
+        func.sum(case((probability > RISK_THRESHOLD, 1), else_=0)).label("high_risk"),
+        func.avg(probability).label("mean_probability"),
+        *_bucket_counts(probability, buckets),
+    ).select_from(model).where(probability.isnot(None))
+    if needs_dimensions:
+        stmt = stmt.outerjoin(SIRH_DIMENSIONS, SIRH_DIMENSIONS.c.id_employee == employee_id)
+    if departement is not None:
+        stmt = stmt.where(SIRH_DIMENSIONS.c.departement == departement)
+    if poste is not None:
+        stmt = stmt.where(SIRH_DIMENSIONS.c.poste == poste)
+    if start is not None:
+        stmt = stmt.where(timestamp >= start)
+    if end is not None:
+        stmt = stmt.where(timestamp < end)
+    if key is not None:
+        stmt = stmt.group_by(key).order_by(key)
+    return stmt
+
+
+def _group(row, buckets):
+    count = row.count or 0
+    high_risk = int(row.high_risk or 0)
+    key = row.key
+    return {
+        "key": key if key is None or isinstance(key, str) else str(key),
+        "count": count,
+        "high_risk": high_risk,
+        "low_risk": count - high_risk,
+        "high_risk_percentage": round(high_risk / count * 100, 2) if count else 0.0,
+        "mean_probability": round(float(row.mean_probability), 4) if row.mean_probability is not None else None,
+        "histogram": [int(getattr(row, f"bucket_{i}") or 0) for i in range(buckets)],
+    }
+
+
+def compute_statistics(db, source="latest", group_by=None, buckets=10, **filters):
+    """Groupes agrégés (``key`` à None sans ``group_by``), dans l'ordre des clés."""
+    stmt = build_statistics_query(source, group_by, buckets, **filters)
+    groups = [_group(row, buckets) for row in db.execute(stmt)]
+    if group_by is None:
+        groups = [group for group in groups if group["count"]]
+    return groups
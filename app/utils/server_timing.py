@@ -0,0 +1,121 @@
+"""
+Décomposition du temps de chaque requête, renvoyée dans l'en-tête ``Server-Timing``.
+
+``ServerTimingMiddleware`` crée un ``RequestTiming`` par requête (variable de
+contexte) et ajoute l'en-tête au début de la réponse. Les endpoints y enregistrent
+leurs étapes :
+
+* ``validation`` : du début de la requête au début du handler (routage, lecture et
+  validation du corps, dépendances)
+* ``preprocessing``, ``inference``, ``db_read``, ``db_write``
+* ``serialization`` : construction et rendu du JSON de réponse
+
+Les durées sont en millisecondes ; ``total`` couvre la requête jusqu'à l'envoi des
+en-têtes. Avec ``?debug=true``, la même décomposition est ajoutée au corps JSON.
+"""
+import time
+from contextlib import nullcontext
+from contextvars import ContextVar
+from fastapi.responses import JSONResponse
+from starlette.datastructures import MutableHeaders
+from app.utils.fast_json import FastJSONResponse
+from app.utils.timing import StageTimer
+
+# Étapes fines du scoring (StageTimer de /predict et /predict_one) -> étapes Server-Timing
+SCORING_STAGE_CATEGORIES = {
+    "load": "db_read",
+    "merge": "preprocessing",
+    "preprocess": "preprocessing",
+    "predict": "inference",
+    "predict_proba": "inference",
+    "build_results": "serialization",
+    "persist": "db_write",
+    "commit": "db_write",
+}
+
+_current = ContextVar("request_timing", default=None)
+
+
+class RequestTiming(StageTimer):
+    """Étapes d'une requête HTTP, mesurées depuis son arrivée dans l'application."""
+
+    def __init__(self):
+        super().__init__()
+        self.started_at = time.perf_counter()
+
+    def begin_handler(self):
+        self.timings["validation"] = time.perf_counter() - self.started_at
+
+    def add(self, name, seconds):
+        self.timings[name] = self.timings.get(name, 0.0) + seconds
+
+    def milliseconds(self):
+        return {name: round(seconds * 1000, 3) for name, seconds in self.timings.items()}
+
+    def header(self):
+        entries = [f"{name};dur={ms}" for name, ms in self.milliseconds().items()]
+        entries.append(f"total;dur={round((time.perf_counter() - self.started_at) * 1000, 3)}")
+        return ", ".join(entries)
+
+
+def begin_handler():
+    """À appeler en tête d'endpoint : enregistre l'étape ``validation``."""
+    timing = _current.get()
+    if timing is not None:
+        timing.begin_handler()
+    return timing
+
+
+def request_stage(name):
+    """Mesure un bloc dans l'étape ``name`` de la requête courante (sans effet hors requête)."""
+    timing = _current.get()
+    return timing.stage(name) if timing is not None else nullcontext()
+
+
+def record_request_stage(name, seconds):
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+def scoring_stage_recorder(stage, seconds):
+    """Callback ``StageTimer`` : reporte une étape fine du scoring dans la requête courante."""
+    record_request_stage(SCORING_STAGE_CATEGORIES.get(stage, stage), seconds)
+
+
+def json_response(content, debug=False, status_code=200, fast=False):
+    """
+    Rend ``content`` en JSON dans l'étape ``serialization`` ; ``debug`` ajoute les durées
+    au corps, ``fast`` encode via ``FastJSONResponse`` (réponses volumineuses).
+    """
+    timing = _current.get()
+    if debug and timing is not None:
+        content = {**content, "timings": timing.milliseconds()}
+    response_class = FastJSONResponse if fast else JSONResponse
+    with request_stage("serialization"):
+        return response_class(status_code=status_code, content=content)
+
+
+class ServerTimingMiddleware:
+    """Middleware ASGI qui ouvre un ``RequestTiming`` par requête et émet ``Server-Timing``."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timing = RequestTiming()
+        token = _current.set(timing)
+
+        async def send_with_header(message):
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).append("Server-Timing", timing.header())
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_header)
+        finally:
+            _current.reset(token)
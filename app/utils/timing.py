@@ -0,0 +1,28 @@
+"""Mesure des durées par étape d'un traitement (chargement, preprocessing, inférence...)."""
+import time
+from contextlib import contextmanager
+
+
+class StageTimer:
+    """
+    Accumule la durée (en secondes) de chaque étape nommée. ``on_stage`` est appelé
+    avec ``(étape, secondes)`` à la fin de chaque étape (ex. export vers les métriques).
+    """
+
+    def __init__(self, on_stage=None):
+        self.timings = {}
+        self.on_stage = on_stage
+
+    @contextmanager
+    def stage(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.timings[name] = self.timings.get(name, 0.0) + elapsed
+            if self.on_stage is not None:
+                self.on_stage(name, elapsed)
+
+    def rounded(self, digits=6):
+        return {name: round(seconds, digits) for name, seconds in self.timings.items()}
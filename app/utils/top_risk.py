@@ -0,0 +1,91 @@
+"""
+Employés les plus à risque (top K par probabilité de départ).
+
+Deux sources :
+
+* ``latest`` : la table ``latest_predictions``, lue par un ``ORDER BY probability DESC
+  LIMIT k`` qui parcourt l'index ``ix_latest_predictions_probability`` ; le département
+  et le poste viennent d'une jointure sur ``extrait_sirh`` ;
+* ``score`` : un scoring de la population (filtrée avant l'inférence), dont les K
+  premiers sont choisis par sélection partielle (``np.partition``, O(n)) puis
+  seuls ces K sont triés. Seul ``predict_proba`` est appelé.
+
+Dans les deux cas, la réponse ne contient que K lignes. ``TOP_RISK_MAX_K`` (défaut 1000)
+borne K.
+"""
+import os
+import numpy as np
+from sqlalchemy import select
+from app.models import LatestPrediction, SIRH_DIMENSIONS
+from app.utils.latest_predictions import risk_levels_for
+
+def top_risk_max_k():
+    return int(os.getenv("TOP_RISK_MAX_K", "1000"))
+
+
+def top_k_indices(probabilities, k, employee_ids=None):
+    """
+    Indices des ``k`` plus fortes probabilités, par probabilité décroissante puis
+    ``employee_ids`` croissant (ordre stable). Sélection partielle en O(n), puis tri de K lignes.
+    """
+    probabilities = np.asarray(probabilities, dtype=float)
+    n = len(probabilities)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        # Les ex aequo avec la K-ième valeur sont tous gardés pour un départage déterministe
+        threshold = np.partition(probabilities, n - k)[n - k]
+        candidates = np.flatnonzero(probabilities >= threshold)
+    else:
+        candidates = np.arange(n)
+    tie_breaker = candidates if employee_ids is None else np.asarray(employee_ids)[candidates]
+    order = np.lexsort((tie_breaker, -probabilities[candidates]))
+    return candidates[order[:k]]
+
+
+def latest_top_risk(db, k, departement=None, poste=None):
+    """Top ``k`` de ``latest_predictions`` (tri et limite en SQL), filtré par département/poste."""
+    stmt = (
+        select(
+            LatestPrediction.employee_id,
+            LatestPrediction.prediction_id,
+            LatestPrediction.prediction,
+            LatestPrediction.probability,
+            LatestPrediction.risk_level,
+            SIRH_DIMENSIONS.c.departement,
+            SIRH_DIMENSIONS.c.poste,
+        )
+        .select_from(LatestPrediction)
+        .outerjoin(SIRH_DIMENSIONS, SIRH_DIMENSIONS.c.id_employee == LatestPrediction.employee_id)
+        .where(LatestPrediction.probability.isnot(None))
+    )
+    if departement is not None:
+        stmt = stmt.where(SIRH_DIMENSIONS.c.departement == departement)
+    if poste is not None:
+        stmt = stmt.where(SIRH_DIMENSIONS.c.poste == poste)
+    stmt = stmt.order_by(LatestPrediction.probability.desc(), LatestPrediction.employee_id).limit(k)
+    return [row._asdict() for row in db.execute(stmt)]
+
+
+def scored_top_risk(employee_ids, predictions, probabilities, k, departements, postes):
+    """Top ``k`` d'un scoring (tableaux alignés sur la population scorée)."""
+    indices = top_k_indices(probabilities, k, employee_ids)
+    selected = np.asarray(probabilities, dtype=float)[indices]
+    return [
+        {
+            "employee_id": employee_id,
+            "prediction": prediction,
+            "probability": round(probability, 3),
+            "risk_level": level,
+            "departement": departement,
+            "poste": poste,
+        }
+        for employee_id, prediction, probability, level, departement, poste in zip(
+            np.asarray(employee_ids)[indices].astype(np.int64).tolist(),
+            np.asarray(predictions)[indices].astype(np.int64).tolist(),
+            selected.tolist(),
+            risk_levels_for(selected).tolist(),
+            np.asarray(departements, dtype=object)[indices].tolist(),
+            np.asarray(postes, dtype=object)[indices].tolist(),
+        )
+    ]
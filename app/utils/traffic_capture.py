@@ -0,0 +1,199 @@
+"""
+Capture d'un échantillon du trafic réel, pour le rejouer (``benchmarks/replay.py``).
+
+Activation : ``TRAFFIC_CAPTURE_ENABLED=true``. Désactivé, le middleware n'est pas
+installé : aucun surcoût. Activé, une fraction ``TRAFFIC_CAPTURE_SAMPLE_RATE``
+(défaut 0.1) des requêtes sur ``TRAFFIC_CAPTURE_PATHS`` (défaut ``/predict_one,/predict``)
+est écrite, une ligne JSON par requête, dans ``TRAFFIC_CAPTURE_FILE`` (défaut
+``captures/traffic.ndjson.gz``, NDJSON compressé en gzip) :
+
+* instant d'arrivée, méthode, chemin, query string et corps JSON de la requête
+* statut et durée de la réponse (ms)
+
+Les champs listés dans ``TRAFFIC_CAPTURE_PII_FIELDS`` (défaut ``employee_id``) sont
+remplacés par une empreinte HMAC-SHA256 salée par ``TRAFFIC_CAPTURE_SALT`` : même
+valeur, même empreinte (les employés récurrents le restent au rejeu), et les entiers
+restent des entiers pour que le corps reste valide. Sans sel configuré, un sel
+aléatoire est tiré au démarrage de la capture et n'est écrit nulle part : un sel vide
+ou connu permettrait de retrouver les ids en énumérant les petits entiers. Les
+empreintes ne sont alors stables qu'au sein d'une même exécution.
+
+Les champs de ``TRAFFIC_CAPTURE_DROP_FIELDS`` (défaut : âge, salaire, genre, statut
+marital, enfants, distance domicile-travail) sont retirés du corps. ``/predict_one``
+applique alors ses valeurs par défaut au rejeu, ce qui ne change pas le coût mesuré.
+La capture s'arrête après ``TRAFFIC_CAPTURE_MAX_RECORDS`` requêtes (défaut 100 000).
+"""
+import gzip
+import hashlib
+import hmac
+import json
+import os
+import random
+import secrets
+import threading
+import time
+from app.utils.admin import env_flag
+
+DEFAULT_CAPTURE_FILE = os.path.join("captures", "traffic.ndjson.gz")
+# Au-delà, le corps n'est pas conservé (la requête reste capturée, avec ``body`` à None)
+MAX_BODY_BYTES = 64 * 1024
+DEFAULT_DROP_FIELDS = "age,revenu_mensuel,genre,statut_marital,ayant_enfants,distance_domicile_travail"
+
+
+def capture_enabled():
+    return env_flag("TRAFFIC_CAPTURE_ENABLED")
+
+
+def _env_list(name, default):
+    return tuple(item.strip() for item in os.getenv(name, default).split(",") if item.strip())
+
+
+def pseudonymize(value, salt):
+    """Empreinte stable d'une valeur : entier pour un entier, ``h_<hex>`` sinon."""
+    digest = hmac.new(salt.encode(), str(value).encode(), hashlib.sha256).hexdigest()
+    if isinstance(value, int) and not isinstance(value, bool):
+        # 48 bits : tient dans un BIGINT et reste lisible
+        return int(digest[:12], 16)
+    return f"h_{digest[:16]}"
+
+
+def scrub_pii(body, fields, salt, drop=frozenset()):
+    """
+    Copie du corps JSON avec les champs ``fields`` pseudonymisés et les champs ``drop``
+    retirés (à tout niveau).
+    """
+    if isinstance(body, dict):
+        return {
+            key: pseudonymize(value, salt) if key in fields and value is not None else scrub_pii(value, fields, salt, drop)
+            for key, value in body.items()
+            if key not in drop
+        }
+    if isinstance(body, list):
+        return [scrub_pii(item, fields, salt, drop) for item in body]
+    return body
+
+
+class CaptureWriter:
+    """Fichier NDJSON gzip ouvert en ajout ; chaque redémarrage ajoute un membre gzip."""
+
+    def __init__(self, path, max_records=100_000, flush_every=50):
+        self.path = path
+        self.max_records = max_records
+        self.flush_every = flush_every
+        self.records = 0
+        self._file = None
+        self._lock = threading.Lock()
+
+    @property
+    def full(self):
+        return self.records >= self.max_records
+
+    def write(self, record):
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self.full:
+                return False
+            if self._file is None:
+                directory = os.path.dirname(self.path)
+                if directory:
+                    os.makedirs(directory, exist_ok=True)
+                self._file = gzip.open(self.path, "at", encoding="utf-8")
+            self._file.write(line)
+            self.records += 1
+            if self.records % self.flush_every == 0:
+                self._file.flush()
+        return True
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+
+def read_capture(path):
+    """Requêtes capturées, dans l'ordre d'arrivée."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return sorted(records, key=lambda record: record["ts"])
+
+
+def default_writer():
+    return CaptureWriter(
+        os.getenv("TRAFFIC_CAPTURE_FILE", DEFAULT_CAPTURE_FILE),
+        int(os.getenv("TRAFFIC_CAPTURE_MAX_RECORDS", "100000")),
+    )
+
+
+class TrafficCaptureMiddleware:
+    """Écrit un échantillon des requêtes (corps pseudonymisé, statut, durée) via ``CaptureWriter``."""
+
+    def __init__(
+        self, app, writer=None, sample_rate=None, paths=None, pii_fields=None, drop_fields=None, salt=None, seed=None
+    ):
+        self.app = app
+        self.writer = writer or default_writer()
+        self.sample_rate = sample_rate if sample_rate is not None else float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "0.1"))
+        self.paths = paths or _env_list("TRAFFIC_CAPTURE_PATHS", "/predict_one,/predict")
+        self.pii_fields = frozenset(pii_fields or _env_list("TRAFFIC_CAPTURE_PII_FIELDS", "employee_id"))
+        self.drop_fields = frozenset(
+            _env_list("TRAFFIC_CAPTURE_DROP_FIELDS", DEFAULT_DROP_FIELDS) if drop_fields is None else drop_fields
+        )
+        # Sel vide refusé : un sel aléatoire, jamais écrit, le remplace
+        self.salt = salt or os.getenv("TRAFFIC_CAPTURE_SALT") or secrets.token_hex(32)
+        self._random = random.Random(seed)
+
+    async def __call__(self, scope, receive, send):
+        if (
+            scope["type"] != "http"
+            or scope["path"] not in self.paths
+            or self.writer.full
+            or self._random.random() >= self.sample_rate
+        ):
+            await self.app(scope, receive, send)
+            return
+
+        chunks = []
+        size = 0
+        status = 500
+
+        async def receive_and_keep():
+            nonlocal size
+            message = await receive()
+            if message["type"] == "http.request" and size <= MAX_BODY_BYTES:
+                chunk = message.get("body", b"")
+                size += len(chunk)
+                chunks.append(chunk)
+            return message
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        arrived_at = time.time()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive_and_keep, send_with_status)
+        finally:
+            duration = time.perf_counter() - start
+            self.writer.write({
+                "ts": round(arrived_at, 6),
+                "method": scope["method"],
+                "path": scope["path"],
+                "query": scope.get("query_string", b"").decode("latin-1"),
+                "body": self._body(chunks, size),
+                "status": status,
+                "duration_ms": round(duration * 1000, 3),
+            })
+
+    def _body(self, chunks, size):
+        if not chunks or size > MAX_BODY_BYTES:
+            return None
+        try:
+            body = json.loads(b"".join(chunks))
+        except ValueError:
+            # Corps non JSON : non conservé, il pourrait contenir des données personnelles
+            return None
+        return scrub_pii(body, self.pii_fields, self.salt, self.drop_fields)
@@ -0,0 +1,39 @@
+"""Appel direct d'une application ASGI, sans serveur ni client HTTP (pour les benchmarks)."""
+import asyncio
+
+
+def asgi_request(app, path, query="", method="GET", body=b"", headers=(), keep_body=False):
+    """
+    Exécute une requête et retourne ``(statut, en-têtes, corps)``. Sans ``keep_body``,
+    le corps est jeté au fil de l'eau et seule sa taille (en octets) est retournée.
+    """
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": method,
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "",
+        "query_string": query.encode(), "headers": [(k.lower().encode(), v.encode()) for k, v in headers],
+        "client": ("bench", 0), "server": ("bench", 80),
+    }
+    response = {"status": None, "headers": [], "body": [], "size": 0}
+    requested = False
+
+    async def receive():
+        nonlocal requested
+        if requested:
+            # Pas de déconnexion : bloque comme un client qui attend la fin de la réponse
+            await asyncio.Event().wait()
+        requested = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            response["status"] = message["status"]
+            response["headers"] = [(k.decode(), v.decode()) for k, v in message.get("headers", [])]
+        elif message["type"] == "http.response.body":
+            chunk = message.get("body", b"")
+            response["size"] += len(chunk)
+            if keep_body:
+                response["body"].append(chunk)
+
+    asyncio.run(app(scope, receive, send))
+    content = b"".join(response["body"]) if keep_body else response["size"]
+    return response["status"], dict(response["headers"]), content
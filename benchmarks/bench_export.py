@@ -0,0 +1,105 @@
+"""
+Débit et mémoire de l'export en flux (``/predictions/export``) comparés à la
+pagination de ``/predictions`` (skip/limit), sur une base SQLite temporaire.
+
+Usage :
+    python -m benchmarks.bench_export --rows 100000 --page-size 1000
+"""
+import argparse
+import json
+import os
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+from sqlalchemy import create_engine, insert
+from sqlalchemy.orm import sessionmaker
+from app.database import Base, get_db
+from app.main import app
+from app.models import Prediction
+from benchmarks.asgi import asgi_request
+
+
+def _populate(engine, rows, seed=0, batch_size=50_000):
+    probas = np.random.default_rng(seed).random(rows)
+    with engine.begin() as conn:
+        for start in range(0, rows, batch_size):
+            conn.execute(insert(Prediction), [
+                {"employee_id": i, "prediction": int(p > 0.5), "probability": float(p),
+                 "probability_class_0": float(1 - p)}
+                for i, p in enumerate(probas[start:start + batch_size], start=start)
+            ])
+
+
+def _paging(page_size):
+    skip, received = 0, 0
+    while True:
+        _, _, body = asgi_request(app, "/predictions", f"skip={skip}&limit={page_size}", keep_body=True)
+        page = json.loads(body)["predictions"]
+        received += len(page)
+        if len(page) < page_size:
+            return received
+        skip += page_size
+
+
+def _export(export_format, gzip=False):
+    return asgi_request(app, "/predictions/export", f"format={export_format}&gzip={str(gzip).lower()}")[2]
+
+
+def _measure(fn):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def run(rows, page_size):
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(f"sqlite:///{os.path.join(tmp, 'bench.db')}", connect_args={"check_same_thread": False})
+        Base.metadata.create_all(engine)
+        _populate(engine, rows)
+        SessionLocal = sessionmaker(bind=engine, autoflush=False)
+
+        def override_get_db():
+            db = SessionLocal()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        scenarios = {
+            f"pagination (limit={page_size})": lambda: _paging(page_size),
+            "export csv": lambda: _export("csv"),
+            "export ndjson": lambda: _export("ndjson"),
+            "export ndjson gzip": lambda: _export("ndjson", gzip=True),
+            "export parquet": lambda: _export("parquet"),
+        }
+        results = {}
+        try:
+            for name, fn in scenarios.items():
+                elapsed, peak = _measure(fn)
+                results[name] = {"seconds": elapsed, "rows_per_second": rows / elapsed, "peak_bytes": peak}
+        finally:
+            app.dependency_overrides.pop(get_db, None)
+            engine.dispose()
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--page-size", type=int, default=1_000)
+    args = parser.parse_args()
+
+    print(f"{'scénario':<28}{'durée (s)':>12}{'lignes/s':>14}{'pic mémoire (Mo)':>20}")
+    for name, res in run(args.rows, args.page_size).items():
+        print(f"{name:<28}{res['seconds']:>12.2f}{res['rows_per_second']:>14.0f}{res['peak_bytes'] / 1e6:>20.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Sérialisation des réponses volumineuses : ancien chemin (un dict par ligne avec
+conversions Python, ``JSONResponse``) contre le chemin rapide (conversions par
+colonne, ``FastJSONResponse`` avec l'encodeur standard puis orjson).
+
+* ``/predict`` : résultats à partir des tableaux numpy de l'inférence
+* ``/predictions`` : lecture de ``--rows`` prédictions en base (SQLite temporaire),
+  objets ORM + ``isoformat()`` contre lignes brutes
+* formats négociés par ``Accept`` (``app/utils/response_formats.py``) : JSON en
+  colonnes, MessagePack et Arrow IPC (si pyarrow est installé), taille comprise
+
+Usage :
+    python -m benchmarks.bench_json --rows 100000 --repeat 5
+"""
+import argparse
+import os
+import time
+from datetime import datetime, timezone
+import numpy as np
+from fastapi.responses import JSONResponse
+from sqlalchemy import insert
+from app.models import Prediction
+from app.utils.fast_json import FastJSONResponse, orjson_available, prediction_records, scoring_columns, scoring_results
+from app.utils.latest_predictions import risk_level_for, risk_levels_for
+from app.utils.response_formats import available_formats, columns_from_rows, render
+from benchmarks.common import temporary_database
+
+PREDICTION_COLUMNS = (
+    Prediction.id, Prediction.employee_id, Prediction.prediction,
+    Prediction.probability, Prediction.probability_class_0, Prediction.created_at,
+)
+
+
+def _best(fn, repeat):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        body = fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(body)
+
+
+def _with_encoder(encoder, fn):
+    def run():
+        previous = os.environ.get("JSON_ENCODER")
+        os.environ["JSON_ENCODER"] = encoder
+        try:
+            return fn()
+        finally:
+            if previous is None:
+                os.environ.pop("JSON_ENCODER")
+            else:
+                os.environ["JSON_ENCODER"] = previous
+    return run
+
+
+def predict_scenarios(n, seed=0):
+    rng = np.random.default_rng(seed)
+    employee_ids = np.arange(1, n + 1) * 3
+    probabilities = rng.random(n)
+    predictions = (probabilities > 0.5).astype(int)
+
+    def per_row():
+        results = [
+            {
+                "employee_id": int(emp_id),
+                "employee_index": i,
+                "will_leave": bool(pred),
+                "probability": round(float(proba), 3),
+                "risk_level": risk_level_for(proba),
+            }
+            for i, (emp_id, pred, proba) in enumerate(zip(employee_ids, predictions, probabilities))
+        ]
+        return JSONResponse(content={"predictions": results}).body
+
+    def columnar():
+        results = scoring_results(employee_ids, predictions, probabilities, risk_levels_for(probabilities))
+        return FastJSONResponse(content={"predictions": results}).body
+
+    def formatted(format_name):
+        def run():
+            columns = scoring_columns(employee_ids, predictions, probabilities, risk_levels_for(probabilities))
+            return render(format_name, {"success": True}, columns)[0]
+        return run
+
+    return per_row, columnar, formatted
+
+
+def predictions_scenarios(SessionLocal):
+    def per_row():
+        with SessionLocal() as db:
+            rows = db.query(Prediction).all()
+            content = [
+                {
+                    "id": pred.id,
+                    "employee_id": pred.employee_id,
+                    "prediction": pred.prediction,
+                    "probability": pred.probability,
+                    "probabilities": pred.probabilities,
+                    "created_at": pred.created_at.isoformat() if pred.created_at else None,
+                }
+                for pred in rows
+            ]
+            return JSONResponse(content={"predictions": content}).body
+
+    def columnar():
+        with SessionLocal() as db:
+            rows = db.query(*PREDICTION_COLUMNS).all()
+            return FastJSONResponse(content={"predictions": prediction_records(rows)}).body
+
+    def formatted(format_name):
+        def run():
+            with SessionLocal() as db:
+                rows = db.query(*PREDICTION_COLUMNS).all()
+                names = [column.key for column in PREDICTION_COLUMNS]
+                return render(format_name, {"success": True}, columns_from_rows(rows, names))[0]
+        return run
+
+    return per_row, columnar, formatted
+
+
+def _populate(engine, n, seed=0):
+    rng = np.random.default_rng(seed)
+    probabilities = rng.random(n)
+    created_at = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    with engine.begin() as conn:
+        conn.execute(insert(Prediction), [
+            {
+                "employee_id": i,
+                "prediction": int(p > 0.5),
+                "probability": float(p),
+                "probability_class_0": float(1 - p),
+                "created_at": created_at,
+            }
+            for i, p in enumerate(probabilities.tolist(), start=1)
+        ])
+
+
+def run(rows, repeat):
+    results = {}
+    encoders = ["json"] + (["orjson"] if orjson_available() else [])
+
+    formats = [name for name in available_formats() if name != "json"]
+
+    per_row, columnar, formatted = predict_scenarios(rows)
+    results["/predict par ligne (JSONResponse)"] = _best(per_row, repeat)
+    for encoder in encoders:
+        results[f"/predict par colonne ({encoder})"] = _best(_with_encoder(encoder, columnar), repeat)
+    for format_name in formats:
+        results[f"/predict Accept {format_name}"] = _best(formatted(format_name), repeat)
+
+    with temporary_database() as (_, engine, SessionLocal):
+        _populate(engine, rows)
+        per_row, columnar, formatted = predictions_scenarios(SessionLocal)
+        results["/predictions ORM (JSONResponse)"] = _best(per_row, repeat)
+        for encoder in encoders:
+            results[f"/predictions lignes ({encoder})"] = _best(_with_encoder(encoder, columnar), repeat)
+        for format_name in formats:
+            results[f"/predictions Accept {format_name}"] = _best(formatted(format_name), repeat)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    print(f"{'scénario':<40}{'ms':>10}{'Mo':>8}")
+    for name, (seconds, size) in results.items():
+        print(f"{name:<40}{seconds * 1000:>10.1f}{size / 1e6:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
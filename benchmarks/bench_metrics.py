@@ -0,0 +1,82 @@
+"""
+Surcoût des métriques sur le chemin critique : une observation d'histogramme,
+une étape de ``StageTimer`` avec et sans export, et une requête ASGI minimale
+avec et sans ``MetricsMiddleware`` (toutes les requêtes dans la même boucle
+d'événements, pour isoler le coût du middleware).
+
+Usage :
+    python -m benchmarks.bench_metrics --observations 200000 --requests 50000
+"""
+import argparse
+import asyncio
+import time
+from app.utils.metrics import Histogram, MetricsMiddleware, Registry, stage_observer
+from app.utils.timing import StageTimer
+
+
+def _per_call(fn, n):
+    start = time.perf_counter()
+    for _ in range(n):
+        fn()
+    return (time.perf_counter() - start) / n
+
+
+def _stage_loop(timer):
+    with timer.stage("predict"):
+        pass
+
+
+async def _ping(scope, receive, send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"ok"})
+
+
+def _per_request(app, n):
+    scope = {"type": "http", "method": "GET", "path": "/ping"}
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def loop():
+        start = time.perf_counter()
+        for _ in range(n):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - start) / n
+
+    return asyncio.run(loop())
+
+
+def run(observations, requests):
+    histogram = Histogram("bench_seconds", "Benchmark", ["endpoint", "stage"], registry=Registry())
+    results = {
+        "histogram.observe": _per_call(lambda: histogram.observe(0.003, endpoint="predict", stage="load"), observations),
+        "StageTimer.stage (sans export)": _per_call(lambda: _stage_loop(StageTimer()), observations),
+        "StageTimer.stage (avec export)": _per_call(
+            lambda: _stage_loop(StageTimer(on_stage=stage_observer("bench"))), observations
+        ),
+    }
+
+    results["requête ASGI (sans middleware)"] = _per_request(_ping, requests)
+    results["requête ASGI (avec middleware)"] = _per_request(MetricsMiddleware(_ping), requests)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--observations", type=int, default=200_000)
+    parser.add_argument("--requests", type=int, default=50_000)
+    args = parser.parse_args()
+
+    results = run(args.observations, args.requests)
+    print(f"{'opération':<36}{'µs / appel':>12}")
+    for name, seconds in results.items():
+        print(f"{name:<36}{seconds * 1e6:>12.2f}")
+    overhead = results["requête ASGI (avec middleware)"] - results["requête ASGI (sans middleware)"]
+    print(f"\nSurcoût du middleware par requête : {overhead * 1e6:.2f} µs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Comparaison taille / latence de lecture : colonne JSON ``probabilities`` (ancien schéma)
+contre colonnes flottantes par classe (``probability_class_0`` + ``probability``).
+
+Usage :
+    python -m benchmarks.bench_probability_storage --rows 200000
+"""
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+from sqlalchemy import create_engine, Table, Column, Integer, Float, DateTime, JSON, MetaData, select, text
+from sqlalchemy.sql import func
+
+
+def _build_table(metadata, compact):
+    columns = [
+        Column('id', Integer, primary_key=True),
+        Column('employee_id', Integer),
+        Column('prediction', Integer),
+        Column('probability', Float),
+    ]
+    columns.append(Column('probability_class_0', Float) if compact else Column('probabilities', JSON))
+    columns.append(Column('created_at', DateTime(timezone=True), server_default=func.now()))
+    return Table('predictions', metadata, *columns)
+
+
+def _fill(engine, table, probas, compact, batch_size=50_000):
+    for start in range(0, len(probas), batch_size):
+        rows = []
+        for i, p in enumerate(probas[start:start + batch_size], start=start):
+            p = float(p)
+            row = {'employee_id': i, 'prediction': int(p > 0.5), 'probability': p}
+            if compact:
+                row['probability_class_0'] = 1.0 - p
+            else:
+                row['probabilities'] = [1.0 - p, p]
+            rows.append(row)
+        with engine.begin() as conn:
+            conn.execute(table.insert(), rows)
+    with engine.connect() as conn:
+        conn.execute(text("VACUUM"))
+
+
+def _read(engine, table, compact):
+    start = time.perf_counter()
+    with engine.connect() as conn:
+        result = conn.execute(select(table))
+        payload = [
+            {
+                "id": row.id,
+                "employee_id": row.employee_id,
+                "prediction": row.prediction,
+                "probability": row.probability,
+                "probabilities": [row.probability_class_0, row.probability] if compact else row.probabilities,
+                "created_at": row.created_at.isoformat() if row.created_at else None,
+            }
+            for row in result
+        ]
+    return time.perf_counter() - start, len(payload)
+
+
+def run(rows, repeat=3, seed=0):
+    probas = np.random.default_rng(seed).random(rows)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, compact in (("json", False), ("class_columns", True)):
+            path = os.path.join(tmp, f"{name}.db")
+            engine = create_engine(f"sqlite:///{path}")
+            table = _build_table(MetaData(), compact)
+            table.metadata.create_all(engine)
+            _fill(engine, table, probas, compact)
+            timings = [_read(engine, table, compact)[0] for _ in range(repeat)]
+            engine.dispose()
+            results[name] = {
+                "size_bytes": os.path.getsize(path),
+                "read_seconds": min(timings),
+            }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    results = run(args.rows, args.repeat)
+    json_res, compact_res = results["json"], results["class_columns"]
+    print(f"{'stockage':<15}{'taille (Mo)':>14}{'lecture (s)':>14}")
+    for name, res in results.items():
+        print(f"{name:<15}{res['size_bytes'] / 1e6:>14.2f}{res['read_seconds']:>14.3f}")
+    print(f"gain taille : {1 - compact_res['size_bytes'] / json_res['size_bytes']:.1%}, "
+          f"gain lecture : {1 - compact_res['read_seconds'] / json_res['read_seconds']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
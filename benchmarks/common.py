@@ -0,0 +1,69 @@
+"""
+Outils partagés par les benchmarks : pipeline de substitution, jeux de données
+synthétiques et base SQLite temporaire alimentée avec les tables sources.
+"""
+import os
+import tempfile
+from contextlib import contextmanager
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from app.database import Base
+from app.utils.query_timing import instrument_engine
+from data.generate_dataset import generate
+
+
+class StubPipeline:
+    """
+    Remplace ``full_pipeline.joblib`` quand le modèle est absent (pointeur LFS, CI) :
+    score logistique déterministe des colonnes numériques, mêmes méthodes que le pipeline.
+    """
+
+    def predict_proba(self, X):
+        numeric = X.select_dtypes("number").to_numpy(dtype=float)
+        score = np.sin(numeric.sum(axis=1))
+        positive = 1.0 / (1.0 + np.exp(-3 * score))
+        return np.column_stack([1.0 - positive, positive])
+
+    def predict(self, X):
+        return (self.predict_proba(X)[:, 1] > 0.5).astype(int)
+
+
+def load_pipeline():
+    """Retourne ``(pipeline, "real")`` si le modèle est chargé, sinon ``(StubPipeline(), "stub")``."""
+    from app import main
+    if main.pipeline is not None:
+        return main.pipeline, "real"
+    return StubPipeline(), "stub"
+
+
+def synthetic_sources(n, seed=0):
+    """
+    Tables sources de ``n`` employés produites par ``data.generate_dataset`` puis relues
+    comme à l'ingestion (``pd.read_csv``).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = generate(n, tmp, seed=seed)
+        return tuple(pd.read_csv(paths[table]) for table in ("extrait_eval", "extrait_sirh", "extrait_sondage"))
+
+
+@contextmanager
+def temporary_database(eval_df=None, sirh_df=None, sondage_df=None):
+    """
+    Base SQLite temporaire avec le schéma de l'application et, si fournies, les tables
+    sources. Retourne ``(url, engine, SessionLocal)``. Le schéma suit le dialecte configuré :
+    lancer les benchmarks sans les variables PostgreSQL (``DB_PORT``...).
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        url = f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+        engine = instrument_engine(create_engine(url, connect_args={"check_same_thread": False}))
+        Base.metadata.create_all(engine)
+        if sirh_df is not None:
+            sirh_df.to_sql("extrait_sirh", engine, if_exists="replace", index=False, chunksize=50_000)
+            eval_df.to_sql("extrait_eval", engine, if_exists="replace", index=False, chunksize=50_000)
+            sondage_df.to_sql("extrait_sondage", engine, if_exists="replace", index=False, chunksize=50_000)
+        try:
+            yield url, engine, sessionmaker(bind=engine, autoflush=False)
+        finally:
+            engine.dispose()
@@ -0,0 +1,230 @@
+"""
+Test de charge avec rapport de SLO, sans service externe.
+
+Par défaut, l'application est pilotée en processus (ASGI, via ``httpx.ASGITransport``)
+sur une base SQLite temporaire alimentée par ``data.generate_dataset``, avec le
+pipeline de substitution si le modèle est absent. ``--url`` cible à la place une
+instance lancée à part (``uvicorn app.main:app``).
+
+Le trafic mélange ``POST /predict_one``, la pagination ``GET /predictions`` et de
+rares ``POST /predict`` (``--mix``). Avec ``--rate``, les arrivées suivent un
+processus de Poisson (charge ouverte) et la latence est mesurée depuis l'instant
+d'arrivée prévu, ce qui inclut l'attente quand le service sature. Sans ``--rate``,
+``--concurrency`` clients enchaînent les requêtes (charge fermée).
+
+Le rapport donne, par endpoint, le débit, le taux d'erreur et les latences
+p50/p95/p99 comparées aux objectifs (``--slo``). Le code de sortie vaut 1 si un
+objectif n'est pas tenu.
+
+Usage :
+    python -m benchmarks.loadtest --duration 30 --rate 50 --concurrency 16
+    python -m benchmarks.loadtest --url http://localhost:8000 --duration 60 --rate 20 \\
+        --slo predict_one.p95=80 --slo predict_one.p99=200 --output report.json
+"""
+import argparse
+import asyncio
+import json
+import random
+import sys
+import time
+from contextlib import ExitStack
+from unittest.mock import patch
+import httpx
+import numpy as np
+
+DEFAULT_MIX = {"predict_one": 85, "predictions": 14, "predict": 1}
+
+# Objectifs par défaut (latences en ms, taux d'erreur en fraction)
+DEFAULT_SLO = {
+    "predict_one": {"p95": 100.0, "p99": 250.0, "error_rate": 0.01},
+    "predictions": {"p95": 100.0, "p99": 250.0, "error_rate": 0.01},
+    "predict": {"p95": 5000.0, "error_rate": 0.01},
+}
+
+
+def parse_mix(text):
+    mix = {}
+    for part in text.split(","):
+        name, weight = part.split("=")
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Endpoint inconnu dans --mix: {name}")
+        mix[name] = float(weight)
+    return mix
+
+
+def parse_slo(entries):
+    """``["predict_one.p95=80", "predict.error_rate=0.05"]`` -> objectifs fusionnés aux défauts."""
+    slo = {endpoint: dict(targets) for endpoint, targets in DEFAULT_SLO.items()}
+    for entry in entries or []:
+        key, value = entry.split("=")
+        endpoint, metric = key.split(".")
+        slo.setdefault(endpoint, {})[metric] = float(value)
+    return slo
+
+
+def _employee_payload(rng):
+    return {
+        "employee_id": rng.randint(1, 1_000_000),
+        "age": rng.randint(18, 60),
+        "revenu_mensuel": float(rng.randint(1000, 20000)),
+        "annees_dans_l_entreprise": rng.randint(0, 20),
+        "distance_domicile_travail": float(rng.randint(1, 29)),
+        "satisfaction_employee_environnement": rng.randint(1, 4),
+        "heure_supplementaires": rng.randint(0, 1),
+    }
+
+
+async def _call(client, endpoint, rng):
+    if endpoint == "predict_one":
+        return await client.post("/predict_one", json=_employee_payload(rng))
+    if endpoint == "predictions":
+        return await client.get("/predictions", params={"skip": rng.randint(0, 500), "limit": 100})
+    return await client.post("/predict")
+
+
+async def run_load(client, duration, rate=None, concurrency=8, mix=None, seed=0, max_requests=None):
+    """Exécute la charge et retourne ``{endpoint: [(latence_s, statut), ...]}`` et la durée réelle."""
+    mix = mix or DEFAULT_MIX
+    rng = random.Random(seed)
+    endpoints, weights = zip(*mix.items())
+    samples = {endpoint: [] for endpoint in endpoints}
+    semaphore = asyncio.Semaphore(concurrency)
+    start = time.perf_counter()
+    deadline = start + duration
+
+    async def one(endpoint, scheduled_at):
+        async with semaphore:
+            try:
+                status = (await _call(client, endpoint, rng)).status_code
+            except httpx.HTTPError:
+                status = 0
+        samples[endpoint].append((time.perf_counter() - scheduled_at, status))
+
+    sent = 0
+    if rate:
+        tasks = []
+        next_arrival = start
+        while next_arrival < deadline and (max_requests is None or sent < max_requests):
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.create_task(one(rng.choices(endpoints, weights)[0], next_arrival)))
+            sent += 1
+            next_arrival += rng.expovariate(rate)
+        await asyncio.gather(*tasks)
+    else:
+        async def worker():
+            nonlocal sent
+            while time.perf_counter() < deadline and (max_requests is None or sent < max_requests):
+                sent += 1
+                await one(rng.choices(endpoints, weights)[0], time.perf_counter())
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+
+    return samples, time.perf_counter() - start
+
+
+def build_report(samples, elapsed, slo):
+    report = {"elapsed_seconds": round(elapsed, 3), "endpoints": {}, "slo_violations": []}
+    for endpoint, values in samples.items():
+        if not values:
+            continue
+        latencies = np.array([latency for latency, _ in values]) * 1000
+        errors = sum(1 for _, status in values if status == 0 or status >= 500)
+        stats = {
+            "requests": len(values),
+            "throughput_rps": round(len(values) / elapsed, 2),
+            "error_rate": round(errors / len(values), 4),
+            "p50": round(float(np.percentile(latencies, 50)), 2),
+            "p95": round(float(np.percentile(latencies, 95)), 2),
+            "p99": round(float(np.percentile(latencies, 99)), 2),
+            "max": round(float(latencies.max()), 2),
+        }
+        report["endpoints"][endpoint] = stats
+        for metric, target in slo.get(endpoint, {}).items():
+            if stats[metric] > target:
+                report["slo_violations"].append(
+                    {"endpoint": endpoint, "metric": metric, "value": stats[metric], "target": target}
+                )
+    return report
+
+
+def format_report(report, slo):
+    lines = [f"{'endpoint':<14}{'req':>7}{'req/s':>9}{'err':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  SLO"]
+    violated = {(v["endpoint"], v["metric"]) for v in report["slo_violations"]}
+    for endpoint, stats in report["endpoints"].items():
+        targets = slo.get(endpoint, {})
+        verdict = ", ".join(
+            f"{metric}{'>' if (endpoint, metric) in violated else '<='}{target:g}" for metric, target in targets.items()
+        )
+        status = "ÉCHEC" if any(e == endpoint for e, _ in violated) else "OK"
+        lines.append(
+            f"{endpoint:<14}{stats['requests']:>7}{stats['throughput_rps']:>9.1f}{stats['error_rate']:>8.1%}"
+            f"{stats['p50']:>10.1f}{stats['p95']:>10.1f}{stats['p99']:>10.1f}  {status} ({verdict})"
+        )
+    return "\n".join(lines)
+
+
+def _in_process_client(stack, employees, seed):
+    """Application en processus sur SQLite temporaire, avec pipeline de substitution si besoin."""
+    from app import main
+    from app.database import get_db
+    from benchmarks.common import StubPipeline, synthetic_sources, temporary_database
+
+    url, _, SessionLocal = stack.enter_context(temporary_database(*synthetic_sources(employees, seed=seed)))
+
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[get_db] = override_get_db
+    stack.callback(main.app.dependency_overrides.pop, get_db, None)
+    stack.enter_context(patch.object(main, "DATABASE_URL", url))
+    if main.pipeline is None:
+        stack.enter_context(patch.object(main, "pipeline", StubPipeline()))
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://loadtest")
+
+
+def run(url=None, employees=1_000, duration=10.0, rate=None, concurrency=8, mix=None, slo=None, seed=0,
+        max_requests=None):
+    slo = slo or DEFAULT_SLO
+    with ExitStack() as stack:
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=60)
+        else:
+            client = _in_process_client(stack, employees, seed)
+
+        async def main_loop():
+            async with client:
+                return await run_load(client, duration, rate, concurrency, mix, seed, max_requests)
+
+        samples, elapsed = asyncio.run(main_loop())
+    return build_report(samples, elapsed, slo)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="instance à tester (défaut: application en processus)")
+    parser.add_argument("--employees", type=int, default=1_000, help="taille des tables sources (en processus)")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée en secondes")
+    parser.add_argument("--rate", type=float, help="arrivées par seconde (défaut: charge fermée)")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--mix", default="predict_one=85,predictions=14,predict=1")
+    parser.add_argument("--slo", action="append", help="objectif, ex. predict_one.p95=80 (ms) ou predict.error_rate=0.05")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="fichier JSON du rapport")
+    args = parser.parse_args()
+
+    slo = parse_slo(args.slo)
+    report = run(args.url, args.employees, args.duration, args.rate, args.concurrency, parse_mix(args.mix), slo, args.seed)
+    print(format_report(report, slo))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({**report, "slo": slo}, f, indent=2)
+    return 1 if report["slo_violations"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,185 @@
+"""
+Rejeu déterministe d'une capture de trafic (``app/utils/traffic_capture.py``).
+
+``run`` renvoie les requêtes capturées, dans l'ordre et avec les mêmes corps,
+en respectant les écarts d'arrivée d'origine divisés par ``--speed`` (2 = deux fois
+plus vite ; 0 = sans attente, ``--concurrency`` requêtes à la fois). La latence est
+mesurée depuis l'instant d'arrivée prévu, comme dans ``benchmarks/loadtest.py``.
+Sans ``--url``, l'application est pilotée en processus (SQLite temporaire, pipeline
+de substitution si le modèle est absent) : lancer sans les variables PostgreSQL.
+
+``compare`` confronte deux rejeux de la même capture (deux versions de
+l'application) : percentiles par endpoint, écart médian requête par requête et
+statuts divergents. Le code de sortie vaut 1 si un écart dépasse ``--threshold``.
+
+Usage :
+    python -m benchmarks.replay run captures/traffic.ndjson.gz --output avant.json
+    python -m benchmarks.replay run captures/traffic.ndjson.gz --speed 4 --output apres.json
+    python -m benchmarks.replay compare avant.json apres.json --threshold 0.1
+"""
+import argparse
+import asyncio
+import json
+import sys
+import time
+from contextlib import ExitStack
+import httpx
+import numpy as np
+from app.utils.traffic_capture import read_capture
+from benchmarks.loadtest import _in_process_client, build_report
+
+PERCENTILES = ("p50", "p95", "p99")
+
+
+def endpoint_name(path):
+    return path.strip("/") or "root"
+
+
+async def replay(client, records, speed=1.0, concurrency=64):
+    """Rejoue ``records`` ; retourne un résultat par requête, dans l'ordre de la capture, et la durée."""
+    results = [None] * len(records)
+    semaphore = asyncio.Semaphore(concurrency)
+    origin = records[0]["ts"] if records else 0.0
+    start = time.perf_counter()
+
+    async def one(index, record, scheduled_at):
+        async with semaphore:
+            sent_at = time.perf_counter()
+            try:
+                response = await client.request(
+                    record["method"],
+                    record["path"] + (f"?{record['query']}" if record.get("query") else ""),
+                    json=record.get("body"),
+                )
+                status = response.status_code
+            except httpx.HTTPError:
+                status = 0
+        # Sans cadence d'origine, pas d'instant prévu : la latence part de l'envoi
+        reference = scheduled_at if speed else sent_at
+        results[index] = {
+            "endpoint": endpoint_name(record["path"]),
+            "status": status,
+            "latency_ms": round((time.perf_counter() - reference) * 1000, 3),
+            "captured_status": record.get("status"),
+            "captured_ms": record.get("duration_ms"),
+        }
+
+    tasks = []
+    for index, record in enumerate(records):
+        scheduled_at = start + ((record["ts"] - origin) / speed if speed else 0.0)
+        delay = scheduled_at - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one(index, record, scheduled_at)))
+    await asyncio.gather(*tasks)
+    return results, time.perf_counter() - start
+
+
+def summarize(results, elapsed):
+    samples = {}
+    for result in results:
+        samples.setdefault(result["endpoint"], []).append((result["latency_ms"] / 1000, result["status"]))
+    return build_report(samples, elapsed, slo={})
+
+
+def run(capture, url=None, speed=1.0, concurrency=64, employees=1_000, seed=0):
+    records = read_capture(capture)
+    with ExitStack() as stack:
+        if url:
+            client = httpx.AsyncClient(base_url=url, timeout=60)
+        else:
+            client = _in_process_client(stack, employees, seed)
+
+        async def main_loop():
+            async with client:
+                return await replay(client, records, speed, concurrency)
+
+        results, elapsed = asyncio.run(main_loop())
+    report = summarize(results, elapsed)
+    report.pop("slo_violations")
+    return {"capture": str(capture), "speed": speed, **report, "requests": results}
+
+
+def compare(baseline, current, threshold):
+    """Retourne les lignes du rapport et la liste des écarts ``endpoint.métrique`` au-delà du seuil."""
+    if len(baseline["requests"]) != len(current["requests"]):
+        raise ValueError("Les deux rejeux ne portent pas sur la même capture")
+
+    lines = [f"{'endpoint':<16}{'métrique':<12}{'référence (ms)':>16}{'actuel (ms)':>13}{'écart':>10}"]
+    regressions = []
+
+    def add(endpoint, metric, reference, value, change):
+        flag = ""
+        if change > threshold:
+            regressions.append(f"{endpoint}.{metric}")
+            flag = "  RÉGRESSION"
+        lines.append(f"{endpoint:<16}{metric:<12}{reference:>16.2f}{value:>13.2f}{change:>+10.1%}{flag}")
+
+    for endpoint, stats in current["endpoints"].items():
+        reference = baseline["endpoints"].get(endpoint)
+        if reference is None:
+            continue
+        for metric in PERCENTILES:
+            add(endpoint, metric, reference[metric], stats[metric], stats[metric] / reference[metric] - 1)
+        # Même requête rejouée des deux côtés : le rapport apparié neutralise le mélange des corps
+        pairs = [
+            (before["latency_ms"], after["latency_ms"])
+            for before, after in zip(baseline["requests"], current["requests"])
+            if before["endpoint"] == endpoint
+        ]
+        ratios = np.array([after / before for before, after in pairs if before > 0])
+        if len(ratios):
+            add(endpoint, "apparié", float(np.median([b for b, _ in pairs])),
+                float(np.median([a for _, a in pairs])), float(np.median(ratios)) - 1)
+
+    mismatches = sum(
+        1 for before, after in zip(baseline["requests"], current["requests"]) if before["status"] != after["status"]
+    )
+    if mismatches:
+        lines.append(f"\n{mismatches} requête(s) avec un statut différent")
+        regressions.append("status")
+    return lines, regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="rejouer une capture")
+    run_parser.add_argument("capture")
+    run_parser.add_argument("--url", help="instance à tester (défaut: application en processus)")
+    run_parser.add_argument("--speed", type=float, default=1.0, help="facteur d'accélération (0 = sans attente)")
+    run_parser.add_argument("--concurrency", type=int, default=64)
+    run_parser.add_argument("--employees", type=int, default=1_000, help="taille des tables sources (en processus)")
+    run_parser.add_argument("--output", default="replay.json")
+
+    compare_parser = commands.add_parser("compare", help="comparer deux rejeux")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1, help="écart toléré (0.1 = +10 %%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run(args.capture, args.url, args.speed, args.concurrency, args.employees)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        for endpoint, stats in report["endpoints"].items():
+            print(f"{endpoint:<16}{stats['requests']:>7} req  p50 {stats['p50']:.1f} ms  "
+                  f"p95 {stats['p95']:.1f} ms  p99 {stats['p99']:.1f} ms  erreurs {stats['error_rate']:.1%}")
+        print(f"Résultats écrits dans {args.output}")
+        return 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} écart(s) au-delà de {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
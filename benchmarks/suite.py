@@ -0,0 +1,292 @@
+"""
+Suite de benchmarks hors ligne (SQLite temporaire, pipeline de substitution si le
+modèle est absent) : preprocessing, inférence, persistance et endpoints.
+
+Scénarios, pour chaque taille N :
+
+* ``preprocess_input`` : merge + features sur N employés
+* ``inference_double_pass`` : ``predict`` puis ``predict_proba`` (comme ``/predict``)
+* ``inference_single_pass`` : ``predict_proba`` seul, classe déduite du seuil
+* ``persist_orm`` : N objets ``Prediction`` ajoutés à la session puis commit
+* ``persist_bulk`` : insertion groupée (``executemany``) des mêmes lignes
+* ``predict_endpoint`` : ``POST /predict`` complet via l'application ASGI
+
+et, indépendamment de N :
+
+* ``preprocess_single_employee`` : 1 000 appels
+* ``predict_one_endpoint`` : 200 requêtes ``POST /predict_one`` via ASGI
+
+Usage :
+    python -m benchmarks.suite run --preset quick --output results.json
+    python -m benchmarks.suite run --sizes 1000,10000,100000,1000000 --output full.json
+    python -m benchmarks.suite compare baseline.json results.json --threshold 0.15
+
+Un scénario qui échoue (ex. ``/predict`` en erreur, mémoire insuffisante) est
+enregistré avec ``failed`` et son erreur, et la suite continue avec les suivants.
+``compare`` affiche le rapport des médianes et sort avec le code 1 si un scénario
+est plus lent que la référence au-delà du seuil, ou s'il échoue.
+"""
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from unittest.mock import patch
+import numpy as np
+from sqlalchemy import insert
+from app import main
+from app.database import get_db
+from app.models import Prediction
+from app.utils.preprocessing import preprocess_input, preprocess_single_employee
+from benchmarks.asgi import asgi_request
+from benchmarks.common import load_pipeline, synthetic_sources, temporary_database
+
+PRESETS = {
+    "quick": [1_000, 10_000],
+    "full": [1_000, 10_000, 100_000, 1_000_000],
+}
+SINGLE_EMPLOYEE_CALLS = 1_000
+PREDICT_ONE_REQUESTS = 200
+
+
+def _measure(fn, repeat):
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+
+def _result(durations, rows=None, calls=None):
+    median = statistics.median(durations)
+    result = {"median_seconds": median, "min_seconds": min(durations), "runs": durations}
+    if rows:
+        result["rows_per_second"] = rows / median
+    if calls:
+        result["per_call_ms"] = 1000 * median / calls
+    return result
+
+
+def _failure(error):
+    return {"failed": True, "error": f"{type(error).__name__}: {error}"}
+
+
+def _scenario(results, name, fn, repeat, **result_args):
+    """Mesure ``fn`` sous ``name`` ; une exception est enregistrée comme échec du scénario."""
+    try:
+        results[name] = _result(_measure(fn, repeat), **result_args)
+    except Exception as e:
+        print(f"  {name} : échec ({type(e).__name__}: {e})", file=sys.stderr)
+        results[name] = _failure(e)
+
+
+def _check_status(path, status):
+    if status != 200:
+        raise RuntimeError(f"{path} a répondu {status}")
+
+
+def _prediction_rows(probabilities):
+    return [
+        {"employee_id": i, "prediction": int(p[1] > 0.5), "probability": float(p[1]),
+         "probability_class_0": float(p[0])}
+        for i, p in enumerate(probabilities, start=1)
+    ]
+
+
+def _persist_orm(SessionLocal, rows):
+    db = SessionLocal()
+    try:
+        for row in rows:
+            db.add(Prediction(**row))
+        db.commit()
+    finally:
+        db.close()
+
+
+def _persist_bulk(engine, rows):
+    with engine.begin() as conn:
+        conn.execute(insert(Prediction), rows)
+
+
+def _override_db(SessionLocal):
+    def override_get_db():
+        db = SessionLocal()
+        try:
+            yield db
+        finally:
+            db.close()
+    main.app.dependency_overrides[get_db] = override_get_db
+
+
+def bench_size(n, pipeline, repeat, results):
+    eval_df, sirh_df, sondage_df = synthetic_sources(n)
+    repeat = repeat if n < 100_000 else 1
+
+    _scenario(
+        results, f"preprocess_input/n={n}",
+        lambda: preprocess_input(eval_df.copy(), sirh_df.copy(), sondage_df.copy()), repeat, rows=n,
+    )
+
+    X = preprocess_input(eval_df.copy(), sirh_df.copy(), sondage_df.copy())
+
+    def double_pass():
+        pipeline.predict(X)
+        pipeline.predict_proba(X)
+
+    def single_pass():
+        probabilities = pipeline.predict_proba(X)
+        return (probabilities[:, 1] > 0.5).astype(int)
+
+    _scenario(results, f"inference_double_pass/n={n}", double_pass, repeat, rows=n)
+    _scenario(results, f"inference_single_pass/n={n}", single_pass, repeat, rows=n)
+
+    rows = _prediction_rows(pipeline.predict_proba(X))
+    with temporary_database(eval_df, sirh_df, sondage_df) as (url, engine, SessionLocal):
+        _scenario(results, f"persist_orm/n={n}", lambda: _persist_orm(SessionLocal, rows), repeat, rows=n)
+        _scenario(results, f"persist_bulk/n={n}", lambda: _persist_bulk(engine, rows), repeat, rows=n)
+
+        _override_db(SessionLocal)
+        try:
+            with patch.object(main, "pipeline", pipeline), patch.object(main, "DATABASE_URL", url):
+                def bulk_predict():
+                    status, _, _ = asgi_request(main.app, "/predict", method="POST")
+                    _check_status("/predict", status)
+                _scenario(results, f"predict_endpoint/n={n}", bulk_predict, repeat, rows=n)
+        finally:
+            main.app.dependency_overrides.pop(get_db, None)
+
+
+def bench_single(pipeline, repeat, results):
+    employee = main.EmployeeInput(employee_id=1).model_dump()
+
+    def single_employee():
+        for _ in range(SINGLE_EMPLOYEE_CALLS):
+            preprocess_single_employee(employee)
+
+    _scenario(results, "preprocess_single_employee", single_employee, repeat, calls=SINGLE_EMPLOYEE_CALLS)
+
+    body = json.dumps(employee).encode()
+    with temporary_database() as (_, _, SessionLocal):
+        _override_db(SessionLocal)
+        try:
+            with patch.object(main, "pipeline", pipeline):
+                def predict_one():
+                    for _ in range(PREDICT_ONE_REQUESTS):
+                        status, _, _ = asgi_request(
+                            main.app, "/predict_one", method="POST", body=body,
+                            headers=[("content-type", "application/json")]
+                        )
+                        _check_status("/predict_one", status)
+                _scenario(results, "predict_one_endpoint", predict_one, repeat, calls=PREDICT_ONE_REQUESTS)
+        finally:
+            main.app.dependency_overrides.pop(get_db, None)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(sizes, repeat=3):
+    pipeline, model = load_pipeline()
+    results = {}
+    bench_single(pipeline, repeat, results)
+    for n in sizes:
+        print(f"Taille {n}...", file=sys.stderr)
+        try:
+            bench_size(n, pipeline, repeat, results)
+        except Exception as e:
+            # Échec hors scénario (génération des données, base temporaire...) : taille suivante
+            print(f"  taille {n} : échec ({type(e).__name__}: {e})", file=sys.stderr)
+            results[f"size/n={n}"] = _failure(e)
+    return {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "numpy": np.__version__,
+            "model": model,
+            "sizes": sizes,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold):
+    """Retourne les lignes du rapport et la liste des scénarios en régression."""
+    lines = [f"{'scénario':<40}{'référence (s)':>15}{'actuel (s)':>13}{'écart':>10}"]
+    regressions = []
+    for name, result in current["results"].items():
+        reference = baseline["results"].get(name)
+        if result.get("failed"):
+            regressions.append(name)
+            lines.append(f"{name:<40}{'-':>15}{'échec':>13}{'':>10}  {result['error']}")
+            continue
+        if reference is None or reference.get("failed"):
+            lines.append(f"{name:<40}{'-':>15}{result['median_seconds']:>13.4f}{'nouveau':>10}")
+            continue
+        change = result["median_seconds"] / reference["median_seconds"] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  RÉGRESSION"
+        lines.append(
+            f"{name:<40}{reference['median_seconds']:>15.4f}{result['median_seconds']:>13.4f}{change:>+10.1%}{flag}"
+        )
+    return lines, regressions
+
+
+def main_cli(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="exécuter la suite")
+    run_parser.add_argument("--preset", choices=sorted(PRESETS), default="quick")
+    run_parser.add_argument("--sizes", help="tailles séparées par des virgules (remplace --preset)")
+    run_parser.add_argument("--repeat", type=int, default=3)
+    run_parser.add_argument("--output", default="benchmark_results.json")
+
+    compare_parser = commands.add_parser("compare", help="comparer à une référence")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15, help="écart toléré (0.15 = +15 %%)")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        sizes = [int(size) for size in args.sizes.split(",")] if args.sizes else PRESETS[args.preset]
+        report = run(sizes, args.repeat)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        failed = [name for name, result in report["results"].items() if result.get("failed")]
+        for name, result in report["results"].items():
+            if result.get("failed"):
+                print(f"{name:<40}{'échec':>12}  {result['error']}")
+            else:
+                print(f"{name:<40}{result['median_seconds']:>12.4f} s")
+        print(f"Résultats écrits dans {args.output}")
+        return 1 if failed else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    lines, regressions = compare(baseline, current, args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print(f"\n{len(regressions)} régression(s) au-delà de {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -1,5 +1,5 @@
 import pandas as pd
-from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, JSON, Table, MetaData
+from sqlalchemy import create_engine, Column, Integer, Float, String, DateTime, JSON, Table, MetaData, Index, ForeignKey, DDL, event
 from sqlalchemy.sql import func
 import os
 from dotenv import load_dotenv
@@ -20,6 +20,22 @@ else:
     DB_NAME = os.getenv('DB_NAME')
     connection_string = f'postgresql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}'
 
+def refresh_features(engine, df_eval, df_sirh, df_sondage):
+    """
+    Crée les index des tables sources et met à jour employee_features (nécessite le
+    package app : python -m data.create_db).
+    """
+    try:
+        from app.utils.feature_store import refresh_feature_store
+        from app.utils.preprocessing import create_source_indexes
+    except ImportError:
+        print("employee_features non mise à jour : lancer python -m data.create_db")
+        return
+    with engine.begin() as conn:
+        create_source_indexes(conn)
+    print(f"employee_features: {refresh_feature_store(engine, df_eval, df_sirh, df_sondage)}")
+
+
 def create_database():
     try:
         if "sqlite" in connection_string:
@@ -27,17 +43,44 @@ def create_database():
         else:
             engine = create_engine(connection_string)
         metadata = MetaData()
+        is_postgres = "sqlite" not in connection_string
 
+        scoring_runs_table = Table(
+            'scoring_runs',
+            metadata,
+            Column('id', Integer, primary_key=True, index=True),
+            Column('source', String(32), nullable=False),
+            Column('status', String(16), nullable=False),
+            Column('model_version', String(64)),
+            Column('row_count', Integer),
+            Column('stage_timings', JSON),
+            Column('started_at', DateTime(timezone=True), server_default=func.now()),
+            Column('finished_at', DateTime(timezone=True))
+        )
+
+        # Même schéma que app.models.Prediction : partitionnée par mois sur created_at
+        # sous PostgreSQL (la clé de partition fait alors partie de la clé primaire)
         predictions_table = Table(
             'predictions',
             metadata,
-            Column('id', Integer, primary_key=True, autoincrement=True),
+            Column('id', Integer, primary_key=True, autoincrement=True, index=True),
             Column('employee_id', Integer),
             Column('prediction', Integer),
             Column('probability', Float),
-            Column('probabilities', JSON),
-            Column('created_at', DateTime(timezone=True), server_default=func.now())
+            Column('probability_class_0', Float),
+            Column('scoring_run_id', Integer, ForeignKey('scoring_runs.id')),
+            Column('created_at', DateTime(timezone=True), server_default=func.now(),
+                   primary_key=is_postgres, index=True),
+            Index('ix_predictions_employee_created', 'employee_id', 'created_at'),
+            Index('ix_predictions_scoring_run_id', 'scoring_run_id', 'id'),
+            **({'postgresql_partition_by': 'RANGE (created_at)'} if is_postgres else {'sqlite_autoincrement': True})
         )
+        if is_postgres:
+            event.listen(
+                predictions_table,
+                "after_create",
+                DDL("CREATE TABLE IF NOT EXISTS predictions_default PARTITION OF predictions DEFAULT"),
+            )
 
         metadata.create_all(engine)
 
@@ -50,6 +93,8 @@ def create_database():
         df_eval.to_sql('extrait_eval', engine, if_exists='replace', index=False)
 
         df_sondage.to_sql('extrait_sondage', engine, if_exists='replace', index=False)
+
+        refresh_features(engine, df_eval, df_sirh, df_sondage)
         print("Tables créées avec succès")
 
     except Exception as e:
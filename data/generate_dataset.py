@@ -0,0 +1,114 @@
+"""
+Générateur de jeux de données RH synthétiques à l'échelle (``extrait_sirh.csv``,
+``extrait_eval.csv``, ``extrait_sondage.csv``) pour les tests de charge.
+
+Chaque employé généré reprend une ligne tirée au hasard dans les CSV fournis (les
+trois tables sont alignées par employé), ce qui conserve les distributions et les
+corrélations entre colonnes, y compris entre tables (départ / heures sup. /
+satisfaction). Les formats d'origine sont conservés :
+
+* ``eval_number`` au format ``E_<id>``
+* ``code_sondage`` préfixé de ``00000`` (``000001``, ``0000010``, ``00000830``...)
+* augmentation de salaire en texte (``"11 %"``), drapeaux ``Oui``/``Non`` et ``Y``
+* identifiants non contigus, avec les mêmes écarts que les données d'origine
+
+Le revenu mensuel est légèrement bruité (±5 % environ) pour éviter les doublons exacts.
+
+La sortie est écrite par blocs (``--chunk-size`` lignes) : la mémoire reste constante
+quel que soit le nombre d'employés. Pour une même graine et une même taille de bloc,
+les fichiers produits sont identiques.
+
+Usage :
+    python -m data.generate_dataset --employees 10000000 --output-dir /tmp/hr --seed 42
+"""
+import argparse
+import os
+import numpy as np
+import pandas as pd
+
+DATA_DIR = os.path.dirname(os.path.abspath(__file__))
+TABLES = ("extrait_sirh", "extrait_eval", "extrait_sondage")
+CODE_SONDAGE_PREFIX = "00000"
+REVENU_BOUNDS = (1000, 20000)
+
+
+def load_templates(data_dir=DATA_DIR):
+    """Lit les CSV d'origine en texte (formats conservés tels quels)."""
+    templates = {
+        table: pd.read_csv(os.path.join(data_dir, f"{table}.csv"), dtype=str, keep_default_na=False)
+        for table in TABLES
+    }
+    lengths = {len(frame) for frame in templates.values()}
+    if len(lengths) != 1:
+        raise ValueError(f"Les tables sources n'ont pas le même nombre de lignes: {lengths}")
+    return templates
+
+
+def _id_steps(templates):
+    """Écarts entre identifiants consécutifs observés dans les données d'origine."""
+    ids = np.sort(templates["extrait_sirh"]["id_employee"].astype(int).to_numpy())
+    return np.diff(np.concatenate([[0], ids]))
+
+
+def iter_chunks(n_employees, seed=0, chunk_size=100_000, templates=None):
+    """Génère les trois tables par blocs : ``(sirh, eval, sondage)`` par itération."""
+    templates = templates or load_templates()
+    steps = _id_steps(templates)
+    columns = {table: {col: frame[col].to_numpy() for col in frame.columns} for table, frame in templates.items()}
+    n_templates = len(templates["extrait_sirh"])
+
+    last_id = 0
+    for chunk_index, start in enumerate(range(0, n_employees, chunk_size)):
+        size = min(chunk_size, n_employees - start)
+        rng = np.random.default_rng([seed, chunk_index])
+        rows = rng.integers(0, n_templates, size)
+
+        ids = last_id + np.cumsum(rng.choice(steps, size))
+        last_id = int(ids[-1])
+        id_text = ids.astype(str)
+
+        frames = {
+            table: pd.DataFrame({col: values[rows] for col, values in table_columns.items()})
+            for table, table_columns in columns.items()
+        }
+        sirh, eval_df, sondage = frames["extrait_sirh"], frames["extrait_eval"], frames["extrait_sondage"]
+
+        sirh["id_employee"] = id_text
+        revenu = sirh["revenu_mensuel"].astype(float).to_numpy() * rng.lognormal(0.0, 0.05, size)
+        sirh["revenu_mensuel"] = np.clip(np.rint(revenu), *REVENU_BOUNDS).astype(int)
+        eval_df["eval_number"] = np.char.add("E_", id_text)
+        sondage["code_sondage"] = np.char.add(CODE_SONDAGE_PREFIX, id_text)
+
+        yield sirh, eval_df, sondage
+
+
+def generate(n_employees, output_dir, seed=0, chunk_size=100_000):
+    """Écrit les trois CSV dans ``output_dir`` et retourne leurs chemins."""
+    os.makedirs(output_dir, exist_ok=True)
+    paths = {table: os.path.join(output_dir, f"{table}.csv") for table in TABLES}
+    files = {table: open(path, "w", encoding="utf-8", newline="") for table, path in paths.items()}
+    try:
+        for index, chunk in enumerate(iter_chunks(n_employees, seed=seed, chunk_size=chunk_size)):
+            for table, frame in zip(TABLES, chunk):
+                frame.to_csv(files[table], header=index == 0, index=False)
+    finally:
+        for f in files.values():
+            f.close()
+    return paths
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--employees", type=int, required=True)
+    parser.add_argument("--output-dir", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    args = parser.parse_args()
+
+    paths = generate(args.employees, args.output_dir, seed=args.seed, chunk_size=args.chunk_size)
+    for path in paths.values():
+        print(f"✓ {path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,9 +3,12 @@ from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 import os
+import pandas as pd
 from dotenv import load_dotenv
 from app.main import app
 from app.database import Base, get_db
+from app.utils.response_cache import PREDICTION_CACHE
+from app.utils.feature_index import FEATURE_INDEX
 
 load_dotenv()
 
@@ -21,6 +24,9 @@ SQLALCHEMY_DATABASE_URL = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{DB
 def test_engine():
     engine = create_engine(SQLALCHEMY_DATABASE_URL, pool_pre_ping=True)
     Base.metadata.create_all(bind=engine)
+    # Tables recréées : les corps mis en cache par un test précédent ne valent plus
+    PREDICTION_CACHE.invalidate()
+    FEATURE_INDEX.invalidate()
     yield engine
     Base.metadata.drop_all(bind=engine)
 
@@ -43,3 +49,53 @@ def client(test_db):
 
     app.dependency_overrides[get_db] = override_get_db
     return TestClient(app)
+
+
+@pytest.fixture
+def source_tables(test_db):
+    """Charge trois employés dans les tables extrait_* (format des tables sources)."""
+    sirh_df = pd.DataFrame({
+        'id_employee': [1, 2, 3],
+        'age': [30, 40, 25],
+        'nombre_heures_travaillees': [80, 90, 85],
+        'annees_experience_totale': [5, 10, 3],
+        'annees_dans_l_entreprise': [3, 8, 2],
+        'annees_dans_le_poste_actuel': [2, 5, 1],
+        'annees_depuis_la_derniere_promotion': [1, 2, 1],
+        'revenu_mensuel': [5000.0, 7000.0, 4000.0],
+        'heure_supplementaires': ['Oui', 'Non', 'Oui'],
+        'ayant_enfants': ['Oui', 'Oui', 'Non'],
+        'distance_domicile_travail': [10.0, 20.0, 5.0],
+        'departement': ['Sales', 'Research & Development', 'Sales'],
+        'niveau_education': [3, 4, 2],
+        'domaine_etude': ['Life Sciences', 'Medical', 'Marketing'],
+        'genre': ['Male', 'Female', 'Male'],
+        'poste': ['Sales Executive', 'Research Director', 'Sales Representative'],
+        'statut_marital': ['Married', 'Single', 'Married'],
+        'nombre_experiences_precedentes': [2, 5, 1]
+    })
+    eval_df = pd.DataFrame({
+        'eval_number': ['eval_1', 'eval_2', 'eval_3'],
+        'note_evaluation_precedente': [3, 4, 3],
+        'note_evaluation_actuelle': [3, 4, 3],
+        'augmentation_salaire_precedente': ['15 %', '20 %', '10 %']
+    })
+    sondage_df = pd.DataFrame({
+        'code_sondage': ['sondage_1', 'sondage_2', 'sondage_3'],
+        'satisfaction_employee_nature_travail': [3, 4, 2],
+        'satisfaction_employee_equilibre_pro_perso': [3, 4, 2],
+        'satisfaction_employee_environnement': [3, 4, 3],
+        'satisfaction_employee_equipe': [3, 4, 2],
+        'implication_employee': [3, 4, 2],
+        'annees_sous_reponsable_actuel': [2, 3, 1],
+        'nombre_employee_sous_responsabilite': [0, 5, 0],
+        'niveau_hierarchique_poste': [2, 4, 1],
+        'nb_formations_suivies': [3, 6, 2],
+        'frequence_deplacement': ['Travel_Rarely', 'Travel_Frequently', 'Non-Travel'],
+        'nombre_participation_pee': [1, 3, 0]
+    })
+
+    sirh_df.to_sql('extrait_sirh', test_db.bind, if_exists='replace', index=False)
+    eval_df.to_sql('extrait_eval', test_db.bind, if_exists='replace', index=False)
+    sondage_df.to_sql('extrait_sondage', test_db.bind, if_exists='replace', index=False)
+    return sirh_df, eval_df, sondage_df
@@ -0,0 +1,49 @@
+"""Tests pour les outils de la suite de benchmarks"""
+from app.utils.preprocessing import preprocess_input
+from benchmarks.common import StubPipeline, synthetic_sources
+from benchmarks.suite import _scenario, compare
+
+
+def test_synthetic_sources_go_through_preprocessing():
+    eval_df, sirh_df, sondage_df = synthetic_sources(50, seed=1)
+
+    X = preprocess_input(eval_df, sirh_df, sondage_df)
+
+    assert len(X) == 50
+    assert eval_df["eval_number"].iloc[0] == f"E_{sirh_df['id_employee'].iloc[0]}"
+
+
+def test_stub_pipeline_is_deterministic():
+    X = preprocess_input(*synthetic_sources(20, seed=2))
+    pipeline = StubPipeline()
+
+    probabilities = pipeline.predict_proba(X)
+
+    assert probabilities.shape == (20, 2)
+    assert (pipeline.predict(X) == (probabilities[:, 1] > 0.5)).all()
+    assert (pipeline.predict_proba(X) == probabilities).all()
+
+
+def test_compare_flags_regressions_above_threshold():
+    baseline = {"results": {"a": {"median_seconds": 1.0}, "b": {"median_seconds": 1.0}}}
+    current = {"results": {"a": {"median_seconds": 1.1}, "b": {"median_seconds": 1.5}, "c": {"median_seconds": 2.0}}}
+
+    lines, regressions = compare(baseline, current, threshold=0.15)
+
+    assert regressions == ["b"]
+    assert any("nouveau" in line for line in lines)
+
+
+def test_failed_scenario_is_recorded_and_flagged():
+    results = {}
+
+    def broken():
+        raise RuntimeError("/predict a répondu 500")
+
+    _scenario(results, "predict_endpoint/n=10", broken, repeat=1, rows=10)
+    _scenario(results, "ok", lambda: None, repeat=1)
+    lines, regressions = compare({"results": {"ok": {"median_seconds": 1.0}}}, {"results": results}, threshold=0.15)
+
+    assert results["predict_endpoint/n=10"] == {"failed": True, "error": "RuntimeError: /predict a répondu 500"}
+    assert "median_seconds" in results["ok"]
+    assert regressions == ["predict_endpoint/n=10"]
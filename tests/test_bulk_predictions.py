@@ -0,0 +1,100 @@
+"""Tests pour la lecture et la suppression groupées de prédictions"""
+import json
+import pytest
+from app.main import PREDICTION_RECORD_COLUMNS
+from app.models import Prediction, LatestPrediction
+from app.utils.bulk_predictions import parse_selection, stream_bulk_get
+from app.utils.latest_predictions import rebuild_latest_predictions
+
+
+def _add_predictions(test_db, count=5):
+    predictions = [Prediction(employee_id=i % 2, prediction=0, probability=0.1 * i) for i in range(count)]
+    test_db.add_all(predictions)
+    test_db.commit()
+    return [pred.id for pred in predictions]
+
+
+@pytest.mark.parametrize("kwargs", [
+    {},
+    {"ids": [1], "start_id": 1, "end_id": 2},
+    {"ids": []},
+    {"start_id": 5, "end_id": 1},
+    {"start_id": 1},
+    {"ids": [1, 2, 3], "max_ids": 2},
+    {"start_id": 1, "end_id": 3, "max_ids": 2},
+])
+def test_parse_selection_rejects_invalid_requests(kwargs):
+    with pytest.raises(ValueError):
+        parse_selection(**kwargs)
+
+
+def test_parse_selection_sorts_and_deduplicates():
+    assert parse_selection(ids=[3, 1, 3]) == ("ids", [1, 3])
+    assert parse_selection(start_id=2, end_id=4) == ("range", (2, 4))
+
+
+def test_bulk_get_by_ids_reports_missing(client, test_db):
+    ids = _add_predictions(test_db)
+
+    response = client.post("/predictions/bulk_get", json={"ids": [ids[3], ids[0], ids[4], 999_999]})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert [pred["id"] for pred in data["predictions"]] == sorted([ids[0], ids[3], ids[4]])
+    assert data["found"] == 3
+    assert data["missing_ids"] == [999_999]
+    assert set(data["predictions"][0]) == {"id", "employee_id", "prediction", "probability", "probabilities", "created_at"}
+
+
+def test_stream_bulk_get_queries_in_chunks(test_db):
+    ids = _add_predictions(test_db)
+
+    chunks = list(stream_bulk_get(test_db, PREDICTION_RECORD_COLUMNS, ("ids", ids + [999_999]), chunk_size=2))
+
+    assert len(chunks) == 5
+    data = json.loads(b"".join(chunks))
+    assert [pred["id"] for pred in data["predictions"]] == ids
+    assert data["missing_ids"] == [999_999]
+
+
+def test_bulk_get_by_range(client, test_db):
+    ids = _add_predictions(test_db, 3)
+
+    data = client.post("/predictions/bulk_get", json={"start_id": ids[1], "end_id": ids[-1] + 2}).json()
+
+    assert [pred["id"] for pred in data["predictions"]] == ids[1:]
+    assert data["missing_ids"] == [ids[-1] + 1, ids[-1] + 2]
+
+
+def test_bulk_get_with_nothing_found(client, test_db):
+    data = client.post("/predictions/bulk_get", json={"ids": [5, 6]}).json()
+
+    assert data == {"success": True, "predictions": [], "found": 0, "missing_ids": [5, 6]}
+
+
+def test_bulk_get_invalid_selection_returns_400(client):
+    assert client.post("/predictions/bulk_get", json={}).status_code == 400
+
+
+def test_bulk_delete_in_batches_refreshes_latest(client, test_db):
+    ids = _add_predictions(test_db)
+    rebuild_latest_predictions(test_db)
+    test_db.commit()
+
+    response = client.post("/predictions/bulk_delete?batch_size=2", json={"ids": ids[2:] + [999_999]})
+
+    assert response.status_code == 200
+    assert response.json() == {"success": True, "deleted": 3, "missing_ids": [999_999], "batches": 2}
+    assert [pred.id for pred in test_db.query(Prediction).order_by(Prediction.id)] == ids[:2]
+    latest = {row.employee_id: row.prediction_id for row in test_db.query(LatestPrediction)}
+    assert latest == {0: ids[0], 1: ids[1]}
+
+
+def test_bulk_delete_by_range(client, test_db):
+    ids = _add_predictions(test_db, 4)
+
+    result = client.post("/predictions/bulk_delete?batch_size=1", json={"start_id": ids[1], "end_id": ids[2]}).json()
+
+    assert result["deleted"] == 2
+    assert result["batches"] == 2
+    assert [pred.id for pred in test_db.query(Prediction).order_by(Prediction.id)] == [ids[0], ids[3]]
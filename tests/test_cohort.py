@@ -0,0 +1,111 @@
+"""Tests pour le scoring d'une cohorte filtrée en SQL"""
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from app.models import Prediction, ScoringRun
+from app.utils.preprocessing import _employee_key_sql, cohort_where, create_source_indexes, load_cohort_from_postgres
+
+
+def _proba(X):
+    return np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])[:len(X)]
+
+
+def test_cohort_where_builds_bound_clause():
+    where, params = cohort_where(departement=["Sales"], age_min=30, employee_ids=[1, 2])
+
+    assert where == "s.departement IN :departement AND s.id_employee IN :id_employee AND s.age >= :age_min"
+    assert params == {"departement": ["Sales"], "id_employee": [1, 2], "age_min": 30}
+    assert cohort_where() == ("1 = 1", {})
+
+
+def test_load_cohort_joins_on_key_digits(tmp_path):
+    url = f"sqlite:///{tmp_path / 'sources.db'}"
+    engine = create_engine(url)
+    pd.DataFrame({"id_employee": [1, 12, 21], "age": [30, 45, 50], "departement": ["A", "B", "B"]}) \
+        .to_sql("extrait_sirh", engine, index=False)
+    pd.DataFrame({"eval_number": ["E_1", "E_12", "E_21"], "note": [1, 2, 3]}).to_sql("extrait_eval", engine, index=False)
+    pd.DataFrame({"code_sondage": ["000001", "000012", "000021"], "score": [4, 5, 6]}) \
+        .to_sql("extrait_sondage", engine, index=False)
+    engine.dispose()
+
+    eval_df, sirh_df, sondage_df = load_cohort_from_postgres(url, departement=["B"], age_max=45)
+
+    assert sirh_df["id_employee"].tolist() == [12]
+    assert eval_df["eval_number"].tolist() == ["E_12"]
+    assert sondage_df["code_sondage"].tolist() == ["000012"]
+
+
+def test_cohort_joins_use_source_indexes(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'sources.db'}")
+    pd.DataFrame({"id_employee": [1, 12]}).to_sql("extrait_sirh", engine, index=False)
+    pd.DataFrame({"eval_number": ["E_1", "E_12"]}).to_sql("extrait_eval", engine, index=False)
+    pd.DataFrame({"code_sondage": ["000001", "000012"]}).to_sql("extrait_sondage", engine, index=False)
+
+    with engine.begin() as conn:
+        create_source_indexes(conn)
+        plan = conn.execute(text(
+            "EXPLAIN QUERY PLAN SELECT e.* FROM extrait_eval e JOIN extrait_sirh s "
+            f"ON {_employee_key_sql('sqlite', 'e.eval_number')} = s.id_employee WHERE s.id_employee IN (12)"
+        )).all()
+    engine.dispose()
+
+    details = " ".join(row[-1] for row in plan)
+    assert "ix_extrait_eval_employee_key" in details
+    assert "ix_extrait_sirh_id_employee" in details
+
+
+@patch('app.main.pipeline')
+def test_predict_cohort_scores_only_matching_employees(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.side_effect = lambda X: np.ones(len(X), dtype=int)
+    mock_pipeline.predict_proba.side_effect = _proba
+
+    response = client.post("/predict/cohort", json={"departement": ["Sales"], "age_min": 28})
+
+    assert response.status_code == 200
+    data = response.json()
+    assert len(mock_pipeline.predict.call_args[0][0]) == 1
+    assert data["total_employees"] == 1
+    assert [row["employee_id"] for row in data["predictions"]] == [1]
+    run = test_db.get(ScoringRun, data["scoring_run_id"])
+    assert (run.source, run.row_count) == ("cohort", 1)
+    assert [p.employee_id for p in test_db.query(Prediction).all()] == [1]
+
+
+@patch('app.main.pipeline')
+def test_predict_cohort_by_employee_ids_and_poste(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.side_effect = lambda X: np.ones(len(X), dtype=int)
+    mock_pipeline.predict_proba.side_effect = _proba
+
+    by_ids = client.post("/predict/cohort?summary_only=true", json={"employee_ids": [2, 3]}).json()
+    by_poste = client.post(
+        "/predict/cohort", json={"poste": ["Research Director", "Sales Representative"], "age_max": 30}
+    ).json()
+
+    assert by_ids["total_employees"] == 2
+    assert "predictions" not in by_ids
+    assert [row["employee_id"] for row in by_poste["predictions"]] == [3]
+
+
+@patch('app.main.pipeline')
+def test_predict_cohort_without_match_returns_404(mock_pipeline, client, test_db, source_tables):
+    response = client.post("/predict/cohort", json={"departement": ["Inconnu"]})
+
+    assert response.status_code == 404
+    mock_pipeline.predict.assert_not_called()
+    assert test_db.query(ScoringRun).count() == 0
+
+
+def test_predict_cohort_validates_filters(client):
+    assert client.post("/predict/cohort", json={}).status_code == 400
+    assert client.post("/predict/cohort", json={"employee_ids": []}).status_code == 400
+    assert client.post("/predict/cohort", json={"age_min": 50, "age_max": 30}).status_code == 400
+
+
+def test_predict_cohort_caps_employee_ids(client, monkeypatch):
+    monkeypatch.setenv("BULK_MAX_IDS", "2")
+
+    response = client.post("/predict/cohort", json={"employee_ids": [1, 2, 3]})
+
+    assert response.status_code == 400
+    assert response.json()["error"] == "Trop d'ids (3, maximum 2)"
@@ -0,0 +1,27 @@
+"""Tests pour la compression gzip des réponses"""
+from app.models import Prediction
+from app.utils.compression import compression_settings
+
+
+def test_large_responses_are_gzipped(client, test_db):
+    test_db.add_all([Prediction(employee_id=i, prediction=0, probability=0.1) for i in range(50)])
+    test_db.commit()
+
+    response = client.get("/predictions", headers={"Accept-Encoding": "gzip"})
+
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert response.json()["total"] == 50
+
+
+def test_small_responses_are_not_compressed(client):
+    response = client.get("/health", headers={"Accept-Encoding": "gzip"})
+
+    assert "content-encoding" not in response.headers
+
+
+def test_compression_settings_are_clamped(monkeypatch):
+    monkeypatch.setenv("GZIP_LEVEL", "12")
+    monkeypatch.setenv("GZIP_MINIMUM_SIZE", "-5")
+
+    assert compression_settings() == {"minimum_size": 0, "compresslevel": 9}
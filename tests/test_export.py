@@ -0,0 +1,77 @@
+"""Tests pour l'export en flux des prédictions"""
+import csv
+import gzip
+import io
+import json
+from datetime import datetime, timezone
+import pytest
+from app.models import Prediction
+from app.utils import export
+
+
+@pytest.fixture
+def stored_predictions(test_db):
+    rows = [
+        Prediction(employee_id=i, prediction=i % 2, probability=0.1 * i, probability_class_0=1 - 0.1 * i,
+                   created_at=datetime(2024, 1, i, tzinfo=timezone.utc))
+        for i in range(1, 6)
+    ]
+    test_db.add_all(rows)
+    test_db.commit()
+    return rows
+
+
+def test_export_csv_streams_all_rows(client, stored_predictions):
+    response = client.get("/predictions/export?format=csv&batch_size=2")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/csv")
+    rows = list(csv.DictReader(io.StringIO(response.text)))
+    assert [int(r["employee_id"]) for r in rows] == [1, 2, 3, 4, 5]
+    assert set(rows[0]) == set(export.EXPORT_COLUMNS)
+
+
+def test_export_ndjson_with_range(client, stored_predictions):
+    response = client.get(
+        "/predictions/export?format=ndjson&start=2024-01-02T00:00:00Z&end=2024-01-04T00:00:00Z"
+    )
+
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert [line["employee_id"] for line in lines] == [2, 3]
+    assert lines[0]["probabilities"] == pytest.approx([0.8, 0.2])
+
+
+def test_export_gzip(client, stored_predictions):
+    response = client.get("/predictions/export?format=ndjson&gzip=true")
+
+    assert response.headers["content-type"] == "application/gzip"
+    assert 'predictions.ndjson.gz' in response.headers["content-disposition"]
+    lines = gzip.decompress(response.content).decode("utf-8").splitlines()
+    assert len(lines) == 5
+
+
+def test_export_empty_csv_has_header(client):
+    response = client.get("/predictions/export?format=csv")
+
+    assert response.text.strip() == ",".join(export.EXPORT_COLUMNS)
+
+
+def test_export_parquet(client, stored_predictions):
+    pq = pytest.importorskip("pyarrow.parquet")
+
+    response = client.get("/predictions/export?format=parquet&batch_size=2")
+
+    table = pq.read_table(io.BytesIO(response.content))
+    assert table.num_rows == 5
+    assert table.column("employee_id").to_pylist() == [1, 2, 3, 4, 5]
+
+
+def test_export_parquet_without_pyarrow(client, monkeypatch):
+    monkeypatch.setattr(export, "pq", None)
+    monkeypatch.setattr("app.main.parquet_available", export.parquet_available)
+
+    assert client.get("/predictions/export?format=parquet").status_code == 501
+
+
+def test_export_rejects_unknown_format(client):
+    assert client.get("/predictions/export?format=xml").status_code == 422
@@ -0,0 +1,83 @@
+"""Tests pour le rendu JSON rapide des réponses volumineuses"""
+import json
+from datetime import datetime, timezone
+import numpy as np
+import pytest
+from fastapi.responses import JSONResponse
+from app.models import Prediction
+from app.utils.fast_json import FastJSONResponse, dumps, orjson_available, prediction_records, scoring_results
+from app.utils.latest_predictions import risk_level_for, risk_levels_for
+
+ENCODERS = ["json"] + (["orjson"] if orjson_available() else [])
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_dumps_matches_json_response(encoder):
+    content = {"a": 1, "b": [0.125, None, True], "texte": "élevé"}
+
+    assert dumps(content, encoder) == JSONResponse(content=content).body
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_dumps_handles_dates_and_numpy(encoder):
+    created_at = datetime(2025, 3, 1, 12, 30, 5, 120000, tzinfo=timezone.utc)
+
+    decoded = json.loads(dumps({"at": created_at, "n": np.int64(3), "p": np.float64(0.5)}, encoder))
+
+    assert decoded == {"at": created_at.isoformat(), "n": 3, "p": 0.5}
+
+
+def test_scoring_results_match_per_row_conversion():
+    employee_ids = np.array([10, 20, 30])
+    predictions = np.array([1, 0, 1])
+    probabilities = np.array([0.81234, 0.1, 0.50049])
+
+    results = scoring_results(employee_ids, predictions, probabilities, risk_levels_for(probabilities))
+
+    assert results == [
+        {
+            "employee_id": int(emp_id),
+            "employee_index": i,
+            "will_leave": bool(pred),
+            "probability": round(float(proba), 3),
+            "risk_level": risk_level_for(proba),
+        }
+        for i, (emp_id, pred, proba) in enumerate(zip(employee_ids, predictions, probabilities))
+    ]
+
+
+def test_prediction_records_rebuild_probabilities():
+    created_at = datetime(2025, 1, 1)
+    rows = [(1, 7, 1, 0.8, 0.2, created_at), (2, 8, 0, 0.3, None, None)]
+
+    records = prediction_records(rows)
+
+    assert records[0]["probabilities"] == [0.2, 0.8]
+    assert records[1]["probabilities"] is None
+    assert json.loads(FastJSONResponse(content=records).body)[0]["created_at"] == created_at.isoformat()
+
+
+@pytest.mark.parametrize("encoder", ENCODERS)
+def test_predictions_endpoint_body_is_unchanged(client, test_db, monkeypatch, encoder):
+    monkeypatch.setenv("JSON_ENCODER", encoder)
+    test_db.add_all([
+        Prediction(employee_id=1, prediction=1, probability=0.8, probability_class_0=0.2),
+        Prediction(employee_id=2, prediction=0, probability=0.1),
+    ])
+    test_db.commit()
+    expected = [
+        {
+            "id": pred.id,
+            "employee_id": pred.employee_id,
+            "prediction": pred.prediction,
+            "probability": pred.probability,
+            "probabilities": pred.probabilities,
+            "created_at": pred.created_at.isoformat(),
+        }
+        for pred in test_db.query(Prediction).order_by(Prediction.id)
+    ]
+
+    response = client.get("/predictions")
+
+    assert response.headers["content-type"] == "application/json"
+    assert sorted(response.json()["predictions"], key=lambda item: item["id"]) == expected
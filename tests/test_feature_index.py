@@ -0,0 +1,87 @@
+"""Tests pour l'index de features en mémoire et GET /employees/{id}/risk"""
+from unittest.mock import patch
+import numpy as np
+from sqlalchemy import text
+from app.main import _load_population
+from app.models import Prediction
+from app.utils.feature_index import FeatureIndex
+from app.utils.timing import StageTimer
+
+
+def _proba(X):
+    return np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9], [0.8, 0.2]])[:len(X)]
+
+
+def _add_employee(test_db, sirh_df, eval_df, sondage_df, employee_id):
+    sirh = sirh_df.iloc[[0]].assign(id_employee=employee_id)
+    sirh.to_sql('extrait_sirh', test_db.bind, if_exists='append', index=False)
+    eval_df.iloc[[0]].assign(eval_number=f"eval_{employee_id}") \
+        .to_sql('extrait_eval', test_db.bind, if_exists='append', index=False)
+    sondage_df.iloc[[0]].assign(code_sondage=f"sondage_{employee_id}") \
+        .to_sql('extrait_sondage', test_db.bind, if_exists='append', index=False)
+
+
+@patch('app.main.pipeline')
+def test_employee_risk_scores_population_once(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict_proba.side_effect = _proba
+
+    first = client.get("/employees/3/risk")
+    second = client.get("/employees/2/risk")
+
+    assert first.status_code == 200
+    assert first.json()["prediction"] == {"will_leave": True, "probability": 0.9, "risk_level": "HIGH"}
+    assert first.json()["departement"] == "Sales"
+    assert second.json()["prediction"]["will_leave"] is False
+    assert mock_pipeline.predict_proba.call_count == 1
+    assert len(mock_pipeline.predict_proba.call_args[0][0]) == 3
+    assert test_db.query(Prediction).count() == 0
+
+
+@patch('app.main.pipeline')
+def test_employee_risk_unknown_employee(mock_pipeline, client, test_db, source_tables):
+    response = client.get("/employees/99/risk")
+
+    assert response.status_code == 404
+    mock_pipeline.predict_proba.assert_not_called()
+
+
+def test_feature_index_rebuilds_when_sources_change(test_db, source_tables):
+    now = [0.0]
+    index = FeatureIndex(check_seconds=10, clock=lambda: now[0])
+    loads = []
+
+    def load():
+        loads.append(1)
+        return _load_population(StageTimer())
+
+    model = type("Model", (), {"predict_proba": staticmethod(_proba)})()
+    assert index.refresh(test_db, load) is True
+    assert index.risk(4, model) is None
+
+    _add_employee(test_db, *source_tables, employee_id=4)
+    assert index.refresh(test_db, load) is False
+    now[0] = 11.0
+    assert index.refresh(test_db, load) is True
+    now[0] = 12.0
+    assert index.refresh(test_db, load) is False
+
+    assert len(loads) == 2
+    assert index.risk(4, model)["prediction"]["probability"] == 0.2
+
+
+def test_feature_index_rebuilds_after_in_place_update(test_db, source_tables):
+    now = [0.0]
+    index = FeatureIndex(check_seconds=10, clock=lambda: now[0])
+
+    def load():
+        return _load_population(StageTimer())
+
+    assert index.refresh(test_db, load) is True
+
+    test_db.execute(text("UPDATE extrait_sirh SET departement = 'R&D' WHERE id_employee = 3"))
+    test_db.commit()
+    now[0] = 11.0
+
+    assert index.refresh(test_db, load) is True
+    model = type("Model", (), {"predict_proba": staticmethod(_proba)})()
+    assert index.risk(3, model)["departement"] == "R&D"
@@ -0,0 +1,92 @@
+"""Tests pour la table employee_features (features prétraitées)"""
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import pandas.testing as pdt
+from sqlalchemy import text
+from app.utils import feature_store
+from app.utils.feature_store import load_feature_store, refresh_feature_store
+from app.utils.preprocessing import preprocess_input
+
+
+def _url(test_engine):
+    return test_engine.url.render_as_string(hide_password=False)
+
+
+def test_refresh_is_incremental(test_engine, source_tables):
+    sirh_df, eval_df, sondage_df = source_tables
+
+    first = refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+    second = refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+    changed = sirh_df.iloc[:2].assign(age=[31, 40])
+    third = refresh_feature_store(test_engine, eval_df, changed, sondage_df)
+
+    assert first == {"written": 3, "removed": 0, "unchanged": 0, "rebuilt": True}
+    assert second == {"written": 0, "removed": 0, "unchanged": 3, "rebuilt": False}
+    assert third == {"written": 1, "removed": 1, "unchanged": 1, "rebuilt": False}
+    stored = pd.read_sql("SELECT id_employee, age FROM employee_features ORDER BY id_employee", test_engine)
+    assert stored.values.tolist() == [[1, 31], [2, 40]]
+
+
+def test_load_matches_preprocessing(test_engine, source_tables):
+    sirh_df, eval_df, sondage_df = source_tables
+    refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+
+    X = load_feature_store(_url(test_engine))
+    cohort = load_feature_store(_url(test_engine), departement=["Sales"], age_max=28)
+
+    expected = preprocess_input(eval_df, sirh_df, sondage_df)
+    pdt.assert_frame_equal(X, expected, check_dtype=False)
+    assert cohort["id_employee"].tolist() == [3]
+
+
+def test_store_ignored_when_stale(test_engine, source_tables, monkeypatch):
+    sirh_df, eval_df, sondage_df = source_tables
+    refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+
+    monkeypatch.setattr(feature_store, "FEATURE_SCHEMA_VERSION", 2)
+    assert load_feature_store(_url(test_engine)) is None
+    assert refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)["rebuilt"] is True
+    assert load_feature_store(_url(test_engine)) is not None
+
+    sirh_df.iloc[:2].to_sql('extrait_sirh', test_engine, if_exists='replace', index=False)
+    assert load_feature_store(_url(test_engine)) is None
+
+
+def test_store_ignored_after_in_place_update(test_engine, source_tables):
+    sirh_df, eval_df, sondage_df = source_tables
+    refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+
+    with test_engine.begin() as conn:
+        conn.execute(text("UPDATE extrait_sirh SET age = age + 1 WHERE id_employee = 2"))
+
+    assert load_feature_store(_url(test_engine)) is None
+
+
+def test_load_keeps_source_order(test_engine, source_tables):
+    sirh_df, eval_df, sondage_df = source_tables
+    shuffled = sirh_df.iloc[[2, 0, 1]]
+    shuffled.to_sql('extrait_sirh', test_engine, if_exists='replace', index=False)
+    refresh_feature_store(test_engine, eval_df, shuffled, sondage_df)
+
+    X = load_feature_store(_url(test_engine))
+
+    assert X["id_employee"].tolist() == [3, 1, 2]
+    pdt.assert_frame_equal(X, preprocess_input(eval_df, shuffled, sondage_df), check_dtype=False)
+
+
+@patch('app.main.load_data_from_postgres')
+@patch('app.main.pipeline')
+def test_predict_reads_feature_store(mock_pipeline, mock_load, client, test_engine, source_tables):
+    sirh_df, eval_df, sondage_df = source_tables
+    refresh_feature_store(test_engine, eval_df, sirh_df, sondage_df)
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+
+    response = client.post("/predict")
+
+    assert response.status_code == 200
+    assert response.json()["total_employees"] == 3
+    mock_load.assert_not_called()
+    assert mock_pipeline.predict.call_args[0][0].columns.tolist() == \
+        preprocess_input(eval_df, sirh_df, sondage_df).columns.tolist()
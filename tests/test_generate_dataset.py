@@ -0,0 +1,63 @@
+"""Tests pour le générateur de jeux de données RH synthétiques"""
+import pandas as pd
+from app.utils.preprocessing import preprocess_input
+from data.generate_dataset import generate, load_templates, TABLES
+
+
+def _read(paths):
+    return {table: pd.read_csv(paths[table], dtype=str) for table in TABLES}
+
+
+def test_generated_files_keep_schemas_and_formats(tmp_path):
+    paths = generate(2_500, tmp_path, seed=3, chunk_size=1_000)
+    frames = _read(paths)
+    templates = load_templates()
+
+    for table in TABLES:
+        assert list(frames[table].columns) == list(templates[table].columns)
+        assert len(frames[table]) == 2_500
+
+    ids = frames["extrait_sirh"]["id_employee"].astype(int)
+    assert ids.is_unique and ids.is_monotonic_increasing
+    assert (frames["extrait_eval"]["eval_number"] == "E_" + frames["extrait_sirh"]["id_employee"]).all()
+    assert (frames["extrait_sondage"]["code_sondage"] == "00000" + frames["extrait_sirh"]["id_employee"]).all()
+    assert frames["extrait_eval"]["augementation_salaire_precedente"].str.fullmatch(r"\d+ %").all()
+    assert set(frames["extrait_eval"]["heure_supplementaires"]) <= {"Oui", "Non"}
+    assert set(frames["extrait_sondage"]["ayant_enfants"]) == {"Y"}
+
+
+def test_same_seed_gives_identical_files(tmp_path):
+    first = generate(1_500, tmp_path / "a", seed=7, chunk_size=500)
+    second = generate(1_500, tmp_path / "b", seed=7, chunk_size=500)
+    other = generate(1_500, tmp_path / "c", seed=8, chunk_size=500)
+
+    for table in TABLES:
+        with open(first[table], "rb") as a, open(second[table], "rb") as b, open(other[table], "rb") as c:
+            content = a.read()
+            assert content == b.read()
+            assert content != c.read()
+
+
+def test_distributions_follow_the_source_data(tmp_path):
+    frames = _read(generate(20_000, tmp_path, seed=0))
+    source = load_templates()
+
+    generated_rate = (frames["extrait_sondage"]["a_quitte_l_entreprise"] == "Oui").mean()
+    source_rate = (source["extrait_sondage"]["a_quitte_l_entreprise"] == "Oui").mean()
+    assert abs(generated_rate - source_rate) < 0.02
+
+    generated_income = frames["extrait_sirh"]["revenu_mensuel"].astype(float).median()
+    source_income = source["extrait_sirh"]["revenu_mensuel"].astype(float).median()
+    assert abs(generated_income / source_income - 1) < 0.1
+
+
+def test_generated_data_goes_through_preprocessing(tmp_path):
+    paths = generate(300, tmp_path, seed=1)
+
+    X = preprocess_input(
+        pd.read_csv(paths["extrait_eval"]),
+        pd.read_csv(paths["extrait_sirh"]),
+        pd.read_csv(paths["extrait_sondage"]),
+    )
+
+    assert len(X) == 300
@@ -0,0 +1,122 @@
+"""Tests pour la table latest_predictions (dernier risque connu par employé)"""
+import sqlite3
+from unittest.mock import patch
+import numpy as np
+from app.models import Prediction, LatestPrediction
+from app.utils.latest_predictions import rebuild_latest_predictions, risk_level_for, upsert_latest_predictions
+
+
+@patch('app.main.pipeline')
+def test_predict_one_upserts_latest(mock_pipeline, client, test_db):
+    """Test qu'un second scoring du même employé remplace la ligne existante"""
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+    first = client.post("/predict_one", json={"employee_id": 7})
+    assert first.status_code == 200
+
+    mock_pipeline.predict.return_value = np.array([1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.1, 0.9]])
+    second = client.post("/predict_one", json={"employee_id": 7})
+    assert second.status_code == 200
+
+    rows = test_db.query(LatestPrediction).all()
+    assert len(rows) == 1
+    assert rows[0].prediction_id == second.json()["prediction_id"]
+    assert rows[0].risk_level == "HIGH"
+
+
+@patch('app.main.pipeline')
+def test_predict_one_without_employee_id_skips_latest(mock_pipeline, client, test_db):
+    """Test qu'une prédiction sans employee_id n'alimente pas latest_predictions"""
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+
+    response = client.post("/predict_one", json={"age": 30})
+
+    assert response.status_code == 200
+    assert test_db.query(LatestPrediction).count() == 0
+
+
+@patch('app.main.pipeline')
+def test_latest_endpoint_filters_and_sorts(mock_pipeline, client, test_db, source_tables):
+    """Test le filtre par niveau de risque et le tri par probabilité"""
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    assert client.post("/predict").status_code == 200
+
+    response = client.get("/predictions/latest?risk_level=HIGH")
+    assert response.status_code == 200
+    data = response.json()
+    assert data["total"] == 2
+    assert [p["employee_id"] for p in data["predictions"]] == [3, 1]
+
+    ascending = client.get("/predictions/latest?order=asc").json()
+    assert [p["employee_id"] for p in ascending["predictions"]] == [2, 1, 3]
+
+
+@patch('app.main.pipeline')
+def test_delete_latest_falls_back_to_previous(mock_pipeline, client, test_db):
+    """Test que la suppression de la dernière prédiction restaure la précédente"""
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+    first_id = client.post("/predict_one", json={"employee_id": 5}).json()["prediction_id"]
+    mock_pipeline.predict_proba.return_value = np.array([[0.3, 0.7]])
+    second_id = client.post("/predict_one", json={"employee_id": 5}).json()["prediction_id"]
+
+    assert client.delete(f"/predictions/{second_id}").status_code == 200
+    row = test_db.query(LatestPrediction).filter(LatestPrediction.employee_id == 5).one()
+    assert row.prediction_id == first_id
+
+    assert client.delete(f"/predictions/{first_id}").status_code == 200
+    assert test_db.query(LatestPrediction).count() == 0
+
+
+def test_rebuild_latest_predictions(test_db):
+    """Test la reconstruction complète depuis l'historique"""
+    test_db.add_all([
+        Prediction(employee_id=1, prediction=0, probability=0.2, probabilities=[0.8, 0.2]),
+        Prediction(employee_id=1, prediction=1, probability=0.7, probabilities=[0.3, 0.7]),
+        Prediction(employee_id=2, prediction=0, probability=0.4, probabilities=[0.6, 0.4]),
+        Prediction(employee_id=None, prediction=0, probability=0.1, probabilities=[0.9, 0.1]),
+    ])
+    test_db.commit()
+
+    assert rebuild_latest_predictions(test_db) == 2
+    test_db.commit()
+
+    rows = {row.employee_id: row for row in test_db.query(LatestPrediction).all()}
+    assert rows[1].probability == 0.7
+    assert rows[1].risk_level == "HIGH"
+    assert rows[2].risk_level == "LOW"
+
+
+def test_risk_level_threshold():
+    assert risk_level_for(0.51) == "HIGH"
+    assert risk_level_for(0.50) == "LOW"
+
+
+def test_latest_endpoint_rejects_invalid_parameters(client):
+    """Test que risk_level et order invalides renvoient une 422"""
+    assert client.get("/predictions/latest?risk_level=foo").status_code == 422
+    assert client.get("/predictions/latest?order=sideways").status_code == 422
+
+
+def test_upsert_latest_beyond_bind_parameter_limits(test_db):
+    """
+    Test qu'un scoring au-delà des limites de paramètres liés (32 766 pour SQLite, 65 535
+    pour PostgreSQL, 5 par employé) passe par lots
+    """
+    connection = test_db.connection().connection.driver_connection
+    if isinstance(connection, sqlite3.Connection):
+        # Limite par défaut de SQLite (certaines distributions la relèvent)
+        connection.setlimit(sqlite3.SQLITE_LIMIT_VARIABLE_NUMBER, 32766)
+    predictions = [Prediction(employee_id=i, prediction=i % 2, probability=(i % 10) / 10) for i in range(14000)]
+    test_db.add_all(predictions)
+    test_db.flush()
+
+    assert upsert_latest_predictions(test_db, predictions) == 14000
+    test_db.commit()
+
+    assert test_db.query(LatestPrediction).count() == 14000
+    last = test_db.get(LatestPrediction, 13999)
+    assert (last.prediction_id, last.risk_level) == (predictions[-1].id, "HIGH")
@@ -0,0 +1,43 @@
+"""Tests pour le harnais de test de charge"""
+import pytest
+from app.database import IS_POSTGRES
+from benchmarks.loadtest import build_report, parse_mix, parse_slo, run
+
+
+def test_parse_slo_merges_with_defaults():
+    slo = parse_slo(["predict_one.p95=80", "predict.error_rate=0.05"])
+
+    assert slo["predict_one"]["p95"] == 80
+    assert slo["predict_one"]["p99"] == 250
+    assert slo["predict"]["error_rate"] == 0.05
+
+
+def test_parse_mix():
+    assert parse_mix("predict_one=9,predictions=1") == {"predict_one": 9.0, "predictions": 1.0}
+
+
+def test_report_flags_slo_violations():
+    samples = {
+        "predict_one": [(0.010, 200)] * 95 + [(0.500, 200)] * 5,
+        "predictions": [(0.005, 200), (0.005, 500)],
+    }
+
+    report = build_report(samples, elapsed=2.0, slo=parse_slo(["predict_one.p95=50"]))
+
+    assert report["endpoints"]["predict_one"]["requests"] == 100
+    assert report["endpoints"]["predict_one"]["throughput_rps"] == 50
+    assert report["endpoints"]["predictions"]["error_rate"] == 0.5
+    violations = {(v["endpoint"], v["metric"]) for v in report["slo_violations"]}
+    assert ("predictions", "error_rate") in violations
+    assert ("predict_one", "p50") not in violations
+
+
+@pytest.mark.skipif(IS_POSTGRES, reason="le mode en processus utilise une base SQLite temporaire")
+def test_in_process_run_drives_every_endpoint():
+    report = run(
+        employees=50, duration=30, concurrency=2, max_requests=12,
+        mix={"predict_one": 1, "predictions": 1, "predict": 1},
+    )
+
+    assert sum(stats["requests"] for stats in report["endpoints"].values()) == 12
+    assert all(stats["error_rate"] == 0 for stats in report["endpoints"].values())
@@ -0,0 +1,89 @@
+"""Tests pour les diagnostics mémoire (tracemalloc) des endpoints de scoring"""
+import tracemalloc
+from unittest.mock import patch
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.memory_diagnostics import MemoryDiagnosticsMiddleware, MEMORY_RUNS, top_allocations
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def memory_client(client, monkeypatch):
+    """Client dont l'application est enveloppée par le middleware de diagnostics mémoire."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    MEMORY_RUNS.clear()
+    yield TestClient(MemoryDiagnosticsMiddleware(app))
+    if tracemalloc.is_tracing():
+        tracemalloc.stop()
+    MEMORY_RUNS.clear()
+
+
+def _predict_one(client, mock_pipeline):
+    mock_pipeline.predict.return_value = np.array([1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.2, 0.8]])
+    return client.post("/predict_one", json={"employee_id": 1})
+
+
+def test_top_allocations_diffs_against_baseline():
+    tracemalloc.start(5)
+    try:
+        before = tracemalloc.take_snapshot()
+        kept = [bytearray(10_000) for _ in range(50)]
+        after = tracemalloc.take_snapshot()
+    finally:
+        tracemalloc.stop()
+
+    top = top_allocations(after, before, limit=3)
+
+    assert "test_memory_diagnostics.py" in top[0]["site"]
+    assert top[0]["size_mb"] >= 0.45
+    assert len(kept) == 50
+
+
+@patch('app.main.pipeline')
+def test_scoring_is_recorded_only_while_tracing(mock_pipeline, memory_client):
+    _predict_one(memory_client, mock_pipeline)
+    assert memory_client.get("/admin/memory/runs", headers=ADMIN).json()["total"] == 0
+
+    started = memory_client.post("/admin/memory/start?frames=5", headers=ADMIN).json()["memory"]
+    assert started["tracing"] is True and started["frames"] == 5
+    assert _predict_one(memory_client, mock_pipeline).status_code == 200
+
+    [listed] = memory_client.get("/admin/memory/runs", headers=ADMIN).json()["runs"]
+    run = memory_client.get(f"/admin/memory/runs/{listed['id']}", headers=ADMIN).json()["run"]
+    assert run["path"] == "/predict_one"
+    assert run["status"] == 200
+    assert [stage["stage"] for stage in run["stages"]] == ["preprocess", "predict", "predict_proba", "persist", "commit"]
+    assert run["peak_stage"] in {stage["stage"] for stage in run["stages"]}
+    assert {"traced_mb", "traced_peak_mb", "rss_mb", "max_rss_mb"} <= set(run["stages"][0])
+
+    assert memory_client.post("/admin/memory/stop", headers=ADMIN).json()["memory"]["tracing"] is False
+
+
+@patch('app.main.pipeline')
+def test_snapshots_are_exported_for_offline_analysis(mock_pipeline, memory_client, tmp_path):
+    memory_client.post("/admin/memory/start", headers=ADMIN)
+    _predict_one(memory_client, mock_pipeline)
+    [listed] = memory_client.get("/admin/memory/runs", headers=ADMIN).json()["runs"]
+
+    exported = memory_client.get(f"/admin/memory/runs/{listed['id']}?format=snapshot&snapshot=after", headers=ADMIN)
+
+    assert exported.status_code == 200
+    path = tmp_path / "after.tracemalloc"
+    path.write_bytes(exported.content)
+    assert tracemalloc.Snapshot.load(str(path)).traces
+    assert memory_client.get("/admin/memory?top=3", headers=ADMIN).json()["memory"]["top"]
+
+
+def test_memory_endpoints_are_gated(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    monkeypatch.delenv("MEMORY_DIAGNOSTICS_ENABLED", raising=False)
+    assert client.post("/admin/memory/start").status_code == 404
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.post("/admin/memory/start", headers={"X-Admin-Token": "wrong"}).status_code == 403
+    assert client.get("/admin/memory/runs/inconnu", headers=ADMIN).status_code == 404
+    assert not tracemalloc.is_tracing()
@@ -0,0 +1,91 @@
+"""Tests pour les métriques Prometheus (/metrics)"""
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.utils.metrics import Registry, Counter, Gauge, Histogram, STAGE_SECONDS, ROWS_SCORED
+from app.utils.timing import StageTimer
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = Histogram("latency_seconds", "Latence", ["route"], buckets=(0.1, 1.0), registry=registry)
+
+    histogram.observe(0.05, route="/a")
+    histogram.observe(0.5, route="/a")
+    histogram.observe(2.0, route="/a")
+
+    text = registry.render()
+    assert "# TYPE latency_seconds histogram" in text
+    assert 'latency_seconds_bucket{route="/a",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{route="/a",le="1"} 2' in text
+    assert 'latency_seconds_bucket{route="/a",le="+Inf"} 3' in text
+    assert 'latency_seconds_sum{route="/a"} 2.55' in text
+    assert 'latency_seconds_count{route="/a"} 3' in text
+
+
+def test_counter_and_gauge_render_and_escape_labels():
+    registry = Registry()
+    counter = Counter("rows_total", "Lignes", ["source"], registry=registry)
+    gauge = Gauge("loaded", "Chargé", registry=registry)
+
+    counter.inc(3, source='a"b')
+    gauge.set(1)
+
+    text = registry.render()
+    assert 'rows_total{source="a\\"b"} 3' in text
+    assert "loaded 1" in text
+
+
+def test_counter_rejects_unknown_labels_and_negative_increments():
+    counter = Counter("c_total", "C", ["endpoint"], registry=None)
+    with pytest.raises(ValueError):
+        counter.inc(endpoint="x", stage="y")
+    with pytest.raises(ValueError):
+        counter.inc(-1, endpoint="x")
+
+
+def test_stage_timer_reports_each_stage():
+    seen = []
+    timer = StageTimer(on_stage=lambda name, seconds: seen.append((name, seconds)))
+
+    with timer.stage("load"):
+        pass
+
+    assert [name for name, _ in seen] == ["load"]
+    assert seen[0][1] == timer.timings["load"]
+
+
+def test_metrics_endpoint_exposes_request_histogram(client):
+    client.get("/health")
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_request_duration_seconds_count{method="GET",route="/health",status="200"}' in response.text
+    assert "# TYPE model_loaded gauge" in response.text
+
+
+def test_metrics_use_route_template(client):
+    client.get("/predictions/999999")
+
+    text = client.get("/metrics").text
+
+    assert 'route="/predictions/{prediction_id}",status="404"' in text
+
+
+@patch('app.main.pipeline')
+def test_predict_records_stages_and_rows(mock_pipeline, client, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    rows_before = ROWS_SCORED.value(endpoint="predict")
+    commits_before = STAGE_SECONDS.count(endpoint="predict", stage="commit")
+
+    assert client.post("/predict").status_code == 200
+
+    assert ROWS_SCORED.value(endpoint="predict") == rows_before + 3
+    assert STAGE_SECONDS.count(endpoint="predict", stage="commit") == commits_before + 1
+    text = client.get("/metrics").text
+    for stage in ("load", "merge", "preprocess", "predict", "predict_proba", "build_results", "persist"):
+        assert f'scoring_stage_duration_seconds_count{{endpoint="predict",stage="{stage}"}}' in text
+    assert "model_loaded 1" in text
@@ -0,0 +1,103 @@
+"""Tests pour les migrations de schéma"""
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from app.utils.migrations import migrate_probabilities_to_columns
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """Base SQLite avec l'ancien schéma (colonne JSON probabilities)"""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE predictions (id INTEGER PRIMARY KEY, employee_id INTEGER, "
+            "prediction INTEGER, probability FLOAT, probabilities JSON, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "INSERT INTO predictions (employee_id, prediction, probability, probabilities) VALUES "
+            "(1, 1, 0.75, '[0.25, 0.75]'), (2, 0, NULL, '[0.9, 0.1]'), (3, 0, 0.2, NULL)"
+        ))
+    yield engine
+    engine.dispose()
+
+
+def test_migrate_probabilities_copies_json(legacy_engine):
+    migrated = migrate_probabilities_to_columns(legacy_engine)
+
+    assert migrated == 2
+    columns = {c["name"] for c in inspect(legacy_engine).get_columns("predictions")}
+    assert "probabilities" not in columns
+    assert "probability_class_0" in columns
+
+    with legacy_engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT employee_id, probability_class_0, probability FROM predictions ORDER BY employee_id"
+        )).all()
+    assert rows[0] == (1, 0.25, 0.75)
+    assert rows[1] == (2, 0.9, 0.1)
+    assert rows[2] == (3, None, 0.2)
+
+
+def test_migrate_probabilities_is_idempotent(legacy_engine):
+    migrate_probabilities_to_columns(legacy_engine)
+
+    assert migrate_probabilities_to_columns(legacy_engine) == 0
+
+
+def test_migrate_probabilities_without_table(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'empty.db'}")
+
+    assert migrate_probabilities_to_columns(engine) == 0
+
+
+def test_migrate_predictions_to_partitioned(test_engine):
+    """Conversion d'une table PostgreSQL existante (non partitionnée) en table partitionnée"""
+    from app.models import Prediction
+    from app.utils.migrations import migrate_predictions_to_partitioned
+    from app.utils.retention import is_partitioned
+
+    if test_engine.dialect.name != "postgresql":
+        assert migrate_predictions_to_partitioned(test_engine) == 0
+        return
+
+    with test_engine.begin() as conn:
+        Prediction.__table__.drop(conn)
+        conn.execute(text(
+            "CREATE TABLE predictions (id SERIAL PRIMARY KEY, employee_id INTEGER, prediction INTEGER, "
+            "probability FLOAT, probability_class_0 FLOAT, scoring_run_id INTEGER, created_at TIMESTAMPTZ DEFAULT now())"
+        ))
+        conn.execute(text("CREATE INDEX ix_predictions_id ON predictions (id)"))
+        conn.execute(text(
+            "INSERT INTO predictions (employee_id, prediction, probability, probability_class_0, created_at) VALUES "
+            "(1, 1, 0.75, 0.25, '2021-03-04'), (2, 0, 0.1, 0.9, now()), (3, 0, 0.2, 0.8, NULL)"
+        ))
+
+    assert migrate_predictions_to_partitioned(test_engine) == 3
+    assert migrate_predictions_to_partitioned(test_engine) == 0
+
+    with test_engine.begin() as conn:
+        assert is_partitioned(conn)
+        partitions = conn.execute(text(
+            "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+            "JOIN pg_class p ON p.oid = i.inhparent WHERE p.relname = 'predictions'"
+        )).scalars().all()
+        assert "predictions_p2021_03" in partitions
+        new_id = conn.execute(text(
+            "INSERT INTO predictions (employee_id, prediction, probability, probability_class_0) "
+            "VALUES (4, 0, 0.3, 0.7) RETURNING id"
+        )).scalar()
+        assert new_id == 4
+        assert conn.execute(text("SELECT COUNT(*) FROM predictions")).scalar() == 4
+
+
+def test_migrate_add_scoring_run_id(legacy_engine):
+    from app.utils.migrations import migrate_add_scoring_run_id
+    with legacy_engine.begin() as conn:
+        conn.execute(text("CREATE TABLE scoring_runs (id INTEGER PRIMARY KEY)"))
+
+    assert migrate_add_scoring_run_id(legacy_engine) is True
+    assert migrate_add_scoring_run_id(legacy_engine) is False
+
+    inspector = inspect(legacy_engine)
+    assert "scoring_run_id" in {c["name"] for c in inspector.get_columns("predictions")}
+    assert "ix_predictions_scoring_run_id" in {i["name"] for i in inspector.get_indexes("predictions")}
@@ -43,3 +43,22 @@ def test_prediction_model_all_fields():
     assert prediction.prediction == 1
     assert prediction.probability == 0.85
     assert prediction.probabilities == [0.15, 0.85]
+
+
+def test_prediction_probabilities_stored_as_class_columns():
+    prediction = Prediction(probability=0.6, probabilities=[0.4, 0.6])
+
+    assert prediction.probability_class_0 == 0.4
+    assert prediction.probability == 0.6
+
+
+def test_prediction_probabilities_from_class_columns():
+    prediction = Prediction(probability=0.9, probability_class_0=0.1)
+
+    assert prediction.probabilities == [0.1, 0.9]
+
+
+def test_prediction_probabilities_none_when_incomplete():
+    prediction = Prediction(probability=0.9)
+
+    assert prediction.probabilities is None
@@ -0,0 +1,101 @@
+"""Tests pour l'instrumentation des étapes du pipeline scikit-learn"""
+import numpy as np
+import pandas as pd
+import pytest
+from sklearn.compose import ColumnTransformer
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import OneHotEncoder, StandardScaler
+from app.utils.preprocessing import SafeLogTransform
+from app.utils.pipeline_instrumentation import (
+    PipelineStats, PIPELINE_STATS, instrument_pipeline, uninstrument_pipeline, data_nbytes
+)
+
+
+@pytest.fixture
+def fitted_pipeline():
+    X = pd.DataFrame({
+        "revenu_mensuel": [2000.0, 3500.0, 5000.0, 8000.0, 12000.0, 2500.0],
+        "age": [25, 32, 41, 50, 58, 29],
+        "departement": ["Sales", "Sales", "R&D", "R&D", "Consulting", "Consulting"],
+    })
+    y = [1, 0, 0, 0, 1, 1]
+    preprocessor = ColumnTransformer([
+        ("num", Pipeline([("log", SafeLogTransform()), ("scale", StandardScaler())]), ["revenu_mensuel", "age"]),
+        ("cat", OneHotEncoder(handle_unknown="ignore"), ["departement"]),
+    ])
+    pipeline = Pipeline([("preprocessor", preprocessor), ("classifier", LogisticRegression())])
+    return pipeline.fit(X, y), X
+
+
+def _by_step(stats):
+    return {(entry["step"], entry["method"]): entry for entry in stats.snapshot()}
+
+
+def test_each_step_is_timed_with_rows_and_bytes(fitted_pipeline):
+    pipeline, X = fitted_pipeline
+    expected = pipeline.predict_proba(X)
+    stats = PipelineStats()
+
+    instrument_pipeline(pipeline, stats)
+    result = pipeline.predict_proba(X)
+
+    np.testing.assert_allclose(result, expected)
+    steps = _by_step(stats)
+    for key in [
+        ("(pipeline)", "predict_proba"),
+        ("preprocessor", "transform"),
+        ("preprocessor/num", "transform"),
+        ("preprocessor/num/log", "transform"),
+        ("preprocessor/num/scale", "transform"),
+        ("preprocessor/cat", "transform"),
+        ("classifier", "predict_proba"),
+    ]:
+        assert steps[key]["calls"] == 1
+        assert steps[key]["rows"] == len(X)
+    assert steps[("preprocessor/num/log", "transform")]["input_bytes"] == 2 * 8 * len(X)
+    assert steps[("classifier", "predict_proba")]["output_bytes"] == result.nbytes
+    assert steps[("(pipeline)", "predict_proba")]["total_seconds"] >= steps[("classifier", "predict_proba")]["total_seconds"]
+
+
+def test_instrumenting_twice_does_not_double_count(fitted_pipeline):
+    pipeline, X = fitted_pipeline
+    stats = PipelineStats()
+
+    instrument_pipeline(pipeline, stats)
+    assert instrument_pipeline(pipeline, stats) == []
+    pipeline.predict(X)
+
+    assert _by_step(stats)[("classifier", "predict")]["calls"] == 1
+
+
+def test_uninstrument_restores_class_methods(fitted_pipeline):
+    pipeline, X = fitted_pipeline
+    stats = PipelineStats()
+    instrument_pipeline(pipeline, stats)
+
+    uninstrument_pipeline(pipeline)
+    pipeline.predict(X)
+
+    assert stats.snapshot() == []
+    assert "predict" not in pipeline.__dict__
+
+
+def test_data_nbytes_for_dataframe_and_array():
+    assert data_nbytes(np.zeros((10, 3))) == 240
+    assert data_nbytes(pd.DataFrame({"a": np.zeros(10)})) == 80
+
+
+def test_pipeline_steps_endpoint(client, monkeypatch, fitted_pipeline):
+    assert client.get("/admin/pipeline_steps").status_code == 404
+
+    pipeline, X = fitted_pipeline
+    monkeypatch.setenv("PIPELINE_INSTRUMENTATION", "true")
+    PIPELINE_STATS.reset()
+    instrument_pipeline(pipeline)
+    pipeline.predict_proba(X)
+
+    data = client.get("/admin/pipeline_steps?reset=true").json()
+
+    assert {entry["step"] for entry in data["steps"]} >= {"preprocessor/num/log", "classifier"}
+    assert client.get("/admin/pipeline_steps").json()["steps"] == []
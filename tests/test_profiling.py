@@ -0,0 +1,94 @@
+"""Tests pour le profilage à la demande des endpoints de scoring"""
+import marshal
+import time
+from unittest.mock import patch
+import numpy as np
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.utils.profiling import ProfilingMiddleware, SamplingProfiler, PROFILES, classify_file
+
+ADMIN = {"X-Admin-Token": "secret"}
+
+
+@pytest.fixture
+def profiled_client(client, monkeypatch):
+    """Client dont l'application est enveloppée par le middleware de profilage."""
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    PROFILES.clear()
+    yield TestClient(ProfilingMiddleware(app))
+    PROFILES.clear()
+
+
+def _predict_one(client, mock_pipeline, headers):
+    mock_pipeline.predict.return_value = np.array([1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.2, 0.8]])
+    return client.post("/predict_one", json={"employee_id": 1}, headers=headers)
+
+
+def test_classify_file_by_package():
+    assert classify_file("/venv/lib/python3.11/site-packages/sklearn/pipeline.py") == "sklearn"
+    assert classify_file("/venv/lib/python3.11/site-packages/pandas/core/frame.py") == "pandas"
+    assert classify_file("/venv/lib/python3.11/site-packages/sqlalchemy/orm/session.py") == "sqlalchemy"
+    assert classify_file("/usr/lib/python3.11/json/encoder.py") == "json"
+    assert classify_file("/usr/lib/python3.11/asyncio/events.py") is None
+
+
+def test_sampling_profiler_collects_stacks():
+    profiler = SamplingProfiler(interval=0.001)
+    profiler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    profiler.stop()
+
+    assert sum(profiler.stacks.values()) > 0
+    assert "test_sampling_profiler_collects_stacks" in profiler.collapsed()
+
+
+@patch('app.main.pipeline')
+def test_cprofile_request_is_stored_with_breakdown(mock_pipeline, profiled_client):
+    response = _predict_one(profiled_client, mock_pipeline, {"X-Profile": "cprofile", **ADMIN})
+
+    assert response.status_code == 200
+    profile_id = response.headers["x-profile-id"]
+
+    profile = profiled_client.get(f"/admin/profiles/{profile_id}", headers=ADMIN).json()["profile"]
+    assert profile["mode"] == "cprofile"
+    assert profile["path"] == "/predict_one"
+    assert profile["top"]
+    assert "sqlalchemy" in profile["breakdown"]
+
+    raw = profiled_client.get(f"/admin/profiles/{profile_id}?format=pstats", headers=ADMIN)
+    assert raw.status_code == 200
+    assert isinstance(marshal.loads(raw.content), dict)
+    assert profiled_client.get(f"/admin/profiles/{profile_id}?format=collapsed", headers=ADMIN).status_code == 400
+
+
+@patch('app.main.pipeline')
+def test_sampling_request_exports_collapsed_stacks(mock_pipeline, profiled_client):
+    response = _predict_one(profiled_client, mock_pipeline, {"X-Profile": "sampling", **ADMIN})
+    profile_id = response.headers["x-profile-id"]
+
+    collapsed = profiled_client.get(f"/admin/profiles/{profile_id}?format=collapsed", headers=ADMIN)
+
+    assert collapsed.status_code == 200
+    assert collapsed.headers["content-type"].startswith("text/plain")
+    listed = profiled_client.get("/admin/profiles", headers=ADMIN).json()
+    assert [p["id"] for p in listed["profiles"]] == [profile_id]
+
+
+@patch('app.main.pipeline')
+def test_requests_without_valid_token_are_not_profiled(mock_pipeline, profiled_client):
+    response = _predict_one(profiled_client, mock_pipeline, {"X-Profile": "cprofile", "X-Admin-Token": "wrong"})
+
+    assert response.status_code == 200
+    assert "x-profile-id" not in response.headers
+    assert profiled_client.get("/admin/profiles", headers={"X-Admin-Token": "wrong"}).status_code == 403
+
+
+def test_admin_endpoints_disabled_by_default(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    monkeypatch.delenv("PROFILING_ENABLED", raising=False)
+
+    assert client.get("/admin/profiles").status_code == 404
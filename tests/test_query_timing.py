@@ -0,0 +1,99 @@
+"""Tests pour la mesure des requêtes SQL (évènements SQLAlchemy)"""
+from sqlalchemy import create_engine, text
+from app.utils import query_timing
+from app.utils.query_timing import COMMIT_STATEMENT, OTHER_STATEMENTS, QueryStats, instrument_engine, normalize_statement
+
+
+def _engine(stats):
+    return instrument_engine(create_engine("sqlite://"), stats)
+
+
+def test_normalize_statement_replaces_literals_and_lists():
+    assert normalize_statement(
+        "SELECT *\n  FROM predictions WHERE id IN (?, ?, ?) AND risk_level = 'HIGH' LIMIT 10"
+    ) == "SELECT * FROM predictions WHERE id IN (?) AND risk_level = ? LIMIT ?"
+    assert normalize_statement(
+        "INSERT INTO t (a, b) VALUES (%(a_m0)s, %(b_m0)s), (%(a_m1)s, %(b_m1)s)"
+    ) == "INSERT INTO t (a, b) VALUES (?), ..."
+    assert normalize_statement("SELECT count(*) AS count_1 FROM anon_1 WHERE x::text = $1") == (
+        "SELECT count(*) AS count_1 FROM anon_1 WHERE x::text = ?"
+    )
+
+
+def test_queries_commits_and_checkouts_are_recorded():
+    stats = QueryStats(slow_threshold_ms=0)
+    engine = _engine(stats)
+    instrument_engine(engine, stats)
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE t (id INTEGER)"))
+        for i in range(3):
+            conn.execute(text(f"INSERT INTO t VALUES ({i})"))
+        conn.execute(text("SELECT * FROM t WHERE id = :id"), {"id": 1})
+
+    snapshot = stats.snapshot()
+    by_statement = {item["statement"]: item for item in snapshot["statements"]}
+    assert by_statement["INSERT INTO t VALUES (?)"]["calls"] == 3
+    assert by_statement["INSERT INTO t VALUES (?)"]["rows"] == 3
+    assert by_statement["SELECT * FROM t WHERE id = ?"]["calls"] == 1
+    assert by_statement[COMMIT_STATEMENT]["calls"] == 1
+    assert snapshot["pool_checkout"]["checkouts"] == 1
+    assert snapshot["slow_queries"][0]["statement"] == COMMIT_STATEMENT
+    assert "parameters" not in snapshot["slow_queries"][0]
+
+
+def test_slow_log_is_bounded_and_statements_capped():
+    stats = QueryStats(slow_threshold_ms=0, slow_log_size=2, max_statements=2)
+    engine = _engine(stats)
+
+    with engine.connect() as conn:
+        conn.execute(text("SELECT 1"))
+        conn.execute(text("SELECT 1 AS a"))
+        conn.execute(text("SELECT 1 AS b"))
+        conn.execute(text("SELECT 1 AS c"))
+
+    snapshot = stats.snapshot()
+    assert len(snapshot["slow_queries"]) == 2
+    assert {item["statement"] for item in snapshot["statements"]} == {"SELECT ?", "SELECT ? AS a", OTHER_STATEMENTS}
+
+    stats.reset()
+    assert stats.snapshot()["statements"] == []
+
+
+def test_failed_queries_do_not_skew_timings():
+    stats = QueryStats()
+    engine = _engine(stats)
+
+    with engine.connect() as conn:
+        try:
+            conn.execute(text("SELECT * FROM table_inexistante"))
+        except Exception:
+            pass
+        conn.execute(text("SELECT 2"))
+        assert not conn.info["query_start"]
+
+    assert [item["statement"] for item in stats.snapshot()["statements"]] == ["SELECT ?"]
+
+
+def test_query_stats_endpoint(client, monkeypatch):
+    monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+    client.get("/predictions")
+    assert client.get("/admin/queries").status_code == 403
+
+    monkeypatch.setenv("ADMIN_TOKEN", "secret")
+    assert client.get("/admin/queries").status_code == 403
+    response = client.get("/admin/queries", headers={"X-Admin-Token": "secret"})
+
+    assert response.status_code == 200
+    assert "pool_checkout" in response.json()
+
+    monkeypatch.setenv("QUERY_TIMING_ENABLED", "false")
+    assert client.get("/admin/queries").status_code == 404
+
+
+def test_normalize_cache_does_not_keep_statements():
+    statement = "INSERT INTO t (a) VALUES " + ", ".join(["(1)"] * 20000)
+
+    assert normalize_statement(statement) == "INSERT INTO t (a) VALUES (?), ..."
+    assert normalize_statement(statement) == "INSERT INTO t (a) VALUES (?), ..."
+    assert all(len(key) == 16 for key in query_timing._NORMALIZED)
@@ -0,0 +1,127 @@
+"""Tests pour les ETags, les requêtes conditionnelles et le cache des lectures de prédictions"""
+from unittest.mock import patch
+import numpy as np
+from sqlalchemy import func
+from app.models import Prediction
+from app.utils.response_cache import PREDICTION_CACHE, ResponseCache, etag_matches
+
+
+def _add_predictions(test_db, count=2):
+    test_db.add_all([Prediction(employee_id=i, prediction=0, probability=0.1) for i in range(count)])
+    test_db.commit()
+
+
+def test_etag_matches():
+    assert etag_matches('"a", W/"b"', '"b"')
+    assert etag_matches("*", '"a"')
+    assert not etag_matches('"a"', '"b"')
+    assert not etag_matches(None, '"a"')
+
+
+def test_cache_evicts_by_entries_bytes_and_ttl():
+    now = [0.0]
+    cache = ResponseCache(max_entries=2, max_bytes=10, ttl_seconds=5, clock=lambda: now[0])
+    cache.put(("page", 1), b"aaaa", "application/json")
+    cache.put(("page", 2), b"bbbb", "application/json")
+    cache.put(("page", 3), b"cccc", "application/json")
+    assert cache.get(("page", 1)) is None
+    assert cache.get(("page", 3)) == (b"cccc", "application/json")
+
+    cache.put(("prediction", 1), b"dddddd", "application/json")
+    assert cache.stats()["bytes"] <= 10
+    assert cache.get(("prediction", 1), validator="autre") is None
+
+    cache.put(("prediction", 2), b"ee", "application/json")
+    now[0] = 5.0
+    assert cache.get(("prediction", 2)) is None
+
+
+def test_prediction_etag_and_304(client, test_db):
+    _add_predictions(test_db, 1)
+    prediction_id = test_db.query(Prediction.id).scalar()
+
+    first = client.get(f"/predictions/{prediction_id}")
+    etag = first.headers["etag"]
+    conditional = client.get(f"/predictions/{prediction_id}", headers={"If-None-Match": etag})
+
+    assert conditional.status_code == 304
+    assert conditional.headers["etag"] == etag
+    assert client.get(f"/predictions/{prediction_id}").json() == first.json()
+    assert "etag" not in client.get(f"/predictions/{prediction_id}?debug=true").headers
+
+
+def test_deleted_prediction_is_not_served_from_cache(client, test_db):
+    _add_predictions(test_db, 1)
+    prediction_id = test_db.query(Prediction.id).scalar()
+    etag = client.get(f"/predictions/{prediction_id}").headers["etag"]
+
+    assert client.delete(f"/predictions/{prediction_id}").status_code == 200
+
+    assert client.get(f"/predictions/{prediction_id}", headers={"If-None-Match": etag}).status_code == 404
+
+
+def test_reused_id_gets_new_etags(client, test_db):
+    """Un id supprimé puis réattribué (SQLite sans AUTOINCREMENT) ne doit pas donner de 304"""
+    _add_predictions(test_db)
+    prediction_id = test_db.query(func.max(Prediction.id)).scalar()
+    record_etag = client.get(f"/predictions/{prediction_id}").headers["etag"]
+    page_etag = client.get("/predictions").headers["etag"]
+
+    assert client.delete(f"/predictions/{prediction_id}").status_code == 200
+    test_db.add(Prediction(id=prediction_id, employee_id=999, prediction=0, probability=0.1, probability_class_0=0.9))
+    test_db.commit()
+
+    record = client.get(f"/predictions/{prediction_id}", headers={"If-None-Match": record_etag})
+    page = client.get("/predictions", headers={"If-None-Match": page_etag})
+    assert record.status_code == 200
+    assert record.json()["prediction"]["employee_id"] == 999
+    assert page.status_code == 200
+
+
+def test_prediction_ids_are_not_reused(client, test_db):
+    _add_predictions(test_db)
+    prediction_id = test_db.query(func.max(Prediction.id)).scalar()
+
+    assert client.delete(f"/predictions/{prediction_id}").status_code == 200
+    _add_predictions(test_db, 1)
+
+    assert test_db.query(func.max(Prediction.id)).scalar() > prediction_id
+
+
+def test_page_etag_changes_with_rows_and_parameters(client, test_db):
+    _add_predictions(test_db)
+    etag = client.get("/predictions").headers["etag"]
+
+    assert client.get("/predictions", headers={"If-None-Match": etag}).status_code == 304
+    assert client.get("/predictions?limit=1", headers={"If-None-Match": etag}).status_code == 200
+    assert client.get("/predictions?fields=id", headers={"If-None-Match": etag}).status_code == 200
+
+    _add_predictions(test_db, 1)
+    refreshed = client.get("/predictions", headers={"If-None-Match": etag})
+    assert refreshed.status_code == 200
+    assert refreshed.json()["total"] == 3
+    assert refreshed.headers["etag"] != etag
+
+
+def test_page_body_is_reused_until_insert(client, test_db):
+    _add_predictions(test_db)
+    first = client.get("/predictions")
+
+    with patch.object(PREDICTION_CACHE, "put") as put:
+        second = client.get("/predictions")
+    assert second.content == first.content
+    put.assert_not_called()
+
+
+@patch('app.main.pipeline')
+def test_predict_one_invalidates_pages(mock_pipeline, client, test_db):
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+    _add_predictions(test_db)
+    client.get("/predictions")
+    assert PREDICTION_CACHE.stats()["entries"] == 1
+
+    assert client.post("/predict_one", json={"employee_id": 9}).status_code == 200
+
+    assert PREDICTION_CACHE.stats()["entries"] == 0
+    assert client.get("/predictions").json()["total"] == 3
@@ -0,0 +1,223 @@
+"""Tests pour la négociation des formats de réponse (JSON en colonnes, Arrow, MessagePack)"""
+import json
+import struct
+from datetime import datetime
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.models import Prediction
+from app.utils.response_formats import (
+    ARROW_STREAM, COLUMNAR_JSON, MSGPACK, arrow_available, columns_from_rows, encode_msgpack, negotiate,
+)
+
+
+def _unpack(data, offset=0):
+    """Décodeur MessagePack minimal (sous-ensemble produit par ``encode_msgpack``)."""
+    tag = data[offset]
+    offset += 1
+    if tag < 0x80:
+        return tag, offset
+    if tag >= 0xe0:
+        return tag - 0x100, offset
+    if tag == 0xc0:
+        return None, offset
+    if tag in (0xc2, 0xc3):
+        return tag == 0xc3, offset
+    if tag == 0xcb:
+        return struct.unpack_from(">d", data, offset)[0], offset + 8
+    if tag == 0xd3:
+        return struct.unpack_from(">q", data, offset)[0], offset + 8
+    if 0xa0 <= tag <= 0xbf or tag in (0xd9, 0xda, 0xdb):
+        if tag <= 0xbf:
+            length = tag & 0x1f
+        else:
+            fmt = {0xd9: ">B", 0xda: ">H", 0xdb: ">I"}[tag]
+            length = struct.unpack_from(fmt, data, offset)[0]
+            offset += struct.calcsize(fmt)
+        return data[offset:offset + length].decode("utf-8"), offset + length
+    if 0x90 <= tag <= 0x9f or 0x80 <= tag <= 0x8f or tag in (0xdc, 0xdd, 0xde, 0xdf):
+        is_map = tag in (0xde, 0xdf) or 0x80 <= tag <= 0x8f
+        if tag in (0xdc, 0xde):
+            length = struct.unpack_from(">H", data, offset)[0]
+            offset += 2
+        elif tag in (0xdd, 0xdf):
+            length = struct.unpack_from(">I", data, offset)[0]
+            offset += 4
+        else:
+            length = tag & 0x0f
+        items = []
+        for _ in range(length * (2 if is_map else 1)):
+            item, offset = _unpack(data, offset)
+            items.append(item)
+        if is_map:
+            return dict(zip(items[::2], items[1::2])), offset
+        return items, offset
+    raise ValueError(hex(tag))
+
+
+def unpack(data):
+    value, offset = _unpack(data)
+    assert offset == len(data)
+    return value
+
+
+@pytest.mark.parametrize("accept, expected", [
+    (None, "json"),
+    ("*/*", "json"),
+    ("application/json", "json"),
+    ("application/msgpack", "msgpack"),
+    ("application/x-msgpack", "msgpack"),
+    (f"application/json;q=0.5, {COLUMNAR_JSON}", "columnar"),
+    (f"{MSGPACK};q=0, application/*;q=0.1", "json"),
+    ("application/json;q=0, */*;q=0.1", "columnar"),
+    (f"application/json;q=0, {COLUMNAR_JSON};q=0, {MSGPACK};q=0, application/*", "arrow" if arrow_available() else None),
+    ("text/csv", None),
+])
+def test_negotiate(accept, expected):
+    assert negotiate(accept) == expected
+
+
+def test_msgpack_encodes_numpy_columns():
+    content = {
+        "total": 3,
+        "ids": np.array([1, -5, 70000], dtype=np.int64),
+        "p": np.array([0.25, 0.5, 1.0]),
+        "flags": np.array([True, False, True]),
+        "at": [datetime(2025, 1, 1), None, "é" * 40],
+        "many": np.arange(20),
+    }
+
+    decoded = unpack(encode_msgpack(content))
+
+    assert decoded == {
+        "total": 3,
+        "ids": [1, -5, 70000],
+        "p": [0.25, 0.5, 1.0],
+        "flags": [True, False, True],
+        "at": ["2025-01-01T00:00:00", None, "é" * 40],
+        "many": list(range(20)),
+    }
+
+
+def test_columns_from_rows_keeps_nullable_columns_as_lists():
+    columns = columns_from_rows([(1, 0.5, None), (2, 0.25, 0.1)], ("id", "probability", "class_0"))
+
+    assert columns["id"].tolist() == [1, 2]
+    assert columns["probability"].dtype == np.float64
+    assert columns["class_0"] == [None, 0.1]
+    assert columns_from_rows([], ("id",)) == {"id": []}
+
+
+def _add_predictions(test_db):
+    test_db.add_all([
+        Prediction(employee_id=1, prediction=1, probability=0.8, probability_class_0=0.2),
+        Prediction(employee_id=2, prediction=0, probability=0.1),
+    ])
+    test_db.commit()
+
+
+def _sorted_rows(columns):
+    rows = [dict(zip(columns, values)) for values in zip(*columns.values())]
+    return sorted(rows, key=lambda row: row["id"])
+
+
+def test_predictions_columnar_json_matches_rows(client, test_db):
+    _add_predictions(test_db)
+    rows = client.get("/predictions").json()["predictions"]
+
+    response = client.get("/predictions", headers={"Accept": COLUMNAR_JSON})
+
+    assert response.headers["content-type"] == COLUMNAR_JSON
+    assert "Accept" in response.headers["vary"]
+    data = response.json()
+    assert data["total"] == 2
+    for row, expected in zip(_sorted_rows(data["predictions"]), sorted(rows, key=lambda row: row["id"])):
+        assert row["employee_id"] == expected["employee_id"]
+        assert row["probability"] == expected["probability"]
+        assert row["created_at"] == expected["created_at"]
+    assert [row["probability_class_0"] for row in _sorted_rows(data["predictions"])] == [0.2, None]
+
+
+def test_predictions_msgpack(client, test_db):
+    _add_predictions(test_db)
+
+    response = client.get("/predictions", headers={"Accept": MSGPACK})
+
+    assert response.headers["content-type"] == MSGPACK
+    data = unpack(response.content)
+    assert data["total"] == 2
+    assert sorted(data["predictions"]["employee_id"]) == [1, 2]
+
+
+@pytest.mark.skipif(not arrow_available(), reason="pyarrow non installé")
+def test_predictions_arrow_stream(client, test_db):
+    import pyarrow as pa
+    _add_predictions(test_db)
+
+    response = client.get("/predictions", headers={"Accept": ARROW_STREAM})
+
+    assert response.headers["content-type"] == ARROW_STREAM
+    table = pa.ipc.open_stream(response.content).read_all()
+    assert sorted(table.column("employee_id").to_pylist()) == [1, 2]
+    assert json.loads(table.schema.metadata[b"envelope"])["total"] == 2
+
+
+def test_unsupported_accept_returns_406(client):
+    response = client.get("/predictions", headers={"Accept": "text/csv"})
+
+    assert response.status_code == 406
+    assert MSGPACK in response.json()["supported"]
+    assert client.post("/predict", headers={"Accept": "text/csv"}).status_code == 406
+
+
+@patch('app.main.pipeline')
+def test_predict_columnar_formats_match_json(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    rows = client.post("/predict").json()["predictions"]
+    expected = {key: [row[key] for row in rows] for key in rows[0]}
+
+    columnar = client.post("/predict", headers={"Accept": COLUMNAR_JSON}).json()
+    packed = unpack(client.post("/predict", headers={"Accept": MSGPACK}).content)
+
+    assert columnar["predictions"] == expected
+    assert columnar["statistics"] == packed["statistics"] == {"high_risk": 2, "low_risk": 1, "high_risk_percentage": 66.67}
+    assert packed["predictions"] == expected
+
+
+def test_predictions_fields_and_summary_only(client, test_db):
+    _add_predictions(test_db)
+
+    projected = client.get("/predictions?fields=employee_id,probability").json()["predictions"]
+    columnar = client.get("/predictions?fields=id,probability_class_0", headers={"Accept": COLUMNAR_JSON}).json()
+    summary = client.get("/predictions?summary_only=true").json()
+
+    assert sorted(projected, key=lambda row: row["employee_id"]) == [
+        {"employee_id": 1, "probability": 0.8}, {"employee_id": 2, "probability": 0.1},
+    ]
+    assert list(columnar["predictions"]) == ["id", "probability_class_0"]
+    assert summary == {"success": True, "total": 2, "skip": 0, "limit": 100}
+
+
+def test_unknown_field_returns_400(client):
+    response = client.get("/predictions?fields=employee_id,salaire")
+
+    assert response.status_code == 400
+    assert "salaire" in response.json()["error"]
+    assert client.get("/predictions?fields=probability_class_0").status_code == 400
+    assert client.post("/predict?fields=probabilities").status_code == 400
+
+
+@patch('app.main.pipeline')
+def test_predict_fields_and_summary_only(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+
+    projected = client.post("/predict?fields=employee_id,probability").json()
+    summary = client.post("/predict?summary_only=true").json()
+    packed = unpack(client.post("/predict?summary_only=true", headers={"Accept": MSGPACK}).content)
+
+    assert [set(row) for row in projected["predictions"]] == [{"employee_id", "probability"}] * 3
+    assert "predictions" not in summary
+    assert summary["statistics"] == packed["statistics"] == projected["statistics"]
+    assert summary["total_employees"] == 3
@@ -0,0 +1,117 @@
+"""Tests pour le partitionnement, la rétention et la compaction des prédictions"""
+from datetime import datetime, timezone
+from app.models import Prediction, LatestPrediction
+from app.utils.retention import (
+    ensure_partitions, apply_retention, compact_predictions, run_maintenance, is_partitioned, _next_month
+)
+
+
+def _add(test_db, employee_id, created_at):
+    prediction = Prediction(
+        employee_id=employee_id, prediction=0, probability=0.2, probability_class_0=0.8,
+        created_at=created_at
+    )
+    test_db.add(prediction)
+    test_db.flush()
+    prediction_id = prediction.id
+    test_db.commit()
+    return prediction_id
+
+
+def _remaining_ids(test_db):
+    test_db.expire_all()
+    ids = {p.id for p in test_db.query(Prediction).all()}
+    test_db.commit()
+    return ids
+
+
+def test_next_month_rolls_over_year():
+    assert _next_month(datetime(2025, 12, 1, tzinfo=timezone.utc)) == datetime(2026, 1, 1, tzinfo=timezone.utc)
+    assert _next_month(datetime(2025, 3, 1, tzinfo=timezone.utc)) == datetime(2025, 4, 1, tzinfo=timezone.utc)
+
+
+def test_predictions_partitioned_on_postgres(test_engine):
+    with test_engine.connect() as conn:
+        assert is_partitioned(conn) == (test_engine.dialect.name == "postgresql")
+
+
+def test_apply_retention_removes_expired_rows(test_engine, test_db):
+    with test_engine.begin() as conn:
+        ensure_partitions(conn, months_ahead=1, now=datetime(2020, 1, 15, tzinfo=timezone.utc))
+
+    _add(test_db, 1, datetime(2020, 1, 10, tzinfo=timezone.utc))
+    _add(test_db, 2, datetime(2020, 1, 20, tzinfo=timezone.utc))
+    # Mois sans partition dédiée : la ligne tombe dans la partition par défaut
+    _add(test_db, 4, datetime(2020, 4, 2, tzinfo=timezone.utc))
+    recent_id = _add(test_db, 3, datetime(2020, 5, 30, tzinfo=timezone.utc))
+
+    report = apply_retention(test_engine, retention_days=30, now=datetime(2020, 6, 1, tzinfo=timezone.utc))
+
+    if test_engine.dialect.name == "postgresql":
+        assert report["mode"] == "partitions"
+        assert report["dropped_partitions"] == ["predictions_p2020_01", "predictions_p2020_02"]
+        assert report["default_partition_deleted_rows"] == 1
+    else:
+        assert report["mode"] == "range_delete"
+        assert report["deleted_rows"] == 3
+    assert _remaining_ids(test_db) == {recent_id}
+
+
+def test_apply_retention_prunes_latest_predictions(test_engine, test_db):
+    expired_id = _add(test_db, 1, datetime(2020, 1, 10, tzinfo=timezone.utc))
+    kept_id = _add(test_db, 2, datetime(2020, 5, 30, tzinfo=timezone.utc))
+    test_db.add_all([
+        LatestPrediction(employee_id=1, prediction_id=expired_id, prediction=0, probability=0.2, risk_level="LOW"),
+        LatestPrediction(employee_id=2, prediction_id=kept_id, prediction=0, probability=0.2, risk_level="LOW"),
+    ])
+    test_db.commit()
+
+    report = apply_retention(test_engine, retention_days=30, now=datetime(2020, 6, 1, tzinfo=timezone.utc))
+
+    assert report["latest_pruned"] == 1
+    test_db.expire_all()
+    assert [row.employee_id for row in test_db.query(LatestPrediction).all()] == [2]
+
+
+def test_compact_keeps_last_prediction_per_day(test_engine, test_db):
+    now = datetime(2020, 3, 10, 12, 0, tzinfo=timezone.utc)
+    _add(test_db, 1, datetime(2020, 3, 9, 8, 0, tzinfo=timezone.utc))
+    _add(test_db, 1, datetime(2020, 3, 9, 9, 0, tzinfo=timezone.utc))
+    kept = _add(test_db, 1, datetime(2020, 3, 9, 23, 30, tzinfo=timezone.utc))
+    other = _add(test_db, 2, datetime(2020, 3, 9, 8, 0, tzinfo=timezone.utc))
+    today_first = _add(test_db, 1, datetime(2020, 3, 10, 8, 0, tzinfo=timezone.utc))
+    today_second = _add(test_db, 1, datetime(2020, 3, 10, 9, 0, tzinfo=timezone.utc))
+    older = _add(test_db, 1, datetime(2020, 3, 1, 9, 0, tzinfo=timezone.utc))
+    older_dup = _add(test_db, 1, datetime(2020, 3, 1, 10, 0, tzinfo=timezone.utc))
+
+    with test_engine.begin() as conn:
+        if conn.dialect.name == "postgresql":
+            # Les jours doivent être comptés en UTC quel que soit le fuseau de session
+            conn.exec_driver_sql("SET TIME ZONE 'America/New_York'")
+        assert compact_predictions(conn, window_days=1, now=now) == 2
+
+    assert _remaining_ids(test_db) == {kept, other, today_first, today_second, older, older_dup}
+
+
+def test_run_maintenance_reads_configuration(test_engine, test_db, monkeypatch):
+    monkeypatch.setenv("PREDICTIONS_RETENTION_DAYS", "30")
+    monkeypatch.setenv("PREDICTIONS_COMPACTION", "true")
+    _add(test_db, 1, datetime(2000, 1, 1, tzinfo=timezone.utc))
+    recent_id = _add(test_db, 2, datetime.now(timezone.utc))
+
+    report = run_maintenance(test_engine)
+
+    assert report["compacted_rows"] == 0
+    assert _remaining_ids(test_db) == {recent_id}
+
+
+def test_run_maintenance_disabled_by_default(test_engine, test_db, monkeypatch):
+    monkeypatch.delenv("PREDICTIONS_RETENTION_DAYS", raising=False)
+    monkeypatch.delenv("PREDICTIONS_COMPACTION", raising=False)
+    old_id = _add(test_db, 1, datetime(2000, 1, 1, tzinfo=timezone.utc))
+
+    report = run_maintenance(test_engine)
+
+    assert "retention" not in report
+    assert "compacted_rows" not in report
+    assert _remaining_ids(test_db) == {old_id}
@@ -0,0 +1,79 @@
+"""Tests pour les statistiques de risque agrégées en SQL"""
+from datetime import datetime, timezone
+from unittest.mock import patch
+import numpy as np
+from app.models import Prediction
+from app.utils.risk_statistics import compute_statistics
+
+
+def _add_history(test_db):
+    test_db.add_all([
+        Prediction(employee_id=1, prediction=1, probability=0.95, created_at=datetime(2025, 1, 1, 10, tzinfo=timezone.utc)),
+        Prediction(employee_id=2, prediction=0, probability=0.3, created_at=datetime(2025, 1, 1, 11, tzinfo=timezone.utc)),
+        Prediction(employee_id=3, prediction=1, probability=0.6, created_at=datetime(2025, 1, 2, 10, tzinfo=timezone.utc)),
+        Prediction(employee_id=3, prediction=0, probability=0.0, created_at=datetime(2025, 1, 2, 11, tzinfo=timezone.utc)),
+    ])
+    test_db.commit()
+
+
+def test_history_statistics_overall(test_db):
+    _add_history(test_db)
+
+    [overall] = compute_statistics(test_db, "history", buckets=4)
+
+    assert overall["key"] is None
+    assert overall["count"] == 4
+    assert overall["high_risk"] == 2
+    assert overall["low_risk"] == 2
+    assert overall["mean_probability"] == 0.4625
+    assert overall["histogram"] == [1, 1, 1, 1]
+
+
+def test_history_statistics_by_date(test_db):
+    _add_history(test_db)
+
+    groups = compute_statistics(test_db, "history", group_by="date", buckets=2, start=datetime(2025, 1, 1, 10, 30))
+
+    assert [(group["key"], group["count"], group["histogram"]) for group in groups] == [
+        ("2025-01-01", 1, [1, 0]),
+        ("2025-01-02", 2, [1, 1]),
+    ]
+
+
+def test_history_statistics_by_departement(test_db, source_tables):
+    _add_history(test_db)
+
+    groups = compute_statistics(test_db, "history", group_by="departement")
+
+    assert {group["key"]: group["count"] for group in groups} == {"Research & Development": 1, "Sales": 3}
+
+
+@patch('app.main.pipeline')
+def test_statistics_endpoint_is_cached_until_next_write(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    assert client.post("/predict").status_code == 200
+
+    first = client.get("/statistics?group_by=poste")
+    assert first.status_code == 200
+    assert [group["key"] for group in first.json()["groups"]] == [
+        "Research Director", "Sales Executive", "Sales Representative",
+    ]
+    assert len(first.json()["histogram_edges"]) == 11
+
+    history = client.get("/statistics?source=history")
+    # Écriture hors de l'API : le corps en cache reste servi jusqu'à la prochaine invalidation
+    test_db.add(Prediction(employee_id=2, prediction=1, probability=0.99))
+    test_db.commit()
+    assert client.get("/statistics?source=history").content == history.content
+
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+    assert client.post("/predict_one", json={"employee_id": 1}).status_code == 200
+    groups = {group["key"]: group for group in client.get("/statistics?group_by=poste").json()["groups"]}
+    assert groups["Sales Executive"]["high_risk"] == 0
+    assert client.get("/statistics?source=history").json()["groups"][0]["count"] == 5
+
+
+def test_statistics_validates_buckets(client):
+    assert client.get("/statistics?buckets=0").status_code == 400
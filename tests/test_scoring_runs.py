@@ -0,0 +1,87 @@
+"""Tests pour le regroupement des prédictions par exécution de scoring"""
+from unittest.mock import patch
+import numpy as np
+from app.models import Prediction, ScoringRun
+
+
+def _run_predict(client, mock_pipeline):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    response = client.post("/predict")
+    assert response.status_code == 200
+    return response.json()["scoring_run_id"]
+
+
+@patch('app.main.pipeline')
+def test_predict_records_scoring_run(mock_pipeline, client, test_db, source_tables):
+    run_id = _run_predict(client, mock_pipeline)
+
+    run = test_db.query(ScoringRun).filter(ScoringRun.id == run_id).one()
+    assert run.status == "success"
+    assert run.source == "predict"
+    assert run.row_count == 3
+    assert run.finished_at is not None
+    assert {"load", "merge", "preprocess", "predict", "predict_proba", "persist"} <= set(run.stage_timings)
+
+    run_rows = test_db.query(Prediction).filter(Prediction.scoring_run_id == run_id).count()
+    assert run_rows == 3
+
+
+@patch('app.main.pipeline')
+def test_failed_predict_records_failed_run(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.side_effect = RuntimeError("modèle cassé")
+
+    response = client.post("/predict")
+
+    assert response.status_code == 500
+    run = test_db.query(ScoringRun).one()
+    assert run.status == "failed"
+    assert run.finished_at is not None
+    assert {"load", "merge", "preprocess", "predict"} <= set(run.stage_timings)
+    assert "persist" not in run.stage_timings
+    assert test_db.query(Prediction).count() == 0
+
+
+@patch('app.main.pipeline')
+def test_predict_one_has_no_scoring_run(mock_pipeline, client, test_db):
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+
+    prediction_id = client.post("/predict_one", json={"employee_id": 1}).json()["prediction_id"]
+
+    prediction = test_db.query(Prediction).filter(Prediction.id == prediction_id).one()
+    assert prediction.scoring_run_id is None
+
+
+@patch('app.main.pipeline')
+def test_list_scoring_runs_newest_first(mock_pipeline, client, source_tables):
+    first = _run_predict(client, mock_pipeline)
+    second = _run_predict(client, mock_pipeline)
+
+    data = client.get("/scoring_runs").json()
+
+    assert data["total"] == 2
+    assert [run["id"] for run in data["scoring_runs"]] == [second, first]
+    assert client.get(f"/scoring_runs/{first}").json()["scoring_run"]["row_count"] == 3
+
+
+@patch('app.main.pipeline')
+def test_scoring_run_predictions_keyset_pages(mock_pipeline, client, source_tables):
+    first = _run_predict(client, mock_pipeline)
+    _run_predict(client, mock_pipeline)
+
+    page = client.get(f"/scoring_runs/{first}/predictions?limit=2").json()
+    assert len(page["predictions"]) == 2
+    assert page["next_after_id"] == page["predictions"][-1]["id"]
+
+    rest = client.get(f"/scoring_runs/{first}/predictions?limit=2&after_id={page['next_after_id']}").json()
+    assert len(rest["predictions"]) == 1
+    assert rest["next_after_id"] is None
+
+    employee_ids = [p["employee_id"] for p in page["predictions"] + rest["predictions"]]
+    assert employee_ids == [1, 2, 3]
+
+
+def test_unknown_scoring_run_returns_404(client):
+    assert client.get("/scoring_runs/999999").status_code == 404
+    assert client.get("/scoring_runs/999999/predictions").status_code == 404
@@ -0,0 +1,52 @@
+"""Tests pour l'en-tête Server-Timing et le mode debug"""
+from unittest.mock import patch
+import numpy as np
+from app.models import Prediction
+
+
+def _stages(response):
+    header = response.headers["server-timing"]
+    return {entry.split(";")[0].strip(): float(entry.split("dur=")[1]) for entry in header.split(",")}
+
+
+@patch('app.main.pipeline')
+def test_predict_server_timing_breakdown(mock_pipeline, client, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+
+    response = client.post("/predict")
+
+    assert response.status_code == 200
+    stages = _stages(response)
+    assert {"validation", "db_read", "preprocessing", "inference", "db_write", "serialization", "total"} <= set(stages)
+    assert stages["total"] >= stages["inference"]
+    assert "timings" not in response.json()
+
+
+@patch('app.main.pipeline')
+def test_predict_one_debug_adds_timings_to_body(mock_pipeline, client):
+    mock_pipeline.predict.return_value = np.array([0])
+    mock_pipeline.predict_proba.return_value = np.array([[0.8, 0.2]])
+
+    response = client.post("/predict_one?debug=true", json={"employee_id": 1})
+
+    timings = response.json()["timings"]
+    assert {"validation", "preprocessing", "inference", "db_write"} <= set(timings)
+    assert {"validation", "preprocessing", "inference", "db_write", "db_read", "serialization"} <= set(_stages(response))
+
+
+def test_predictions_list_server_timing(client, test_db):
+    test_db.add(Prediction(employee_id=1, prediction=1, probability=0.7, probability_class_0=0.3))
+    test_db.commit()
+
+    response = client.get("/predictions?debug=true")
+
+    assert {"validation", "db_read", "serialization", "total"} <= set(_stages(response))
+    assert set(response.json()["timings"]) >= {"validation", "db_read", "serialization"}
+
+
+def test_error_responses_keep_server_timing(client):
+    response = client.get("/predictions/999999")
+
+    assert response.status_code == 404
+    assert {"validation", "db_read", "total"} <= set(_stages(response))
@@ -0,0 +1,55 @@
+"""Tests pour le top K des employés les plus à risque"""
+from unittest.mock import patch
+import numpy as np
+import pytest
+from app.utils.top_risk import top_k_indices
+
+
+@pytest.mark.parametrize("k", [1, 3, 10, 50])
+def test_top_k_indices_matches_full_sort(k):
+    rng = np.random.default_rng(k)
+    probabilities = rng.integers(0, 20, size=40) / 20
+    employee_ids = rng.permutation(40) + 100
+
+    expected = sorted(range(40), key=lambda i: (-probabilities[i], employee_ids[i]))[:k]
+
+    assert top_k_indices(probabilities, k, employee_ids).tolist() == expected
+
+
+def test_top_k_indices_empty():
+    assert top_k_indices(np.array([]), 5).tolist() == []
+
+
+@patch('app.main.pipeline')
+def test_top_risk_from_latest_predictions(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict.return_value = np.array([1, 0, 1])
+    mock_pipeline.predict_proba.return_value = np.array([[0.4, 0.6], [0.7, 0.3], [0.1, 0.9]])
+    assert client.post("/predict").status_code == 200
+
+    top = client.get("/predictions/top_risk?k=2").json()
+    sales = client.get("/predictions/top_risk?k=5&departement=Sales&poste=Sales Executive").json()
+
+    assert [row["employee_id"] for row in top["predictions"]] == [3, 1]
+    assert top["predictions"][0]["departement"] == "Sales"
+    assert top["count"] == 2
+    assert [row["employee_id"] for row in sales["predictions"]] == [1]
+
+
+@patch('app.main.pipeline')
+def test_top_risk_from_scoring_filters_before_inference(mock_pipeline, client, test_db, source_tables):
+    mock_pipeline.predict_proba.side_effect = lambda X: np.array([[0.4, 0.6], [0.1, 0.9]])[:len(X)]
+
+    response = client.get("/predictions/top_risk?source=score&k=1&departement=Sales")
+
+    assert response.status_code == 200
+    assert len(mock_pipeline.predict_proba.call_args[0][0]) == 2
+    mock_pipeline.predict.assert_not_called()
+    assert response.json()["predictions"] == [{
+        "employee_id": 3, "prediction": 1, "probability": 0.9, "risk_level": "HIGH",
+        "departement": "Sales", "poste": "Sales Representative",
+    }]
+
+
+def test_top_risk_validates_k(client):
+    assert client.get("/predictions/top_risk?k=0").status_code == 400
+    assert client.get("/predictions/top_risk?k=100000").status_code == 400
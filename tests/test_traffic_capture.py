@@ -0,0 +1,123 @@
+"""Tests pour la capture de trafic et son rejeu"""
+import asyncio
+import httpx
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from app.utils.traffic_capture import CaptureWriter, TrafficCaptureMiddleware, pseudonymize, read_capture, scrub_pii
+from benchmarks.replay import compare, replay, summarize
+
+
+def _app(writer, **options):
+    app = FastAPI()
+
+    @app.post("/predict_one")
+    async def predict_one(payload: dict):
+        return {"employee_id": payload.get("employee_id")}
+
+    @app.get("/health")
+    async def health():
+        return {"status": "healthy"}
+
+    app.add_middleware(TrafficCaptureMiddleware, writer=writer, salt="sel", **options)
+    return app
+
+
+def test_pseudonymize_is_stable_and_keeps_types():
+    assert pseudonymize(42, "sel") == pseudonymize(42, "sel")
+    assert pseudonymize(42, "sel") != pseudonymize(42, "autre")
+    assert isinstance(pseudonymize(42, "sel"), int)
+    assert pseudonymize("Durand", "sel").startswith("h_")
+
+    body = scrub_pii({"employee_id": 7, "age": 30, "items": [{"employee_id": 8}]}, {"employee_id"}, "sel")
+    assert body["age"] == 30
+    assert body["employee_id"] == pseudonymize(7, "sel")
+    assert body["items"][0]["employee_id"] == pseudonymize(8, "sel")
+    assert scrub_pii({"age": 30, "items": [{"genre": "F"}]}, set(), "sel", drop={"age", "genre"}) == {"items": [{}]}
+
+
+def test_empty_salt_is_replaced_by_a_random_one(monkeypatch):
+    monkeypatch.delenv("TRAFFIC_CAPTURE_SALT", raising=False)
+    writer = CaptureWriter("unused")
+
+    first = TrafficCaptureMiddleware(None, writer=writer, salt="")
+    second = TrafficCaptureMiddleware(None, writer=writer)
+
+    assert len(first.salt) == 64
+    assert first.salt != second.salt
+
+
+def test_middleware_captures_sampled_requests_with_pii_hashed(tmp_path):
+    writer = CaptureWriter(str(tmp_path / "capture.ndjson.gz"))
+    client = TestClient(_app(writer, sample_rate=1.0, paths=("/predict_one",)))
+
+    response = client.post(
+        "/predict_one?debug=true",
+        json={"employee_id": 123, "age": 41, "revenu_mensuel": 5000, "genre": "Female", "poste": "Manager"},
+    )
+    client.get("/health")
+    writer.close()
+
+    assert response.json() == {"employee_id": 123}
+    [record] = read_capture(writer.path)
+    assert record["path"] == "/predict_one"
+    assert record["query"] == "debug=true"
+    assert record["status"] == 200
+    assert record["duration_ms"] > 0
+    assert record["body"] == {"employee_id": pseudonymize(123, "sel"), "poste": "Manager"}
+
+
+def test_middleware_respects_sample_rate_and_record_limit(tmp_path):
+    writer = CaptureWriter(str(tmp_path / "capture.ndjson.gz"), max_records=3)
+    client = TestClient(_app(writer, sample_rate=1.0, paths=("/predict_one",)))
+    for i in range(5):
+        client.post("/predict_one", json={"employee_id": i})
+    skipped = CaptureWriter(str(tmp_path / "none.ndjson.gz"))
+    TestClient(_app(skipped, sample_rate=0.0, paths=("/predict_one",))).post("/predict_one", json={})
+    writer.close()
+
+    assert len(read_capture(writer.path)) == 3
+    assert skipped.records == 0
+
+
+def test_replay_sends_captured_requests_in_order():
+    records = [
+        {"ts": 10.0, "method": "POST", "path": "/predict_one", "query": "", "body": {"employee_id": 1},
+         "status": 200, "duration_ms": 5.0},
+        {"ts": 10.01, "method": "GET", "path": "/health", "query": "", "body": None, "status": 200, "duration_ms": 1.0},
+        {"ts": 10.02, "method": "POST", "path": "/predict_one", "query": "", "body": {"employee_id": 2},
+         "status": 200, "duration_ms": 5.0},
+    ]
+    app = _app(CaptureWriter("unused"), sample_rate=0.0)
+
+    async def main():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://replay") as client:
+            return await replay(client, records, speed=2.0)
+
+    results, elapsed = asyncio.run(main())
+
+    assert [result["endpoint"] for result in results] == ["predict_one", "health", "predict_one"]
+    assert all(result["status"] == 200 for result in results)
+    assert summarize(results, elapsed)["endpoints"]["predict_one"]["requests"] == 2
+
+
+def _run(latencies, statuses=None):
+    requests = [
+        {"endpoint": "predict_one", "latency_ms": latency, "status": (statuses or {}).get(i, 200)}
+        for i, latency in enumerate(latencies)
+    ]
+    return {"requests": requests, **summarize(requests, elapsed=1.0)}
+
+
+def test_compare_reports_paired_regressions_and_status_changes():
+    baseline = _run([10.0] * 20)
+
+    lines, regressions = compare(baseline, _run([10.5] * 20), threshold=0.1)
+    assert regressions == []
+
+    lines, regressions = compare(baseline, _run([15.0] * 20, statuses={3: 500}), threshold=0.1)
+    assert "predict_one.apparié" in regressions
+    assert "status" in regressions
+
+    with pytest.raises(ValueError):
+        compare(baseline, _run([10.0] * 5), threshold=0.1)